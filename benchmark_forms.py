@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Data-layer benchmark for form submissions
+Drives TursoFormsManager and FormsManager against local stand-ins and reports throughput and tail latency
+
+    python benchmark_forms.py --backend both --concurrency 8 --ops 200 --latency-ms 40 --save baseline.json
+    python benchmark_forms.py --backend turso -o replica_path=/tmp/replica.db --compare baseline.json
+
+The Turso backend talks HTTP to src/libsql_server.py and the GCS backend to
+an in-memory LocalBlob, so no credentials or network are needed. Each
+operation runs as its own phase; round trips and bytes are what the stand-in
+saw during that phase, divided by the operations run. --compare exits with
+status 1 if any operation regressed by more than --threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Callable
+
+# Add src directory to Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from libsql_server import LibSQLServer
+from local_gcs import LocalBlob
+
+OPERATIONS = [
+    'submit_membership_application',
+    'submit_bank_of_ideas',
+    'submit_general_suggestion',
+    'submit_member_nomination',
+    'submit_research_database',
+    'check_email_exists',
+]
+
+# Higher is worse for these; ops_per_sec is checked the other way round
+REGRESSION_METRICS = ['p95_ms', 'p99_ms', 'round_trips_per_op', 'bytes_per_op']
+
+
+def form_data(operation: str, n: int) -> Dict[str, Any]:
+    """Form fields for one submission; covers the keys both managers read"""
+    email = f"bench{n}@example.org"
+    if operation == 'submit_membership_application':
+        return {
+            'email': email, 'full_name': f"Bench User {n}", 'phone': '+10000000000', 'country': 'Egypt',
+            'academic_degree': 'PhD', 'specialization': 'Computational linguistics',
+            'institution': 'Benchmark University', 'position': 'Researcher',
+            'research_interests': 'Quranic NLP', 'motivation': 'Benchmarking the data layer',
+        }
+    if operation == 'submit_bank_of_ideas':
+        return {
+            'email': email, 'submitter_name': f"Bench User {n}", 'title_degrees': 'Dr.',
+            'specialization_area': 'NLP', 'project_title': f"Idea {n}", 'brief_description': 'A short description',
+            'objectives': 'Some objectives', 'benefits': 'Some benefits', 'project_type': 'Research',
+            'project_type_other': '', 'project_nature': 'Individual', 'project_nature_other': '',
+            'web_links': 'https://example.org', 'additional_notes': '',
+        }
+    if operation == 'submit_general_suggestion':
+        return {
+            'email': email, 'name': f"Bench User {n}", 'full_name': f"Bench User {n}", 'category': 'Website',
+            'suggestion_type': 'Website', 'subject': f"Suggestion {n}", 'suggestion_title': f"Suggestion {n}",
+            'suggestion': 'Make it faster', 'suggestion_description': 'Make it faster',
+            'priority': 'Medium', 'priority_level': 'Medium', 'implementation_timeline': 'Soon',
+            'additional_info': '', 'additional_comments': '',
+        }
+    if operation == 'submit_member_nomination':
+        return {
+            'nominator_email': email, 'nominating_member_name': f"Bench User {n}",
+            'nominee_full_name': f"Nominee {n}", 'nominee_place_of_work': 'Benchmark University',
+            'nominee_country': 'Jordan', 'nominee_phone': '+10000000001', 'nominee_email': f"nominee{n}@example.org",
+            'nominee_specialization': 'Tafsir', 'nominee_qualifications': 'PhD',
+            'nominee_address': '', 'nominee_url_link': 'https://example.org',
+        }
+    if operation == 'submit_research_database':
+        return {
+            'research_type': 'Journal article', 'publication_type': 'Journal article',
+            'title': f"Paper {n}", 'paper_title': f"Paper {n}", 'journal_conference': 'Benchmark Journal',
+            'authors': f"Author {n}; Second Author; Third Author",
+            'conference_journal_book_title': 'Benchmark Journal', 'publication_year': 2024,
+            'publisher': 'Benchmark Press', 'publisher_name': 'Benchmark Press', 'keywords': 'quran, nlp',
+            'abstract': 'An abstract', 'doi_link': 'https://doi.org/10.0/bench', 'paper_url': 'https://example.org',
+            'field_of_study': 'NLP', 'language': 'English', 'additional_notes': '',
+            'article_classification': 'NLP', 'article_second_classification': '',
+            'article_third_classification': '',
+        }
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_phase(call: Callable[[int], Any], ops: int, concurrency: int,
+              stats: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Run one operation ops times across concurrency threads and summarize it"""
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def one(n: int):
+        started = time.perf_counter()
+        try:
+            result = call(n)
+            failed = isinstance(result, dict) and result.get('success') is False
+        except Exception:
+            failed = True
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if failed:
+                errors[0] += 1
+
+    before = stats()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(ops)))
+    wall = time.perf_counter() - started
+    after = stats()
+
+    latencies.sort()
+    return {
+        'ops': ops,
+        'errors': errors[0],
+        'ops_per_sec': round(ops / wall, 2) if wall else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'round_trips_per_op': round((after['round_trips'] - before['round_trips']) / ops, 3),
+        'bytes_per_op': round((after['bytes'] - before['bytes']) / ops, 1),
+    }
+
+
+def bench_turso(args, turso_options: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    from database_turso import TursoDatabase
+    from forms_manager_turso import TursoFormsManager
+
+    with LibSQLServer(auth_token="benchmark", latency=args.latency_ms / 1000,
+                      jitter=args.jitter_ms / 1000, seed=args.seed) as server:
+        db = TursoDatabase(database_url=server.url, auth_token=server.auth_token, pool_options=turso_options)
+        db.wait_until_ready()
+        manager = TursoFormsManager(db)
+
+        def stats() -> Dict[str, Any]:
+            snapshot = server.stats()
+            return {'round_trips': snapshot['requests'], 'bytes': snapshot['bytes_in'] + snapshot['bytes_out']}
+
+        results = {}
+        try:
+            for operation in OPERATIONS:
+                if operation == 'check_email_exists':
+                    call = lambda n: manager.check_email_exists(f"bench{n}@example.org")
+                else:
+                    method = getattr(manager, operation)
+                    call = lambda n, method=method, operation=operation: method(None, form_data(operation, n))
+                results[operation] = run_phase(call, args.ops, args.concurrency, stats)
+                print_result('turso', operation, results[operation])
+        finally:
+            db.close()
+        return results
+
+
+def bench_gcs(args) -> Dict[str, Dict[str, Any]]:
+    from database import Database
+    from forms_manager import FormsManager
+
+    blob = LocalBlob(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, seed=args.seed)
+    workdir = tempfile.mkdtemp(prefix="bench_gcs_")
+    cwd = os.getcwd()
+    os.chdir(workdir)  # Database keeps its temp copies in the working directory
+    try:
+        manager = FormsManager(Database(blob=blob, cache_dir=workdir))
+
+        def stats() -> Dict[str, Any]:
+            snapshot = blob.stats()
+            return {'round_trips': snapshot['round_trips'], 'bytes': snapshot['bytes_down'] + snapshot['bytes_up']}
+
+        results = {}
+        for operation in OPERATIONS:
+            if operation == 'check_email_exists':
+                continue  # only the Turso manager has it
+            method = getattr(manager, operation)
+            call = lambda n, method=method, operation=operation: method(None, form_data(operation, n))
+            results[operation] = run_phase(call, args.ops, args.concurrency, stats)
+            print_result('gcs', operation, results[operation])
+        return results
+    finally:
+        os.chdir(cwd)
+
+
+def print_result(backend: str, operation: str, result: Dict[str, Any]):
+    print(f"{backend:6} {operation:32} {result['ops_per_sec']:9.1f} ops/s  "
+          f"p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}  p99 {result['p99_ms']:8.2f} ms  "
+          f"{result['round_trips_per_op']:5.2f} rt/op  {result['bytes_per_op']:9.0f} B/op  "
+          f"errors {result['errors']}")
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Describe every metric that got worse than the baseline by more than threshold"""
+    regressions = []
+    for backend, operations in current['results'].items():
+        for operation, result in operations.items():
+            base = baseline.get('results', {}).get(backend, {}).get(operation)
+            if base is None:
+                continue
+            if base['ops_per_sec'] and result['ops_per_sec'] < base['ops_per_sec'] * (1 - threshold):
+                regressions.append(f"{backend}/{operation}: ops_per_sec {base['ops_per_sec']} -> {result['ops_per_sec']}")
+            for metric in REGRESSION_METRICS:
+                if base[metric] and result[metric] > base[metric] * (1 + threshold):
+                    regressions.append(f"{backend}/{operation}: {metric} {base[metric]} -> {result[metric]}")
+            if result['errors'] > base['errors']:
+                regressions.append(f"{backend}/{operation}: errors {base['errors']} -> {result['errors']}")
+    return regressions
+
+
+def parse_option(text: str):
+    """key=value for TursoDatabase pool_options; values are read as JSON when possible"""
+    key, _, value = text.partition('=')
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the form submission data layer against local stand-ins")
+    parser.add_argument("--backend", choices=["turso", "gcs", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=4, help="threads submitting at once")
+    parser.add_argument("--ops", type=int, default=100, help="operations per phase")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated round-trip latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--option", action="append", default=[], metavar="KEY=VALUE",
+                        help="TursoDatabase pool option, e.g. -o replica_path=/tmp/replica.db")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="fail if worse than this baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed regression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    turso_options = dict(parse_option(option) for option in args.option)
+    report: Dict[str, Any] = {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'concurrency': args.concurrency,
+            'ops': args.ops,
+            'latency_ms': args.latency_ms,
+            'jitter_ms': args.jitter_ms,
+            'turso_options': turso_options,
+        },
+        'results': {},
+    }
+
+    if args.backend in ("turso", "both"):
+        report['results']['turso'] = bench_turso(args, turso_options)
+    if args.backend in ("gcs", "both"):
+        report['results']['gcs'] = bench_gcs(args)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
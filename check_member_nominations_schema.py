@@ -58,18 +58,11 @@ def check_and_fix_member_nominations():
         print(colored("\n📋 Current member_nominations table structure:", "blue"))
         result = db.execute_sql("PRAGMA table_info(member_nominations)")
         
-        if db._is_valid_result(result):
-            # Handle nested structure
-            first_result = result['results'][0]
-            if 'results' in first_result:
-                columns_data = first_result['results']['rows']
-            else:
-                columns_data = first_result['rows']
-            
+        if len(result) > 0:
             existing_columns = []
-            for row in columns_data:
-                column_name = row[1]  # column name is at index 1
-                column_type = row[2]  # column type is at index 2
+            for row in result:
+                column_name = row['name']
+                column_type = row['type']
                 existing_columns.append(column_name)
                 print(colored(f"  - {column_name}: {column_type}", "cyan"))
         else:
@@ -130,13 +123,8 @@ def check_and_fix_member_nominations():
         print(colored("\n📊 Final member_nominations count:", "cyan"))
         try:
             result = db.execute_sql("SELECT COUNT(*) FROM member_nominations")
-            if db._is_valid_result(result):
-                # Handle nested structure
-                first_result = result['results'][0]
-                if 'results' in first_result:
-                    count = first_result['results']['rows'][0][0]
-                else:
-                    count = first_result['rows'][0][0]
+            count = result.scalar()
+            if count is not None:
                 print(colored(f"📋 member_nominations table: {count} records", "blue"))
             else:
                 print(colored("⚠️ Could not get count for member_nominations", "yellow"))
@@ -57,19 +57,12 @@ def check_null_constraints():
         print(colored("\n📋 Member_nominations table NOT NULL constraints:", "blue"))
         result = db.execute_sql("PRAGMA table_info(member_nominations)")
         
-        if db._is_valid_result(result):
-            # Handle nested structure
-            first_result = result['results'][0]
-            if 'results' in first_result:
-                columns_data = first_result['results']['rows']
-            else:
-                columns_data = first_result['rows']
-            
+        if len(result) > 0:
             not_null_columns = []
-            for row in columns_data:
-                column_name = row[1]  # column name is at index 1
-                column_type = row[2]  # column type is at index 2
-                not_null = row[3]     # notnull is at index 3
+            for row in result:
+                column_name = row['name']
+                column_type = row['type']
+                not_null = row['notnull']
                 
                 if not_null == 1:  # NOT NULL constraint
                     not_null_columns.append(column_name)
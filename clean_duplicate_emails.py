@@ -46,12 +46,9 @@ def clean_duplicate_emails():
             ORDER BY count DESC
         """)
         
-        if (isinstance(duplicate_result, dict) and 
-            duplicate_result.get('results') and 
-            len(duplicate_result['results']) > 0 and 
-            duplicate_result['results'][0].get('rows')):
+        if len(duplicate_result) > 0:
             
-            duplicate_rows = duplicate_result['results'][0]['rows']
+            duplicate_rows = duplicate_result.rows
             print(colored(f"📊 Found {len(duplicate_rows)} email addresses with duplicates:", "yellow"))
             
             for row in duplicate_rows:
@@ -59,23 +56,26 @@ def clean_duplicate_emails():
                 print(colored(f"  - {email}: {count} entries (IDs: {ids})", "yellow"))
             
             # For each duplicate email, keep only the first (lowest ID) entry
+            all_delete_ids = []
             for row in duplicate_rows:
                 email, count, ids_str = row
                 id_list = [int(id.strip()) for id in ids_str.split(',')]
                 keep_id = min(id_list)  # Keep the oldest entry (lowest ID)
                 delete_ids = [id for id in id_list if id != keep_id]
+                all_delete_ids.extend(delete_ids)
                 
                 print(colored(f"📧 Processing {email}:", "blue"))
                 print(colored(f"  - Keeping ID {keep_id}", "green"))
                 print(colored(f"  - Deleting IDs {delete_ids}", "red"))
-                
-                # Delete the duplicate entries
-                for delete_id in delete_ids:
-                    delete_result = db.execute_sql(
-                        "DELETE FROM membership_applications WHERE id = ?",
-                        [delete_id]
-                    )
-                    print(colored(f"  ✅ Deleted entry ID {delete_id}", "green"))
+            
+            # Delete the duplicate entries in batched transactions rather than one request per ID
+            delete_result = db.executemany(
+                "DELETE FROM membership_applications WHERE id = ?",
+                [[delete_id] for delete_id in all_delete_ids]
+            )
+            print(colored(f"  ✅ Deleted {delete_result['applied']} entries in {delete_result['round_trips']} requests", "green"))
+            for error in delete_result['errors']:
+                print(colored(f"  ❌ Could not delete ID {all_delete_ids[error['index']]}: {error['error']}", "red"))
             
             print(colored(f"🎉 Cleanup completed! Removed {sum(len([int(id.strip()) for id in row[2].split(',')]) - 1 for row in duplicate_rows)} duplicate entries", "green"))
             
@@ -103,12 +103,9 @@ def verify_cleanup():
             HAVING COUNT(*) > 1
         """)
         
-        if (isinstance(duplicate_check, dict) and 
-            duplicate_check.get('results') and 
-            len(duplicate_check['results']) > 0 and 
-            duplicate_check['results'][0].get('rows')):
+        if len(duplicate_check) > 0:
             
-            remaining_duplicates = duplicate_check['results'][0]['rows']
+            remaining_duplicates = duplicate_check.rows
             if remaining_duplicates:
                 print(colored(f"⚠️ Warning: {len(remaining_duplicates)} email addresses still have duplicates", "yellow"))
                 for email, count in remaining_duplicates:
@@ -120,10 +117,8 @@ def verify_cleanup():
             
         # Show total entries
         total_result = db.execute_sql("SELECT COUNT(*) as total FROM membership_applications")
-        if (isinstance(total_result, dict) and 
-            total_result.get('results') and 
-            len(total_result['results']) > 0):
-            total_count = total_result['results'][0]['rows'][0][0]
+        total_count = total_result.scalar()
+        if total_count is not None:
             print(colored(f"📊 Total membership applications: {total_count}", "blue"))
             
     except Exception as e:
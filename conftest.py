@@ -0,0 +1,31 @@
+"""
+Pytest fixtures
+Tests that need a database run against the local libSQL server, so no Turso credentials are required
+"""
+
+import os
+import sys
+
+import pytest
+
+# Tests import modules the way the app does (from the src directory)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from libsql_server import LibSQLServer
+from database_turso import TursoDatabase
+
+
+@pytest.fixture(scope="session")
+def libsql_server():
+    """Local stand-in for Turso, shared by the whole test session"""
+    with LibSQLServer(auth_token="local-test-token") as server:
+        yield server
+
+
+@pytest.fixture
+def db(libsql_server):
+    """TursoDatabase pointed at the local server"""
+    database = TursoDatabase(database_url=libsql_server.url, auth_token=libsql_server.auth_token)
+    database.wait_until_ready()
+    yield database
+    database.close()
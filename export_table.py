@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Export a Turso table to CSV in bounded memory
+Rows are streamed with TursoDatabase.iter_rows and written as they arrive
+
+    python export_table.py membership_applications -o membership.csv
+    python export_table.py research_database --where "publication_year >= ?" --param 2020
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+import toml
+
+# Add src directory to Python path
+sys.path.append('src')
+
+from database_turso import TursoDatabase
+
+EXPORTABLE_TABLES = [
+    'membership_applications',
+    'bank_of_ideas',
+    'general_suggestions',
+    'member_nominations',
+    'research_database',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a Turso table to CSV")
+    parser.add_argument("table", choices=EXPORTABLE_TABLES)
+    parser.add_argument("-o", "--output", help="CSV file (default: stdout)")
+    parser.add_argument("--where", help="SQL condition, with ? placeholders for --param")
+    parser.add_argument("--param", action="append", default=[], help="value for a ? in --where")
+    parser.add_argument("--batch-size", type=int, help="rows per page when the server has no cursor endpoint")
+    args = parser.parse_args()
+
+    database_url = os.environ.get('TURSO_DATABASE_URL')
+    auth_token = os.environ.get('TURSO_AUTH_TOKEN')
+    if not database_url or not auth_token:
+        try:
+            with open('secrets.toml', 'r') as f:
+                secrets = toml.load(f)
+            database_url, auth_token = secrets['turso']['database_url'], secrets['turso']['auth_token']
+        except Exception as e:
+            print(f"❌ Set TURSO_DATABASE_URL and TURSO_AUTH_TOKEN or provide secrets.toml: {e}", file=sys.stderr)
+            sys.exit(1)
+    if database_url.startswith("libsql://"):
+        database_url = database_url.replace("libsql://", "https://")
+
+    sql = f"SELECT * FROM {args.table}"
+    if args.where:
+        sql += f" WHERE {args.where}"
+
+    db = TursoDatabase(database_url=database_url, auth_token=auth_token)
+    output = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        writer = None
+        count = 0
+        for row in db.iter_rows(sql, args.param, batch_size=args.batch_size):
+            if writer is None:
+                writer = csv.writer(output)
+                writer.writerow(row.keys())
+            writer.writerow(list(row))
+            count += 1
+        print(f"✅ Exported {count} rows from {args.table}", file=sys.stderr)
+    finally:
+        if args.output:
+            output.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
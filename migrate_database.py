@@ -33,6 +33,7 @@ except Exception as e:
 
 try:
     from database_turso import TursoDatabase
+    from email_normalization import backfill_normalized_emails
     print(colored("✅ Turso modules imported successfully", "green"))
 except Exception as e:
     print(colored(f"❌ Error importing Turso modules: {e}", "red"))
@@ -123,6 +124,19 @@ def migrate_database():
             else:
                 print(colored(f"⚠️ Error adding created_at to general_suggestions: {e}", "yellow"))
         
+        # Migration 5: Backfill email_normalized (the column and its index are added on connect)
+        print(colored("\n🔄 Migration 5: Backfilling email_normalized...", "blue"))
+        try:
+            db.wait_until_ready()
+            report = backfill_normalized_emails(db)
+            for table, outcome in report.items():
+                print(colored(f"✅ {table}: {outcome['updated']} rows backfilled", "green"))
+                if outcome['conflicting_ids']:
+                    print(colored(f"⚠️ {table}: IDs {outcome['conflicting_ids']} duplicate another application's "
+                                  f"email; run clean_duplicate_emails.py and migrate again", "yellow"))
+        except Exception as e:
+            print(colored(f"❌ Error backfilling email_normalized: {e}", "red"))
+        
         # Final check: Display current record counts
         print(colored("\n📊 Final record counts after migration:", "cyan"))
         tables_to_check = [
@@ -136,13 +150,8 @@ def migrate_database():
         for table in tables_to_check:
             try:
                 result = db.execute_sql(f"SELECT COUNT(*) FROM {table}")
-                if db._is_valid_result(result):
-                    # Handle nested structure
-                    first_result = result['results'][0]
-                    if 'results' in first_result:
-                        count = first_result['results']['rows'][0][0]
-                    else:
-                        count = first_result['rows'][0][0]
+                count = result.scalar()
+                if count is not None:
                     print(colored(f"📋 Table '{table}': {count} records", "blue"))
                 else:
                     print(colored(f"⚠️ Could not get count for table '{table}'", "yellow"))
@@ -1,17 +1,34 @@
 import sqlite3
 import hashlib
+import itertools
 import secrets
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Callable
 import bcrypt
 import jwt
 import requests
 import os
+import random
 import tempfile
 import shutil
+import threading
+import time
 import streamlit as st
 import json
-from termcolor import colored
+try:
+    from src.log_utils import get_logger
+    from src.metrics import REGISTRY
+    from src.turso_retry import is_read_only_sql
+    from src.schema_meta import (SCHEMA_VERSION, SCHEMA_META_DDL, ddl_hash, schema_meta_upsert,
+                                 schema_metadata, metadata_is_current)
+except ImportError:
+    from log_utils import get_logger
+    from metrics import REGISTRY
+    from turso_retry import is_read_only_sql
+    from schema_meta import (SCHEMA_VERSION, SCHEMA_META_DDL, ddl_hash, schema_meta_upsert,
+                             schema_metadata, metadata_is_current)
+
+logger = get_logger(__name__)
 
 # Google Cloud Storage imports
 try:
@@ -19,21 +36,105 @@ try:
     from google.oauth2 import service_account
     GCS_AVAILABLE = True
 except ImportError:
-    print(colored("⚠️ Google Cloud Storage library not available. Using fallback method.", "yellow"))
+    logger.warning("⚠️ Google Cloud Storage library not available. Using fallback method.")
     GCS_AVAILABLE = False
 
+# Local copies of the database object, one file per generation, reused across connections and restarts
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "quran_db_cache")
+
+
+# Conditional uploads: attempts before a commit gives up on a database that keeps changing,
+# and the base of the jittered backoff between them
+DEFAULT_MAX_UPLOAD_ATTEMPTS = 8
+DEFAULT_CONFLICT_BACKOFF = 0.05  # seconds, doubled per attempt
+
+
+class StorageConflict(Exception):
+    """A commit could not be applied on top of the current cloud database"""
+
+
+class StaleReadConflict(StorageConflict):
+    """The database changed under a commit whose writes followed reads; run_write re-runs it"""
+
+
+def _inserted_rowid(conn: sqlite3.Connection, previous: Optional[int]) -> Optional[int]:
+    """SQLite's last_insert_rowid() after a statement that changed rows; previous if it inserted none"""
+    # A plain cursor, so the lookup is not recorded as a read
+    rowid = sqlite3.Cursor(conn).execute("SELECT last_insert_rowid()").fetchone()[0]
+    return rowid or previous
+
+
+class _RecordingCursor(sqlite3.Cursor):
+    """Cursor that keeps its connection's writes, so the transaction can be re-applied on a newer copy"""
+
+    def execute(self, sql, parameters=()):
+        changes = self.connection.total_changes
+        super().execute(sql, parameters)
+        self.connection._record(sql, [parameters], changes)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        changes = self.connection.total_changes
+        super().executemany(sql, seq_of_parameters)
+        self.connection._record(sql, seq_of_parameters, changes)
+        return self
+
+
+class _TempDBConnection(sqlite3.Connection):
+    """sqlite3 connection that can remember the temp file it was opened on and the writes made through it"""
+    _temp_db_path: Optional[str] = None
+    _base_generation: Optional[int] = None  # generation the temp file was copied from (0: no object yet)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writes: List[Tuple[str, list]] = []
+        self.last_insert_rowid: Optional[int] = None
+        self._has_read = False
+        self.writes_follow_reads = False  # replaying the writes would skip the checks that led to them
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or _RecordingCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def _record(self, sql: str, parameter_sets: list, changes_before: int):
+        if is_read_only_sql(sql):
+            self._has_read = True
+            return
+        self.writes_follow_reads = self.writes_follow_reads or self._has_read
+        self.writes.append((sql, parameter_sets))
+        if self.total_changes != changes_before:
+            self.last_insert_rowid = _inserted_rowid(self, self.last_insert_rowid)
+
+
 class Database:
-    def __init__(self, bucket_name: str = "qurancomputing_website", db_filename: str = "quran_institute.db"):
+    def __init__(self, bucket_name: str = "qurancomputing_website", db_filename: str = "quran_institute.db",
+                 blob=None, cache_dir: Optional[str] = None,
+                 max_upload_attempts: int = DEFAULT_MAX_UPLOAD_ATTEMPTS):
         self.bucket_name = bucket_name
         self.db_filename = db_filename
         self.gcs_client = None
         self.bucket = None
-        self.blob = None
+        self.blob = blob  # pass a blob (e.g. local_gcs.LocalBlob) to skip the GCS client
+        self._schema_metadata: Optional[Dict[str, str]] = None  # stamped on every upload
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self._cache_prefix = os.path.join(self.cache_dir, f"{self.bucket_name}_{self.db_filename}")
+        self._cache_lock = threading.Lock()
+        self._cache_stats = {'hits': 0, 'misses': 0}
+        self.max_upload_attempts = max(1, int(max_upload_attempts))
+        self._upload_stats = {'uploads': 0, 'conflicts': 0, 'reapplied': 0, 'reruns': 0, 'failed': 0}
+        self._connection_ids = itertools.count()
         
-        print(colored(f"🗄️ Database: gs://{self.bucket_name}/{self.db_filename}", "cyan"))
+        logger.debug("🗄️ Database: gs://%s/%s", self.bucket_name, self.db_filename)
         
         # Initialize Google Cloud Storage client
-        self._init_gcs_client()
+        if self.blob is None:
+            self._init_gcs_client()
         
         # Initialize database tables (this will create if not exists)
         self.init_database()
@@ -42,12 +143,12 @@ class Database:
         """Initialize Google Cloud Storage client with authentication"""
         try:
             if not GCS_AVAILABLE:
-                print(colored("❌ Google Cloud Storage library not available", "red"))
+                logger.error("❌ Google Cloud Storage library not available")
                 return
                 
             # Try to get credentials from Streamlit secrets
             if hasattr(st, 'secrets') and 'google_credentials' in st.secrets:
-                print(colored("🔐 Using Google credentials from Streamlit secrets", "green"))
+                logger.info("🔐 Using Google credentials from Streamlit secrets")
                 
                 # Get credentials from secrets
                 credentials_info = dict(st.secrets["google_credentials"])
@@ -58,76 +159,341 @@ class Database:
                 self.bucket = self.gcs_client.bucket(self.bucket_name)
                 self.blob = self.bucket.blob(self.db_filename)
                 
-                print(colored("✅ Google Cloud Storage client initialized successfully", "green"))
+                logger.info("✅ Google Cloud Storage client initialized successfully")
                 
             else:
-                print(colored("⚠️ No Google credentials found in Streamlit secrets", "yellow"))
-                print(colored("💡 Add google_credentials to secrets.toml for authenticated access", "blue"))
+                logger.warning("⚠️ No Google credentials found in Streamlit secrets")
+                logger.debug("💡 Add google_credentials to secrets.toml for authenticated access")
                 
         except Exception as e:
-            print(colored(f"❌ Failed to initialize GCS client: {e}", "red"))
+            logger.error("❌ Failed to initialize GCS client: %s", e)
             self.gcs_client = None
             self.bucket = None
     
 
 
-    def get_connection(self):
-        """Get a database connection - downloads from cloud, returns connection"""
-        temp_db_path = f"temp_{self.db_filename}_{os.getpid()}"
+    def _cache_path(self, version: Optional[str]) -> str:
+        """Local copy of one generation; a version-less blob gets a single file that is always refreshed"""
+        tag = "".join(c if c.isalnum() else "_" for c in str(version)) if version is not None else "current"
+        return f"{self._cache_prefix}.{tag}"
+
+    def _blob_handle(self):
+        """A handle of this call's own on the database object
+
+        Blob attributes (generation, metadata) describe what that handle last
+        saw, so concurrent threads sharing one would read each other's.
+        bucket.blob() makes a new handle without a request.
+        """
+        bucket = getattr(self.blob, 'bucket', None)
+        if bucket is not None and hasattr(bucket, 'blob'):
+            return bucket.blob(self.blob.name)
+        return self.blob
+
+    def _cached_copy(self) -> Tuple[Optional[str], Optional[int]]:
+        """Local copy of the current object and its generation, downloaded only when the generation changed
+
+        (None, 0) when the object does not exist yet. The download is
+        conditional on the generation the metadata call saw, so the file is
+        named after the content it really holds.
+        """
+        for attempt in range(3):
+            blob = self._blob_handle()
+            try:
+                blob.reload()
+            except Exception as e:
+                if getattr(e, 'code', None) == 404:
+                    return None, 0
+                raise
+            generation = getattr(blob, 'generation', None)
+            version = generation or getattr(blob, 'etag', None)
+            cache_path = self._cache_path(version)
+            if version is not None and os.path.exists(cache_path):
+                with self._cache_lock:
+                    self._cache_stats['hits'] += 1
+                REGISTRY.record_storage_cache(hit=True)
+                return cache_path, generation
+
+            with self._cache_lock:
+                # Another thread may have fetched this generation while we waited
+                if version is not None and os.path.exists(cache_path):
+                    self._cache_stats['hits'] += 1
+                    REGISTRY.record_storage_cache(hit=True)
+                    return cache_path, generation
+                os.makedirs(self.cache_dir, exist_ok=True)
+                part_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.part"
+                logger.debug("⬇️ Downloading database generation %s from cloud...", version)
+                started = time.perf_counter()
+                try:
+                    if generation is not None:
+                        blob.download_to_filename(part_path, if_generation_match=generation)
+                    else:
+                        blob.download_to_filename(part_path)
+                except Exception as e:
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+                    if getattr(e, 'code', None) == 412 and attempt < 2:
+                        # Replaced between the metadata call and the download: look again
+                        logger.debug("🔄 Database changed during download, retrying")
+                        continue
+                    REGISTRY.record_storage("download", time.perf_counter() - started, error=True)
+                    raise
+                REGISTRY.record_storage("download", time.perf_counter() - started)
+                REGISTRY.record_payload("gcs", 0, os.path.getsize(part_path))
+                os.replace(part_path, cache_path)
+                self._cache_stats['misses'] += 1
+                REGISTRY.record_storage_cache(hit=False)
+                self._remove_stale_copies(cache_path)
+                logger.info("✅ Database downloaded successfully")
+                return cache_path, generation
+        raise StorageConflict("Database kept changing while it was being downloaded")
+
+    def _remove_stale_copies(self, keep: str):
+        """Delete the copies of older generations (ignored while another process still has one open)"""
+        directory, prefix = os.path.split(self._cache_prefix)
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.startswith(prefix + ".") and path != keep and not name.endswith(".part"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Connections served from the local copy (hits) and ones that downloaded (misses)"""
+        with self._cache_lock:
+            return dict(self._cache_stats)
+
+    def upload_stats(self) -> Dict[str, int]:
+        """Uploads, generation conflicts, transactions re-applied after one, and commits that gave up"""
+        with self._cache_lock:
+            return dict(self._upload_stats)
+
+    def get_connection(self, read_only: bool = False):
+        """Get a database connection on the current version of the cloud database
+
+        The object is only downloaded when its generation changed since the
+        last download. read_only connections open the local copy directly;
+        writers get their own copy to modify and upload.
+        """
+        # One file per connection so concurrent sessions do not overwrite each other's copy
+        temp_db_path = f"temp_{self.db_filename}_{os.getpid()}_{threading.get_ident()}_{next(self._connection_ids)}"
         
-        try:
-            # Download database from cloud storage
-            if self.blob and self.blob.exists():
-                print(colored(f"⬇️ Downloading database from cloud for read/write...", "yellow"))
-                self.blob.download_to_filename(temp_db_path)
-                print(colored("✅ Database downloaded successfully", "green"))
-            else:
-                print(colored("📝 Creating new database file", "blue"))
-                # Create empty database file
-                open(temp_db_path, 'a').close()
-                
-        except Exception as e:
-            print(colored(f"❌ Error downloading database: {e}", "red"))
-            # Create empty database file as fallback
+        for attempt in range(2):
+            cache_path, generation = None, None
+            try:
+                if self.blob:
+                    cache_path, generation = self._cached_copy()
+                if cache_path is None:
+                    logger.debug("📝 Creating new database file")
+                    
+            except Exception as e:
+                logger.error("❌ Error downloading database: %s", e)
+                if hasattr(self.blob, 'generation'):
+                    # Upload the empty fallback only if there really is no object, else merge into it
+                    generation = 0
+            
+            try:
+                if read_only and cache_path is not None:
+                    return sqlite3.connect(f"file:{cache_path}?mode=ro", uri=True, factory=_TempDBConnection)
+                if cache_path is not None:
+                    shutil.copyfile(cache_path, temp_db_path)
+                break
+            except (OSError, sqlite3.OperationalError):
+                # A newer generation replaced this copy between the check and the open
+                if attempt:
+                    raise
+        
+        if cache_path is None:
+            # Create empty database file (also the fallback when the download failed)
             open(temp_db_path, 'a').close()
         
         # Return connection with the temp file path stored for later upload
-        conn = sqlite3.connect(temp_db_path)
+        conn = sqlite3.connect(temp_db_path, factory=_TempDBConnection)
         conn._temp_db_path = temp_db_path  # Store path for upload later
+        conn._base_generation = generation  # Uploads are conditional on it
         return conn
     
-    def commit_and_upload(self, conn):
-        """Commit changes and immediately upload to cloud storage"""
+    def commit_and_upload(self, conn) -> Optional[int]:
+        """Commit changes and immediately upload to cloud storage
+
+        The upload only replaces the generation the connection's copy was made
+        from. If another worker uploaded in between, the connection's writes
+        are re-applied on a fresh copy of the current database and the upload
+        is tried again, up to max_upload_attempts times; StorageConflict is
+        raised when that fails. Writes made after a read are not replayed, as
+        what they were based on may have changed: StaleReadConflict is raised
+        instead, and run_write() runs the whole operation again. Any other
+        upload error is raised too, as the changes did not reach the cloud.
+        Returns the rowid of the connection's last INSERT as it ended up in
+        the uploaded database.
+        """
+        retry_path = None
         try:
             # Commit the transaction
             conn.commit()
-            print(colored("✅ Database transaction committed", "green"))
+            logger.info("✅ Database transaction committed")
             
             # Get the temp file path
             temp_db_path = getattr(conn, '_temp_db_path', None)
             if not temp_db_path:
-                print(colored("❌ No temp database path found", "red"))
-                return
+                logger.error("❌ No temp database path found")
+                return conn.last_insert_rowid
             
             # Upload to cloud storage immediately
             if self.blob:
-                print(colored("⬆️ Uploading updated database to cloud...", "yellow"))
-                self.blob.upload_from_filename(temp_db_path)
-                print(colored("✅ Database uploaded to cloud successfully", "green"))
+                logger.debug("⬆️ Uploading updated database to cloud...")
+                upload_path, generation = temp_db_path, conn._base_generation
+                for attempt in range(1, self.max_upload_attempts + 1):
+                    blob = self._upload(upload_path, generation)
+                    if blob is not None:
+                        break
+                    with self._cache_lock:
+                        self._upload_stats['conflicts'] += 1
+                    if conn.writes_follow_reads:
+                        raise StaleReadConflict("Database changed after this commit read from it")
+                    if attempt == self.max_upload_attempts:
+                        REGISTRY.record_storage_conflict("failed")
+                        with self._cache_lock:
+                            self._upload_stats['failed'] += 1
+                        raise StorageConflict(
+                            f"Database changed on every one of {attempt} upload attempts; changes not saved")
+                    REGISTRY.record_storage_conflict("retried")
+                    logger.info("🔄 Database changed since it was downloaded, re-applying %s writes (attempt %s)",
+                                len(conn.writes), attempt)
+                    time.sleep(random.uniform(0, DEFAULT_CONFLICT_BACKOFF * 2 ** (attempt - 1)))
+                    retry_path = f"{temp_db_path}.retry"
+                    generation = self._reapply(conn, retry_path)
+                    upload_path = retry_path
+                logger.info("✅ Database uploaded to cloud successfully")
+                self._keep_uploaded_copy(upload_path, blob)
             else:
-                print(colored("⚠️ No cloud storage configured - changes saved locally only", "yellow"))
+                logger.warning("⚠️ No cloud storage configured - changes saved locally only")
                 
+        except StorageConflict:
+            raise
         except Exception as e:
-            print(colored(f"❌ Error uploading database: {e}", "red"))
+            logger.error("❌ Error uploading database: %s", e)
+            with self._cache_lock:
+                self._upload_stats['failed'] += 1
+            raise
         finally:
-            # Clean up temp file
-            temp_db_path = getattr(conn, '_temp_db_path', None)
-            if temp_db_path and os.path.exists(temp_db_path):
-                try:
-                    os.remove(temp_db_path)
-                    print(colored("🧹 Temporary database file cleaned up", "blue"))
-                except:
-                    pass
+            # Clean up temp files
+            for path in (getattr(conn, '_temp_db_path', None), retry_path):
+                if path and os.path.exists(path):
+                    try:
+                        os.remove(path)
+                        logger.debug("🧹 Temporary database file cleaned up")
+                    except:
+                        pass
+        return conn.last_insert_rowid
+    
+    def run_write(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run operation(conn) on a fresh connection and return its result
+
+        For read-then-write sequences: operation reads, writes and calls
+        commit_and_upload itself. If another worker uploaded first, it is run
+        again from the start on the new database, so its checks see the
+        other worker's changes, up to max_upload_attempts times.
+        """
+        for attempt in range(1, self.max_upload_attempts + 1):
+            conn = self.get_connection()
+            try:
+                return operation(conn)
+            except StaleReadConflict:
+                if attempt == self.max_upload_attempts:
+                    REGISTRY.record_storage_conflict("failed")
+                    with self._cache_lock:
+                        self._upload_stats['failed'] += 1
+                    raise
+                REGISTRY.record_storage_conflict("retried")
+                with self._cache_lock:
+                    self._upload_stats['reruns'] += 1
+                logger.info("🔄 Database changed since it was read, running the operation again (attempt %s)",
+                            attempt)
+                time.sleep(random.uniform(0, DEFAULT_CONFLICT_BACKOFF * 2 ** (attempt - 1)))
+            finally:
+                self.close_connection(conn)
+    
+    def _upload(self, path: str, generation: Optional[int]):
+        """Upload path if the object is still at generation; the handle it used, or None on a conflict"""
+        blob = self._blob_handle()
+        if self._schema_metadata:
+            # Keep the schema stamp, or the next start would re-run the DDL
+            blob.metadata = {**(blob.metadata or {}), **self._schema_metadata}
+        started = time.perf_counter()
+        try:
+            if generation is not None:
+                blob.upload_from_filename(path, if_generation_match=generation)
+            else:
+                blob.upload_from_filename(path)
+        except Exception as e:
+            if getattr(e, 'code', None) == 412:
+                REGISTRY.record_storage("upload", time.perf_counter() - started)
+                return None
+            REGISTRY.record_storage("upload", time.perf_counter() - started, error=True)
+            raise
+        REGISTRY.record_storage("upload", time.perf_counter() - started)
+        REGISTRY.record_payload("gcs", os.path.getsize(path), 0)
+        with self._cache_lock:
+            self._upload_stats['uploads'] += 1
+        return blob
+    
+    def _reapply(self, conn, retry_path: str) -> int:
+        """Run conn's writes again on a copy of the current database at retry_path; returns its generation"""
+        started = time.perf_counter()
+        try:
+            cache_path, generation = self._cached_copy()
+        except Exception as e:
+            with self._cache_lock:
+                self._upload_stats['failed'] += 1
+            REGISTRY.record_storage_conflict("failed")
+            raise StorageConflict(f"Could not download the current database to merge into: {e}") from e
+        if cache_path is not None:
+            shutil.copyfile(cache_path, retry_path)
+        else:
+            open(retry_path, 'w').close()
+        retry = sqlite3.connect(retry_path)
+        try:
+            cursor = retry.cursor()
+            last_insert_rowid = None
+            for sql, parameter_sets in conn.writes:
+                changes = retry.total_changes
+                if len(parameter_sets) == 1:
+                    cursor.execute(sql, parameter_sets[0])
+                else:
+                    cursor.executemany(sql, parameter_sets)
+                if retry.total_changes != changes:
+                    last_insert_rowid = _inserted_rowid(retry, last_insert_rowid)
+            conn.last_insert_rowid = last_insert_rowid
+            retry.commit()
+        except sqlite3.Error as e:
+            # e.g. a UNIQUE constraint: someone else's write took what this one wanted
+            with self._cache_lock:
+                self._upload_stats['failed'] += 1
+            REGISTRY.record_storage_conflict("failed")
+            raise StorageConflict(f"Changes conflict with the current database: {e}") from e
+        finally:
+            retry.close()
+        REGISTRY.record_storage("reapply", time.perf_counter() - started)
+        with self._cache_lock:
+            self._upload_stats['reapplied'] += 1
+        return generation
+    
+    def _keep_uploaded_copy(self, path: str, blob):
+        """Cache what was just uploaded under its new generation, so the next connection skips the download"""
+        version = getattr(blob, 'generation', None) or getattr(blob, 'etag', None)
+        if version is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cache_path = self._cache_path(version)
+            part_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.part"
+            shutil.copyfile(path, part_path)
+            with self._cache_lock:
+                os.replace(part_path, cache_path)
+                self._remove_stale_copies(cache_path)
+        except OSError as e:
+            logger.warning("⚠️ Could not cache the uploaded database: %s", e)
     
     def close_connection(self, conn):
         """Close connection and clean up temp file"""
@@ -138,224 +504,256 @@ class Database:
             # Clean up temp file
             if temp_db_path and os.path.exists(temp_db_path):
                 os.remove(temp_db_path)
-                print(colored("🧹 Connection closed and temp file cleaned up", "blue"))
+                logger.debug("🧹 Connection closed and temp file cleaned up")
                 
         except Exception as e:
-            print(colored(f"⚠️ Error closing connection: {e}", "yellow"))
+            logger.warning("⚠️ Error closing connection: %s", e)
+    
+    def _schema_is_current(self, schema_hash: str) -> bool:
+        """Check the schema stamp in the blob's metadata: one small GET, no download"""
+        if not self.blob:
+            return False
+        blob = self._blob_handle()
+        try:
+            blob.reload()
+        except Exception as e:
+            # NotFound on a fresh bucket, or no permission to read metadata
+            logger.debug("Schema metadata unavailable, applying DDL: %s", e)
+            return False
+        return metadata_is_current(blob.metadata, schema_hash)
     
     def init_database(self):
         """Initialize database with all required tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Users table for authentication
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                first_name TEXT NOT NULL,
-                last_name TEXT NOT NULL,
-                is_verified BOOLEAN DEFAULT FALSE,
-                verification_token TEXT,
-                reset_token TEXT,
-                reset_token_expires DATETIME,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Session tokens table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS session_tokens (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                token TEXT UNIQUE NOT NULL,
-                expires_at DATETIME NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Membership applications table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS membership_applications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                first_name TEXT NOT NULL,
-                middle_name TEXT,
-                last_name TEXT NOT NULL,
-                email TEXT NOT NULL,
-                phone_number TEXT NOT NULL,
-                date_of_birth DATE,
-                gender TEXT,
-                nationality TEXT,
-                address TEXT,
-                city TEXT,
-                state_province TEXT,
-                country TEXT,
-                postal_code TEXT,
-                highest_degree TEXT NOT NULL,
-                field_of_study TEXT,
-                institution TEXT,
-                graduation_year INTEGER,
-                current_occupation TEXT,
-                organization TEXT,
-                position TEXT,
-                years_of_experience INTEGER DEFAULT 0,
-                primary_research_area TEXT,
-                secondary_research_area TEXT,
-                previous_publications TEXT,
-                current_research_projects TEXT,
-                programming_languages TEXT,
-                technical_skills TEXT,
-                software_proficiency TEXT,
-                membership_type TEXT DEFAULT 'individual',
-                how_did_you_hear TEXT,
-                motivation TEXT,
-                expected_contributions TEXT,
-                status TEXT DEFAULT 'Pending',
-                application_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                reviewed_at DATETIME,
-                reviewed_by INTEGER,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (reviewed_by) REFERENCES users (id)
-            )
-        ''')
-        
-        # Bank of Ideas (Research Project Suggestions) table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bank_of_ideas (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                email TEXT NOT NULL,
-                submitter_name TEXT NOT NULL,
-                title_degrees TEXT NOT NULL,
-                project_title TEXT NOT NULL,
-                project_nature TEXT NOT NULL,
-                project_nature_other TEXT,
-                project_type TEXT NOT NULL,
-                project_type_other TEXT,
-                brief_description TEXT NOT NULL,
-                specialization_area TEXT NOT NULL,
-                objectives TEXT NOT NULL,
-                benefits TEXT NOT NULL,
-                web_links TEXT,
-                additional_notes TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Member Nominations table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS member_nominations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nominator_user_id INTEGER,
-                nominator_email TEXT NOT NULL,
-                nominee_full_name TEXT NOT NULL,
-                nominee_place_of_work TEXT NOT NULL,
-                nominee_country TEXT NOT NULL,
-                nominee_address TEXT,
-                nominee_phone TEXT NOT NULL,
-                nominee_url_link TEXT,
-                nominee_email TEXT NOT NULL,
-                nominee_specialization TEXT NOT NULL,
-                nominee_qualifications TEXT NOT NULL,
-                nominating_member_name TEXT NOT NULL,
-                status TEXT DEFAULT 'Pending',
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                reviewed_at DATETIME,
-                reviewed_by INTEGER,
-                FOREIGN KEY (nominator_user_id) REFERENCES users (id),
-                FOREIGN KEY (reviewed_by) REFERENCES users (id)
-            )
-        ''')
-        
-        # Research Database table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS research_database (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                publication_type TEXT NOT NULL,
-                paper_title TEXT NOT NULL,
-                conference_journal_book_title TEXT NOT NULL,
-                publisher_name TEXT NOT NULL,
-                publication_year TEXT NOT NULL,
-                keywords TEXT,
-                abstract TEXT,
-                paper_url TEXT,
-                article_classification TEXT,
-                article_second_classification TEXT,
-                article_third_classification TEXT,
-                status TEXT DEFAULT 'Pending',
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                reviewed_at DATETIME,
-                reviewed_by INTEGER,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (reviewed_by) REFERENCES users (id)
-            )
-        ''')
+        schema_statements = [
+            # Users table for authentication
+            '''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    email TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    first_name TEXT NOT NULL,
+                    last_name TEXT NOT NULL,
+                    is_verified BOOLEAN DEFAULT FALSE,
+                    verification_token TEXT,
+                    reset_token TEXT,
+                    reset_token_expires DATETIME,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''',
+            
+            # Session tokens table
+            '''
+                CREATE TABLE IF NOT EXISTS session_tokens (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    token TEXT UNIQUE NOT NULL,
+                    expires_at DATETIME NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''',
+            
+            # Membership applications table
+            '''
+                CREATE TABLE IF NOT EXISTS membership_applications (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    first_name TEXT NOT NULL,
+                    middle_name TEXT,
+                    last_name TEXT NOT NULL,
+                    email TEXT NOT NULL,
+                    phone_number TEXT NOT NULL,
+                    date_of_birth DATE,
+                    gender TEXT,
+                    nationality TEXT,
+                    address TEXT,
+                    city TEXT,
+                    state_province TEXT,
+                    country TEXT,
+                    postal_code TEXT,
+                    highest_degree TEXT NOT NULL,
+                    field_of_study TEXT,
+                    institution TEXT,
+                    graduation_year INTEGER,
+                    current_occupation TEXT,
+                    organization TEXT,
+                    position TEXT,
+                    years_of_experience INTEGER DEFAULT 0,
+                    primary_research_area TEXT,
+                    secondary_research_area TEXT,
+                    previous_publications TEXT,
+                    current_research_projects TEXT,
+                    programming_languages TEXT,
+                    technical_skills TEXT,
+                    software_proficiency TEXT,
+                    membership_type TEXT DEFAULT 'individual',
+                    how_did_you_hear TEXT,
+                    motivation TEXT,
+                    expected_contributions TEXT,
+                    status TEXT DEFAULT 'Pending',
+                    application_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    reviewed_at DATETIME,
+                    reviewed_by INTEGER,
+                    FOREIGN KEY (user_id) REFERENCES users (id),
+                    FOREIGN KEY (reviewed_by) REFERENCES users (id)
+                )
+            ''',
+            
+            # Bank of Ideas (Research Project Suggestions) table
+            '''
+                CREATE TABLE IF NOT EXISTS bank_of_ideas (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    email TEXT NOT NULL,
+                    submitter_name TEXT NOT NULL,
+                    title_degrees TEXT NOT NULL,
+                    project_title TEXT NOT NULL,
+                    project_nature TEXT NOT NULL,
+                    project_nature_other TEXT,
+                    project_type TEXT NOT NULL,
+                    project_type_other TEXT,
+                    brief_description TEXT NOT NULL,
+                    specialization_area TEXT NOT NULL,
+                    objectives TEXT NOT NULL,
+                    benefits TEXT NOT NULL,
+                    web_links TEXT,
+                    additional_notes TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''',
+            
+            # Member Nominations table
+            '''
+                CREATE TABLE IF NOT EXISTS member_nominations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    nominator_user_id INTEGER,
+                    nominator_email TEXT NOT NULL,
+                    nominee_full_name TEXT NOT NULL,
+                    nominee_place_of_work TEXT NOT NULL,
+                    nominee_country TEXT NOT NULL,
+                    nominee_address TEXT,
+                    nominee_phone TEXT NOT NULL,
+                    nominee_url_link TEXT,
+                    nominee_email TEXT NOT NULL,
+                    nominee_specialization TEXT NOT NULL,
+                    nominee_qualifications TEXT NOT NULL,
+                    nominating_member_name TEXT NOT NULL,
+                    status TEXT DEFAULT 'Pending',
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    reviewed_at DATETIME,
+                    reviewed_by INTEGER,
+                    FOREIGN KEY (nominator_user_id) REFERENCES users (id),
+                    FOREIGN KEY (reviewed_by) REFERENCES users (id)
+                )
+            ''',
+            
+            # Research Database table
+            '''
+                CREATE TABLE IF NOT EXISTS research_database (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    publication_type TEXT NOT NULL,
+                    paper_title TEXT NOT NULL,
+                    conference_journal_book_title TEXT NOT NULL,
+                    publisher_name TEXT NOT NULL,
+                    publication_year TEXT NOT NULL,
+                    keywords TEXT,
+                    abstract TEXT,
+                    paper_url TEXT,
+                    article_classification TEXT,
+                    article_second_classification TEXT,
+                    article_third_classification TEXT,
+                    status TEXT DEFAULT 'Pending',
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    reviewed_at DATETIME,
+                    reviewed_by INTEGER,
+                    FOREIGN KEY (user_id) REFERENCES users (id),
+                    FOREIGN KEY (reviewed_by) REFERENCES users (id)
+                )
+            ''',
+            
+            # General Suggestions table
+            '''
+                CREATE TABLE IF NOT EXISTS general_suggestions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    email TEXT NOT NULL,
+                    full_name TEXT NOT NULL,
+                    suggestion_type TEXT NOT NULL,
+                    suggestion_title TEXT NOT NULL,
+                    suggestion_description TEXT NOT NULL,
+                    priority_level TEXT,
+                    implementation_timeline TEXT,
+                    additional_comments TEXT,
+                    status TEXT DEFAULT 'Pending',
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    reviewed_at DATETIME,
+                    reviewed_by INTEGER,
+                    FOREIGN KEY (user_id) REFERENCES users (id),
+                    FOREIGN KEY (reviewed_by) REFERENCES users (id)
+                )
+            ''',
+            
+            # Research Authors table (for multi-author papers in research database)
+            '''
+                CREATE TABLE IF NOT EXISTS research_authors (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    research_id INTEGER NOT NULL,
+                    author_name TEXT NOT NULL,
+                    author_email TEXT,
+                    author_affiliation TEXT,
+                    author_order INTEGER DEFAULT 1,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (research_id) REFERENCES research_database (id)
+                )
+            ''',
+            
+            # Form submissions log table
+            '''
+                CREATE TABLE IF NOT EXISTS form_submissions_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    form_type TEXT NOT NULL,
+                    submission_id INTEGER NOT NULL,
+                    user_id INTEGER,
+                    ip_address TEXT,
+                    user_agent TEXT,
+                    submission_data TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''',
+        ]
         
-        # General Suggestions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS general_suggestions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                email TEXT NOT NULL,
-                full_name TEXT NOT NULL,
-                suggestion_type TEXT NOT NULL,
-                suggestion_title TEXT NOT NULL,
-                suggestion_description TEXT NOT NULL,
-                priority_level TEXT,
-                implementation_timeline TEXT,
-                additional_comments TEXT,
-                status TEXT DEFAULT 'Pending',
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                reviewed_at DATETIME,
-                reviewed_by INTEGER,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (reviewed_by) REFERENCES users (id)
-            )
-        ''')
+        schema_hash = ddl_hash(schema_statements)
+        if self._schema_is_current(schema_hash):
+            logger.debug("✅ Schema v%s already applied, skipping download and DDL", SCHEMA_VERSION)
+            self._schema_metadata = schema_metadata(schema_hash)
+            return
         
-        # Research Authors table (for multi-author papers in research database)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS research_authors (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                research_id INTEGER NOT NULL,
-                author_name TEXT NOT NULL,
-                author_email TEXT,
-                author_affiliation TEXT,
-                author_order INTEGER DEFAULT 1,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (research_id) REFERENCES research_database (id)
-            )
-        ''')
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
-        # Form submissions log table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS form_submissions_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                form_type TEXT NOT NULL,
-                submission_id INTEGER NOT NULL,
-                user_id INTEGER,
-                ip_address TEXT,
-                user_agent TEXT,
-                submission_data TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
+        for statement in schema_statements + [SCHEMA_META_DDL]:
+            cursor.execute(statement)
+        cursor.execute(*schema_meta_upsert(schema_hash))
         
+        # Stamp the uploaded blob so the next start can skip all of this
+        self._schema_metadata = schema_metadata(schema_hash)
         self.commit_and_upload(conn)
         self.close_connection(conn)
     
     # User management methods
     def create_user(self, email: str, password: str, first_name: str, last_name: str) -> Dict[str, Any]:
         """Create a new user"""
-        try:
-            conn = self.get_connection()
+        # Hash password
+        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        
+        # Generate verification token
+        verification_token = secrets.token_urlsafe(32)
+        
+        def create(conn) -> Dict[str, Any]:
             cursor = conn.cursor()
             
             # Check if user already exists
@@ -363,31 +761,24 @@ class Database:
             if cursor.fetchone():
                 return {'success': False, 'error': 'User already exists'}
             
-            # Hash password
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            
-            # Generate verification token
-            verification_token = secrets.token_urlsafe(32)
-            
             # Insert user
             cursor.execute('''
                 INSERT INTO users (email, password_hash, first_name, last_name, verification_token)
                 VALUES (?, ?, ?, ?, ?)
             ''', (email, password_hash, first_name, last_name, verification_token))
             
-            user_id = cursor.lastrowid
-            self.commit_and_upload(conn)
-            self.close_connection(conn)
-            
+            user_id = self.commit_and_upload(conn)
             return {'success': True, 'user_id': user_id, 'verification_token': verification_token}
-            
+        
+        try:
+            # The existence check is re-run if another worker commits first
+            return self.run_write(create)
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     def authenticate_user(self, email: str, password: str) -> Dict[str, Any]:
         """Authenticate user login"""
-        try:
-            conn = self.get_connection()
+        def authenticate(conn) -> Dict[str, Any]:
             cursor = conn.cursor()
             
             cursor.execute("SELECT id, password_hash, first_name, last_name, is_verified FROM users WHERE email = ?", (email,))
@@ -411,7 +802,6 @@ class Database:
             ''', (user_id, token, expires_at))
             
             self.commit_and_upload(conn)
-            self.close_connection(conn)
             
             return {
                 'success': True,
@@ -421,14 +811,16 @@ class Database:
                 'last_name': last_name,
                 'is_verified': is_verified
             }
-            
+        
+        try:
+            return self.run_write(authenticate)
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     def get_user_by_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Get user by session token"""
         try:
-            conn = self.get_connection()
+            conn = self.get_connection(read_only=True)
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -6,40 +6,111 @@ Direct connections to cloud SQLite without file downloads/uploads
 import streamlit as st
 import requests
 import json
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator, Iterable, Sequence, Tuple
 from datetime import datetime, timedelta
 import hashlib
+import re
 import secrets
+import itertools
+import threading
+import time
 import bcrypt
 import jwt
-from termcolor import colored
+from contextlib import contextmanager
+
+try:
+    from src.turso_transport import TursoTransport
+    from src.hrana_client import HranaStream, HranaSession, SqlRegistry, HranaCursorUnsupported
+    from src.turso_results import ResultSet, Row
+    from src.turso_retry import statements_idempotent, statements_read_only
+    from src.turso_replica import LocalReplica, DEFAULT_REPLICA_SYNC_INTERVAL, DEFAULT_REPLICA_MAX_STALENESS
+    from src.turso_routing import ReadRouter
+    from src.submission_journal import (SubmissionJournal, SUBMISSION_KEYS_DDL, DEFAULT_JOURNAL_FLUSH_INTERVAL,
+                                        DEFAULT_JOURNAL_BATCH_SIZE, DEFAULT_JOURNAL_RETENTION)
+    from src.query_cache import QueryCache
+    from src.email_normalization import normalized_email_index_ddl, missing_column_ddl, backfill_normalized_emails
+    from src.schema_meta import (SCHEMA_VERSION, SCHEMA_META_DDL, SCHEMA_META_SELECT, ddl_hash,
+                                 schema_is_current, schema_meta_upsert)
+    from src.metrics import REGISTRY
+    from src.log_utils import get_logger
+except ImportError:
+    from turso_transport import TursoTransport
+    from hrana_client import HranaStream, HranaSession, SqlRegistry, HranaCursorUnsupported
+    from turso_results import ResultSet, Row
+    from turso_retry import statements_idempotent, statements_read_only
+    from turso_replica import LocalReplica, DEFAULT_REPLICA_SYNC_INTERVAL, DEFAULT_REPLICA_MAX_STALENESS
+    from turso_routing import ReadRouter
+    from submission_journal import (SubmissionJournal, SUBMISSION_KEYS_DDL, DEFAULT_JOURNAL_FLUSH_INTERVAL,
+                                    DEFAULT_JOURNAL_BATCH_SIZE, DEFAULT_JOURNAL_RETENTION)
+    from query_cache import QueryCache
+    from email_normalization import normalized_email_index_ddl, missing_column_ddl, backfill_normalized_emails
+    from schema_meta import (SCHEMA_VERSION, SCHEMA_META_DDL, SCHEMA_META_SELECT, ddl_hash,
+                             schema_is_current, schema_meta_upsert)
+    from metrics import REGISTRY
+    from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# How long a query waits for the background warm-up (connection probe and
+# schema check) before giving up; overridable as [turso] warmup_timeout
+DEFAULT_WARMUP_TIMEOUT = 30.0
+
+# Rows per page when iter_rows falls back to keyset pagination; [turso] iter_batch_size
+DEFAULT_ITER_BATCH_SIZE = 500
+
+_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# Rows per transaction in executemany; [turso] executemany_chunk_size
+DEFAULT_EXECUTEMANY_CHUNK_SIZE = 500
+
+# Idle Hrana sessions kept for the next stored-SQL call; [turso] hrana_session_pool_size
+DEFAULT_SESSION_POOL_SIZE = 4
+
+# SQLite's limit on ? parameters in one statement (SQLITE_MAX_VARIABLE_NUMBER since 3.32, libSQL included)
+SQLITE_MAX_VARIABLES = 32766
+
+# A single-row INSERT that executemany can turn into a multi-row VALUES list
+_SINGLE_ROW_INSERT_PATTERN = re.compile(
+    r"(?is)^\s*((?:insert|replace)\b.*?\bvalues\s*)(\(\s*\?(?:\s*,\s*\?)*\s*\))\s*;?\s*$"
+)
+
+class TursoStatementError(Exception):
+    """Raised when a statement inside a transactional batch fails"""
+    
+    def __init__(self, index: int, message: str):
+        super().__init__(f"Statement {index} failed: {message}")
+        self.index = index
+        self.message = message
 
 class TursoDatabase:
-    def __init__(self, database_url: str = None, auth_token: str = None):
+    def __init__(self, database_url: str = None, auth_token: str = None, pool_options: Dict[str, Any] = None):
         """Initialize Turso database connection"""
+        turso_config = dict(pool_options or {})
+        
         # Get connection details from Streamlit secrets or parameters
         if hasattr(st, 'secrets') and 'turso' in st.secrets:
+            turso_config = {**dict(st.secrets["turso"]), **turso_config}
             raw_url = st.secrets["turso"]["database_url"]
             self.auth_token = st.secrets["turso"]["auth_token"]
-            print(colored("🔐 Using Turso credentials from Streamlit secrets", "green"))
-            print(colored(f"🗄️ Raw Database URL: {raw_url}", "cyan"))
-            print(colored(f"🔑 Auth token length: {len(self.auth_token) if self.auth_token else 0}", "cyan"))
+            logger.info("🔐 Using Turso credentials from Streamlit secrets")
+            logger.debug("🗄️ Raw Database URL: %s", raw_url)
+            logger.debug("🔑 Auth token length: %s", len(self.auth_token) if self.auth_token else 0)
             
             # Convert libSQL URL to HTTPS URL for HTTP API
             if raw_url.startswith("libsql://"):
                 self.database_url = raw_url.replace("libsql://", "https://")
-                print(colored(f"🔄 Converted libSQL to HTTPS: {self.database_url}", "blue"))
+                logger.debug("🔄 Converted libSQL to HTTPS: %s", self.database_url)
             else:
                 self.database_url = raw_url
                 
         else:
             self.database_url = database_url
             self.auth_token = auth_token
-            print(colored("⚠️ No Turso credentials in secrets, using parameters", "yellow"))
+            logger.warning("⚠️ No Turso credentials in secrets, using parameters")
         
         if not self.database_url or not self.auth_token:
             error_msg = "❌ Missing Turso credentials! Please check your secrets configuration."
-            print(colored(error_msg, "red"))
+            logger.error(error_msg)
             raise ValueError(error_msg)
         
         self.headers = {
@@ -47,34 +118,144 @@ class TursoDatabase:
             "Content-Type": "application/json"
         }
         
-        print(colored(f"🗄️ Final Database URL: {self.database_url}", "cyan"))
-        print(colored("🚀 Initializing database connection...", "blue"))
+        # One pooled transport per instance; get_database() shares it across sessions
+        self.transport = TursoTransport.from_config(self.headers, turso_config)
+        self.hrana_version = int(turso_config.get('hrana_version', 3))
+        self.iter_batch_size = int(turso_config.get('iter_batch_size', DEFAULT_ITER_BATCH_SIZE))
+        self.executemany_chunk_size = int(turso_config.get('executemany_chunk_size', DEFAULT_EXECUTEMANY_CHUNK_SIZE))
+        self._cursor_supported = self.hrana_version >= 3
+        
+        # Statement text stored server-side per Hrana stream. Sessions are checked
+        # out per call and returned to a small pool, so Streamlit's thread per
+        # session or rerun does not leave a server stream behind each time
+        self.sql_registry = SqlRegistry()
+        self._local = threading.local()
+        self.session_pool_size = int(turso_config.get('hrana_session_pool_size', DEFAULT_SESSION_POOL_SIZE))
+        self._idle_sessions: List[HranaSession] = []
+        self._sessions_lock = threading.Lock()
+        
+        logger.debug("🗄️ Final Database URL: %s", self.database_url)
+        logger.debug("🚀 Initializing database connection...")
+        
+        # Results of execute_read, dropped when this instance writes the tables they read
+        self.cache = QueryCache.from_config(turso_config)
+        
+        # Optional local read replica ([turso] replica_path); None means every read goes to Turso
+        self.replica: Optional[LocalReplica] = None
+        self._turso_config = turso_config
+        
+        # Optional regional read replicas ([turso] replica_urls); execute_read
+        # goes to the fastest healthy one, everything else to the primary
+        self.router: Optional[ReadRouter] = None
+        replica_urls = turso_config.get('replica_urls') or []
+        if isinstance(replica_urls, str):
+            replica_urls = [url.strip() for url in replica_urls.split(',') if url.strip()]
+        if replica_urls:
+            self.router = ReadRouter(self.database_url, self.transport, replica_urls, self.headers, turso_config)
+            self.router.start()
+            logger.info("🌍 Routing reads across %s regional replica(s)", len(replica_urls))
+        
+        # Connection probe and schema check run in the background so pages that
+        # never touch the database render immediately; queries wait for them
+        self.warmup_timeout = float(turso_config.get('warmup_timeout', DEFAULT_WARMUP_TIMEOUT))
+        self.warmup_duration_ms: Optional[float] = None
+        self._ready = threading.Event()
+        self._warmup_done = threading.Event()
+        self._warmup_error: Optional[Exception] = None
+        self._warmup_lock = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
+        
+        # Optional write-behind journal ([turso] journal_path); it is local, so
+        # submissions are accepted even before Turso answers
+        self.journal: Optional[SubmissionJournal] = None
+        if turso_config.get('journal_path'):
+            self.journal = SubmissionJournal(
+                self,
+                turso_config['journal_path'],
+                flush_interval=turso_config.get('journal_flush_interval', DEFAULT_JOURNAL_FLUSH_INTERVAL),
+                batch_size=turso_config.get('journal_batch_size', DEFAULT_JOURNAL_BATCH_SIZE),
+                retention=turso_config.get('journal_retention', DEFAULT_JOURNAL_RETENTION)
+            )
+            self.journal.start()
+            logger.info("📓 Write-behind journal enabled at %s", self.journal.path)
         
-        # Test connection first
-        self.test_connection()
-        self.init_database()
+        if str(turso_config.get('lazy_connect', True)).lower() in ('0', 'false', 'no', 'off'):
+            self._warm_up()
+            if self._warmup_error is not None:
+                raise self._warmup_error
+        else:
+            self.start_warmup()
     
-    def _is_valid_result(self, result: Any, check_rows: bool = True) -> bool:
-        """Helper function to safely check if a result is valid"""
-        if not isinstance(result, dict):
-            return False
-        if not result.get('results'):
-            return False
-        if len(result['results']) == 0:
-            return False
-        if not isinstance(result['results'][0], dict):
+    def _warm_up(self):
+        """Probe the connection, bring the schema up to date and start the replica"""
+        started = time.monotonic()
+        # Queries issued from here must not wait on the warm-up they are part of
+        self._local.warming_up = True
+        try:
+            self.test_connection()
+            self.init_database()
+            
+            turso_config = self._turso_config
+            if turso_config.get('replica_path') and self.replica is None:
+                self.replica = LocalReplica(
+                    self,
+                    turso_config['replica_path'],
+                    sync_interval=turso_config.get('replica_sync_interval', DEFAULT_REPLICA_SYNC_INTERVAL),
+                    max_staleness=turso_config.get('replica_max_staleness', DEFAULT_REPLICA_MAX_STALENESS)
+                )
+                self.replica.start()
+                logger.info("📀 Local read replica enabled at %s", self.replica.path)
+            
+            self._ready.set()
+        except Exception as e:
+            self._warmup_error = e
+            logger.error("❌ Database warm-up failed: %s", e)
+        finally:
+            self._local.warming_up = False
+            self.warmup_duration_ms = round((time.monotonic() - started) * 1000, 2)
+            self._warmup_done.set()
+        
+        if self._ready.is_set():
+            logger.info("✅ Database ready in %.0fms", self.warmup_duration_ms)
+    
+    def start_warmup(self):
+        """Run the warm-up on a background thread unless it is done or already running"""
+        with self._warmup_lock:
+            if self._ready.is_set() or (self._warmup_thread is not None and self._warmup_thread.is_alive()):
+                return
+            self._warmup_error = None
+            self._warmup_done.clear()
+            self._warmup_thread = threading.Thread(target=self._warm_up, name="turso-warmup", daemon=True)
+            self._warmup_thread.start()
+    
+    def is_ready(self) -> bool:
+        """True once the connection probe and schema check have succeeded"""
+        return self._ready.is_set()
+    
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until the warm-up has finished; False on timeout
+        
+        A failed warm-up (Turso unreachable right after a deploy) is retried
+        by the next caller, and its error is raised if the retry fails too.
+        """
+        if self._ready.is_set() or getattr(self._local, 'warming_up', False):
+            return True
+        if self._warmup_done.is_set() and self._warmup_error is not None:
+            self.start_warmup()
+        if not self._warmup_done.wait(self.warmup_timeout if timeout is None else timeout):
             return False
-        if check_rows:
-            if not result['results'][0].get('rows'):
-                return False
-            if len(result['results'][0]['rows']) == 0:
-                return False
+        if self._warmup_error is not None:
+            raise self._warmup_error
         return True
     
+    def _ensure_ready(self):
+        if not self.wait_until_ready():
+            raise TimeoutError(f"Database warm-up did not finish within {self.warmup_timeout:.0f}s")
+    
     def test_connection(self):
         """Test the Turso database connection"""
         try:
-            print(colored("🧪 Testing Turso connection...", "blue"))
+            logger.debug("🧪 Testing Turso connection...")
             
             # Try a simple SELECT 1 query to test connection using libSQL format
             test_payload = {
@@ -86,319 +267,723 @@ class TursoDatabase:
                 ]
             }
             
-            print(colored(f"🔍 Testing connection to: {self.database_url}", "cyan"))
-            print(colored(f"🔑 Using auth token: {self.auth_token[:10]}...{self.auth_token[-10:] if len(self.auth_token) > 20 else '[short]'}", "cyan"))
+            logger.debug("🔍 Testing connection to: %s", self.database_url)
             
-            response = requests.post(
-                self.database_url, 
-                headers=self.headers, 
-                json=test_payload, 
-                timeout=10
-            )
+            response = self.transport.post(self.database_url, test_payload, timeout=10, idempotent=True)
             
-            print(colored(f"📊 Response status: {response.status_code}", "blue"))
-            print(colored(f"📊 Response headers: {dict(response.headers)}", "blue"))
+            logger.debug("📊 Response status: %s", response.status_code)
+            logger.debug("📊 Response headers: %s", response.headers)
             
             if response.status_code == 200:
-                print(colored("✅ Connection test successful!", "green"))
+                logger.info("✅ Connection test successful!")
                 result = response.json()
-                print(colored(f"Test result: {result}", "green"))
+                logger.debug("Test result: %s", result)
             else:
-                print(colored(f"❌ Connection failed: {response.status_code}", "red"))
-                print(colored(f"Error response: {response.text}", "red"))
+                logger.error("❌ Connection failed: %s", response.status_code)
+                logger.error("Error response: %s", response.text)
                 
                 # Try to decode error message
                 try:
                     error_data = response.json()
-                    print(colored(f"Error details: {error_data}", "red"))
+                    logger.error("Error details: %s", error_data)
                 except:
-                    print(colored("Could not parse error response as JSON", "red"))
+                    logger.error("Could not parse error response as JSON")
             
         except Exception as e:
-            print(colored(f"❌ Connection test error: {e}", "red"))
-            import traceback
-            print(colored(f"Full traceback: {traceback.format_exc()}", "red"))
+            logger.error("❌ Connection test error: %s", e, exc_info=True)
     
-    def execute_sql(self, sql: str, params: List = None) -> Dict[str, Any]:
-        """Execute SQL query using libSQL HTTP protocol"""
+    def _note_write(self):
+        """Send this session's reads to the primary until replicas have its write"""
+        if self.replica is not None:
+            self.replica.note_write()
+        if self.router is not None:
+            self.router.note_write()
+    
+    def _post_statements(self, statements: List[Dict[str, Any]], timeout: float = 30,
+                         idempotent: Optional[bool] = None, endpoint: Any = None) -> Any:
+        """Send a libSQL `statements` payload in one HTTP request and return the decoded JSON
+        
+        Read-only and IF [NOT] EXISTS payloads are retried on any transient
+        failure; writes only when the request never reached the server,
+        unless the caller vouches for them with idempotent=True. endpoint is
+        a router replica to send a read to instead of the primary.
+        """
+        self._ensure_ready()
+        payload = {"statements": statements}
+        if idempotent is None:
+            idempotent = statements_idempotent(statements)
+        read_only = statements_read_only(statements)
+        
+        # libSQL HTTP endpoint is typically just the base URL
+        api_url = self.database_url if endpoint is None else endpoint.url
+        transport = self.transport if endpoint is None else endpoint.transport
+        logger.debug("🌐 API URL: %s", api_url)
+        
+        sql_texts = [statement["q"] for statement in statements]
+        started = time.perf_counter()
         try:
-            # Use the correct libSQL HTTP protocol format
-            payload = {
-                "statements": [
-                    {
-                        "q": sql,
-                        "params": params or []
-                    }
-                ]
-            }
-            
-            print(colored(f"🔧 Executing SQL: {sql[:50]}...", "blue"))
-            
-            # libSQL HTTP endpoint is typically just the base URL
-            api_url = self.database_url
-            print(colored(f"🌐 API URL: {api_url}", "cyan"))
+            response = transport.post(api_url, payload, timeout=timeout, idempotent=idempotent)
+        except Exception:
+            REGISTRY.record_statements("turso", sql_texts, time.perf_counter() - started, failed=True)
+            raise
+        finally:
+            if not read_only:
+                # Even a failed write may have reached the server
+                self.cache.invalidate_sql(sql_texts)
+        elapsed = time.perf_counter() - started
+        
+        logger.debug("📡 Response status: %s", response.status_code)
+        logger.debug("📡 Response headers: %s", response.headers)
+        
+        if response.status_code != 200:
+            logger.error("❌ HTTP Error: %s", response.status_code)
+            logger.error("Response text: %s", response.text)
             
-            response = requests.post(
-                api_url,
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
+            # Try to get more details from the error
+            try:
+                error_json = response.json()
+                logger.error("Error details: %s", error_json)
+            except:
+                pass
             
-            print(colored(f"📡 Response status: {response.status_code}", "blue"))
-            print(colored(f"📡 Response headers: {dict(response.headers)}", "blue"))
+            REGISTRY.record_statements("turso", sql_texts, elapsed, failed=True)
+            response.raise_for_status()
+        
+        if not read_only:
+            self._note_write()
+        
+        raw_results = response.json()
+        failed = [index for index, raw in enumerate(raw_results if isinstance(raw_results, list) else [raw_results])
+                  if isinstance(raw, dict) and raw.get('error')]
+        REGISTRY.record_statements("turso", sql_texts, elapsed, failed=failed)
+        return raw_results
+    
+    def execute_sql(self, sql: str, params: List = None, idempotent: Optional[bool] = None) -> ResultSet:
+        """Execute SQL query using libSQL HTTP protocol
+        
+        Returns a decoded ResultSet; a statement the server rejects raises
+        TursoStatementError with the server's message.
+        """
+        try:
+            logger.debug("🔧 Executing SQL: %s...", sql[:50])
             
-            if response.status_code != 200:
-                print(colored(f"❌ HTTP Error: {response.status_code}", "red"))
-                print(colored(f"Response text: {response.text}", "red"))
-                
-                # Try to get more details from the error
-                try:
-                    error_json = response.json()
-                    print(colored(f"Error details: {error_json}", "red"))
-                except:
-                    pass
-                
-                response.raise_for_status()
+            # Use the correct libSQL HTTP protocol format
+            raw_results = self._post_statements([{"q": sql, "params": params or []}], idempotent=idempotent)
+            result = self._batch_results(raw_results, 1, transaction=False)[0]
+            if result.error:
+                raise TursoStatementError(0, result.error)
             
-            result = response.json()
-            print(colored("✅ SQL executed successfully", "green"))
+            logger.debug("✅ SQL executed successfully (%s rows)", len(result))
+            return result
             
-            # Debug: print the actual result structure
-            print(colored(f"🔍 Result type: {type(result)}", "blue"))
-            print(colored(f"🔍 Result content: {str(result)[:200]}...", "blue"))
+        except Exception as e:
+            logger.error("❌ SQL execution error: %s", e)
+            logger.error("Error type: %s", type(e).__name__)
+            if getattr(e, 'response', None) is not None:
+                logger.debug("Response status: %s", e.response.status_code)
+                logger.error("Response text: %s", e.response.text)
+            raise e
+    
+    @staticmethod
+    def _batch_statements(statements: List[Any], transaction: bool) -> List[Dict[str, Any]]:
+        """Build the libSQL statements array for a batch"""
+        wire_statements = []
+        for statement in statements:
+            if isinstance(statement, str):
+                sql, params = statement, []
+            else:
+                sql, params = statement
+            wire_statements.append({"q": sql, "params": params or []})
+        
+        if transaction:
+            wire_statements = [{"q": "BEGIN", "params": []}] + wire_statements + [{"q": "COMMIT", "params": []}]
+        return wire_statements
+    
+    @staticmethod
+    def _batch_results(raw_results: Any, count: int, transaction: bool) -> List[ResultSet]:
+        """Decode a statements response into one ResultSet per statement"""
+        if not isinstance(raw_results, list):
+            raw_results = [raw_results]
+        if transaction:
+            # Any failure (including BEGIN/COMMIT) means the whole batch was rolled back
+            for position, raw in enumerate(raw_results):
+                error = raw.get('error') if isinstance(raw, dict) else None
+                if error:
+                    message = error.get('message') if isinstance(error, dict) else str(error)
+                    index = min(max(position - 1, 0), count - 1)
+                    raise TursoStatementError(index, message)
+            raw_results = raw_results[1:count + 1]
+        
+        results = [ResultSet.from_response(raw) for raw in raw_results]
+        
+        # A batch that stops early returns fewer entries; pad so indexes still line up
+        while len(results) < count:
+            results.append(ResultSet(error="Statement not executed"))
+        return results
+    
+    def execute_batch(self, statements: List[Any], transaction: bool = False,
+                      idempotent: Optional[bool] = None) -> List[ResultSet]:
+        """Execute several statements in a single HTTP round trip
+        
+        Each entry is either a SQL string or a (sql, params) pair. Returns one
+        ResultSet per statement; without a transaction a failed statement
+        comes back with its error set instead of raising. With
+        transaction=True the batch is wrapped in BEGIN/COMMIT and any failing
+        statement raises TursoStatementError, leaving nothing applied.
+        Pass idempotent=True for writes that are safe to replay after a
+        timeout, such as an UPDATE that sets absolute values.
+        """
+        try:
+            logger.debug("🔧 Executing batch of %s statements (transaction=%s)...", len(statements), transaction)
             
-            # Ensure result is always a dictionary
-            if isinstance(result, list):
-                print(colored("⚠️ Converting list result to dict format", "yellow"))
-                result = {"results": result}
-            elif not isinstance(result, dict):
-                print(colored(f"⚠️ Unexpected result type: {type(result)}", "yellow"))
-                result = {"results": [{"error": f"Unexpected result type: {type(result)}"}]}
+            raw_results = self._post_statements(self._batch_statements(statements, transaction), idempotent=idempotent)
+            results = self._batch_results(raw_results, len(statements), transaction)
             
-            return result
+            logger.debug("✅ Batch executed successfully (%s results)", len(results))
+            return results
             
         except Exception as e:
-            print(colored(f"❌ SQL execution error: {e}", "red"))
-            print(colored(f"Error type: {type(e).__name__}", "red"))
-            if hasattr(e, 'response'):
-                print(colored(f"Response status: {e.response.status_code}", "red"))
-                print(colored(f"Response text: {e.response.text}", "red"))
+            logger.error("❌ Batch execution error: %s", e)
             raise e
     
+    def executemany(self, sql: str, seq_of_params: Iterable[Sequence[Any]],
+                    chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """Run one statement for many parameter rows, one transaction per chunk
+        
+        A single-row INSERT ... VALUES (?, ...) is packed into multi-row VALUES
+        lists within SQLite's parameter limit. Any other statement (DELETE,
+        UPDATE) is repeated once per row in a single batch. Rows are read
+        lazily, chunk_size at a time, so the input may be a generator.
+        
+        A chunk that fails is rolled back and re-sent around the failing
+        statement until the bad rows are isolated, so they do not sink the
+        rest. Returns the rows applied, the round trips used and one
+        {'index', 'error'} entry per failed row. Transport errors raise; the
+        chunks committed before them stay committed.
+        """
+        chunk_size = int(chunk_size or self.executemany_chunk_size)
+        packed = _SINGLE_ROW_INSERT_PATTERN.match(sql)
+        rows_per_statement = 1
+        if packed:
+            params_per_row = packed.group(2).count('?')
+            rows_per_statement = max(1, min(chunk_size, SQLITE_MAX_VARIABLES // params_per_row))
+        
+        summary: Dict[str, Any] = {'rows': 0, 'applied': 0, 'round_trips': 0, 'errors': []}
+        rows = iter(seq_of_params)
+        start = 0
+        logger.debug("🔧 executemany in chunks of %s rows (%s per statement)", chunk_size, rows_per_statement)
+        while True:
+            chunk = [list(params) for params in itertools.islice(rows, chunk_size)]
+            if not chunk:
+                break
+            self._executemany_chunk(sql, packed, rows_per_statement, chunk, start, summary)
+            summary['rows'] += len(chunk)
+            start += len(chunk)
+        
+        if summary['errors']:
+            summary['errors'].sort(key=lambda error: error['index'])
+            logger.warning("⚠️ executemany: %s of %s rows failed", len(summary['errors']), summary['rows'])
+        return summary
+    
+    def _executemany_chunk(self, sql: str, packed: Optional[re.Match], rows_per_statement: int,
+                           rows: List[List[Any]], start: int, summary: Dict[str, Any]):
+        """Apply rows in one transaction; on a statement error, isolate the rows it covered"""
+        statements: List[Tuple[str, List[Any]]] = []
+        spans: List[Tuple[int, int]] = []
+        for offset in range(0, len(rows), rows_per_statement):
+            group = rows[offset:offset + rows_per_statement]
+            if packed:
+                statement_sql = packed.group(1) + ", ".join([packed.group(2)] * len(group))
+                statements.append((statement_sql, [value for params in group for value in params]))
+            else:
+                statements.append((sql, group[0]))
+            spans.append((offset, offset + len(group)))
+        
+        summary['round_trips'] += 1
+        try:
+            raw_results = self._post_statements(self._batch_statements(statements, transaction=True))
+            self._batch_results(raw_results, len(statements), transaction=True)
+        except TursoStatementError as e:
+            first, last = spans[e.index]
+            if last - first == 1:
+                summary['errors'].append({'index': start + first, 'error': e.message})
+            else:
+                # Several rows shared the failing statement: split them until the culprit stands alone
+                middle = (first + last) // 2
+                self._executemany_chunk(sql, packed, rows_per_statement, rows[first:middle], start + first, summary)
+                self._executemany_chunk(sql, packed, rows_per_statement, rows[middle:last], start + middle, summary)
+            # The rest of the chunk was rolled back with it; re-send it around the failure
+            if first > 0:
+                self._executemany_chunk(sql, packed, rows_per_statement, rows[:first], start, summary)
+            if last < len(rows):
+                self._executemany_chunk(sql, packed, rows_per_statement, rows[last:], start + last, summary)
+            return
+        summary['applied'] += len(rows)
+    
+    def stream(self) -> HranaStream:
+        """Open a Hrana stream: one server-side connection kept alive by its baton"""
+        self._ensure_ready()
+        return HranaStream(self.transport, self.database_url, version=self.hrana_version,
+                           registry=self.sql_registry)
+    
+    @contextmanager
+    def _session(self) -> Iterator[HranaSession]:
+        """Check out a long-lived Hrana session for one call
+        
+        The most recently used idle session is reused, so its stream and
+        stored SQL usually are too. On return it goes back to the pool unless
+        the pool already holds session_pool_size sessions. Sessions that do
+        not fit, or whose stream has idled out, are dropped and their streams
+        left for the server to expire (closing one would cost a round trip).
+        """
+        self._ensure_ready()
+        with self._sessions_lock:
+            session = self._idle_sessions.pop() if self._idle_sessions else None
+        if session is None:
+            session = HranaSession(self.transport, self.database_url, version=self.hrana_version,
+                                   registry=self.sql_registry)
+        try:
+            yield session
+        finally:
+            with self._sessions_lock:
+                self._idle_sessions = [idle for idle in self._idle_sessions if not idle.idle()]
+                if len(self._idle_sessions) < self.session_pool_size:
+                    self._idle_sessions.append(session)
+    
+    def execute_stored(self, statements: List[Any]) -> List[ResultSet]:
+        """Execute statements by server-side stored SQL in one round trip
+        
+        Meant for large statements run over and over (form INSERTs). The first
+        call on a stream sends each statement's text with store_sql; later
+        calls send only its id and arguments. Statements run in order without
+        a transaction, and a failing statement raises HranaError.
+        """
+        sql_texts = [statement if isinstance(statement, str) else statement[0] for statement in statements]
+        read_only = statements_read_only([{"q": sql} for sql in sql_texts])
+        started = time.perf_counter()
+        try:
+            logger.debug("🔧 Executing %s stored statements...", len(statements))
+            with self._session() as session:
+                results = session.execute_many(statements)
+            REGISTRY.record_statements("turso", sql_texts, time.perf_counter() - started)
+            if not read_only:
+                self._note_write()
+            return results
+        except Exception as e:
+            REGISTRY.record_statements("turso", sql_texts, time.perf_counter() - started, failed=True)
+            logger.error("❌ Stored statement execution error: %s", e)
+            raise e
+        finally:
+            if not read_only:
+                self.cache.invalidate_sql(sql_texts)
+    
+    @contextmanager
+    def transaction(self):
+        """Run a read-then-write sequence as one interactive transaction
+        
+        Yields a HranaStream with BEGIN already queued; the transaction is
+        committed and the stream closed in one request when the block exits,
+        or rolled back if it raises.
+        """
+        stream = self.stream()
+        stream.begin()
+        try:
+            yield stream
+        except Exception:
+            try:
+                stream.rollback(close=True)
+            except Exception as rollback_error:
+                logger.warning("⚠️ Rollback failed: %s", rollback_error)
+                stream.close()
+            raise
+        else:
+            stream.commit(close=True)
+            # The statements went through the stream, so which tables changed is unknown
+            self.cache.clear()
+            self._note_write()
+    
+    def iter_rows(self, sql: str, params: List = None, batch_size: Optional[int] = None,
+                  key_column: str = 'id') -> Iterator[Row]:
+        """Yield the rows of a SELECT one at a time, in bounded memory
+        
+        Rows come from Turso's v3 cursor endpoint and are decoded line by line
+        as they arrive. If the server has no cursor endpoint, the query is
+        read batch_size rows at a time by keyset pagination on key_column.
+        That column must be unique and part of the result. On this path rows
+        come back in key_column order.
+        """
+        if self._cursor_supported:
+            stream = self.stream()
+            started = time.perf_counter()
+            try:
+                cursor = stream.open_cursor(sql, params, idempotent=statements_read_only([{"q": sql}]))
+            except HranaCursorUnsupported as e:
+                logger.info("ℹ️ %s; iter_rows will page by %s instead", e, key_column)
+                self._cursor_supported = False
+            except Exception:
+                REGISTRY.record_statements("turso", [sql], time.perf_counter() - started, failed=True)
+                stream.close()
+                raise
+            else:
+                REGISTRY.record_statements("turso", [sql], time.perf_counter() - started)
+                try:
+                    yield from cursor
+                finally:
+                    cursor.close()
+                    REGISTRY.payload_bytes.observe(cursor.bytes_received, "turso", "received")
+                    if cursor.completed:
+                        stream.close()
+                    else:
+                        # Abandoned mid-result: the server still owns the stream, let it expire
+                        stream.closed = True
+                return
+        
+        yield from self._iter_rows_keyset(sql, params, batch_size or self.iter_batch_size, key_column)
+    
+    def _iter_rows_keyset(self, sql: str, params: Optional[List], batch_size: int, key_column: str) -> Iterator[Row]:
+        """iter_rows without a cursor: one query per page, continuing after the last key seen"""
+        if not _IDENTIFIER_PATTERN.fullmatch(key_column):
+            raise ValueError(f"Invalid key column: {key_column!r}")
+        base_sql = f"SELECT * FROM ({sql.strip().rstrip(';')})"
+        last_key = None
+        while True:
+            if last_key is None:
+                page = self.execute_sql(f"{base_sql} ORDER BY {key_column} LIMIT {int(batch_size)}", params)
+            else:
+                page = self.execute_sql(
+                    f"{base_sql} WHERE {key_column} > ? ORDER BY {key_column} LIMIT {int(batch_size)}",
+                    list(params or []) + [last_key]
+                )
+            row = None
+            for row in page:
+                yield row
+            if row is None or len(page) < batch_size:
+                return
+            last_key = row[key_column]
+    
+    def _read_from_replica(self, sql: str, params: Optional[List]) -> Optional[ResultSet]:
+        """Run a read on the router's pick, or None when the primary should serve it"""
+        endpoint = self.router.choose()
+        if endpoint.primary:
+            return None
+        try:
+            raw_results = self._post_statements([{"q": sql, "params": params or []}], endpoint=endpoint)
+        except Exception as e:
+            self.router.mark_failed(endpoint, e)
+            return None
+        result = self._batch_results(raw_results, 1, transaction=False)[0]
+        if result.error:
+            raise TursoStatementError(0, result.error)
+        return result
+    
+    def execute_read(self, sql: str, params: List = None, fallback_on_empty: bool = False) -> ResultSet:
+        """Run a read from the cache, the local replica when it can serve this session, else Turso
+        
+        With fallback_on_empty=True an empty local result is re-checked on the
+        primary, for lookups where a row written by another session within
+        the sync interval must still be found (session tokens). With
+        replica_urls set, the Turso read goes to the fastest healthy regional
+        replica unless this session wrote recently.
+        """
+        cached = self.cache.get(sql, params)
+        if cached is not None:
+            return cached
+        generation = self.cache.generation(sql)
+        
+        result = None
+        if self.replica is not None and self.replica.covers(sql) and self.replica.can_serve():
+            try:
+                result = self.replica.query(sql, params)
+                if len(result) == 0 and fallback_on_empty:
+                    result = None
+            except Exception as e:
+                logger.warning("⚠️ Replica read failed, using primary: %s", e)
+                result = None
+        if result is None and self.router is not None:
+            result = self._read_from_replica(sql, params)
+            if result is not None and len(result) == 0 and fallback_on_empty:
+                result = None
+        if result is None:
+            if self.replica is not None:
+                self.replica.note_primary_read()
+            result = self.execute_sql(sql, params)
+        
+        # An empty lookup that must be re-checked on the primary is not worth keeping
+        if len(result) > 0 or not fallback_on_empty:
+            self.cache.put(sql, params, result, generation)
+        return result
+    
+    def _schema_is_current(self, schema_hash: str) -> bool:
+        """Check the schema_meta stamp with one read; a missing table reads as not current"""
+        try:
+            raw_results = self._post_statements([{"q": SCHEMA_META_SELECT, "params": []}])
+            row = self._batch_results(raw_results, 1, transaction=False)[0].first()
+        except Exception as e:
+            logger.warning("⚠️ Could not read schema_meta, applying DDL: %s", e)
+            return False
+        return row is not None and schema_is_current(row[0], row[1], schema_hash)
+    
     def init_database(self):
         """Initialize database with all required tables"""
-        print(colored("🔧 Initializing database tables...", "blue"))
+        logger.debug("🔧 Initializing database tables...")
         
         try:
-            # Users table
-            self.execute_sql('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    email TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    first_name TEXT NOT NULL,
-                    last_name TEXT NOT NULL,
-                    is_verified BOOLEAN DEFAULT FALSE,
-                    verification_token TEXT,
-                    reset_token TEXT,
-                    reset_token_expires DATETIME,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            # All tables go out in one round trip instead of one request per table
+            schema_statements = [
+                # Users table
+                '''
+                    CREATE TABLE IF NOT EXISTS users (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        email TEXT UNIQUE NOT NULL,
+                        password_hash TEXT NOT NULL,
+                        first_name TEXT NOT NULL,
+                        last_name TEXT NOT NULL,
+                        is_verified BOOLEAN DEFAULT FALSE,
+                        verification_token TEXT,
+                        reset_token TEXT,
+                        reset_token_expires DATETIME,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''',
             
-            # Session tokens table
-            self.execute_sql('''
-                CREATE TABLE IF NOT EXISTS session_tokens (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    token TEXT UNIQUE NOT NULL,
-                    expires_at DATETIME NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
+                # Session tokens table
+                '''
+                    CREATE TABLE IF NOT EXISTS session_tokens (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER NOT NULL,
+                        token TEXT UNIQUE NOT NULL,
+                        expires_at DATETIME NOT NULL,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (user_id) REFERENCES users (id)
+                    )
+                ''',
             
-            # Membership applications table with unique email constraint
-            self.execute_sql('''
-                CREATE TABLE IF NOT EXISTS membership_applications (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    first_name TEXT NOT NULL,
-                    middle_name TEXT,
-                    last_name TEXT NOT NULL,
-                    email TEXT NOT NULL UNIQUE,
-                    phone_number TEXT NOT NULL,
-                    date_of_birth DATE,
-                    gender TEXT,
-                    nationality TEXT,
-                    address TEXT,
-                    city TEXT,
-                    state_province TEXT,
-                    country TEXT,
-                    postal_code TEXT,
-                    highest_degree TEXT NOT NULL,
-                    field_of_study TEXT,
-                    institution TEXT,
-                    graduation_year INTEGER,
-                    current_occupation TEXT,
-                    organization TEXT,
-                    position TEXT,
-                    years_of_experience INTEGER DEFAULT 0,
-                    primary_research_area TEXT,
-                    secondary_research_area TEXT,
-                    previous_publications TEXT,
-                    current_research_projects TEXT,
-                    programming_languages TEXT,
-                    technical_skills TEXT,
-                    software_proficiency TEXT,
-                    membership_type TEXT DEFAULT 'individual',
-                    how_did_you_hear TEXT,
-                    motivation TEXT,
-                    expected_contributions TEXT,
-                    status TEXT DEFAULT 'Pending',
-                    application_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    reviewed_at DATETIME,
-                    reviewed_by INTEGER,
-                    FOREIGN KEY (user_id) REFERENCES users (id),
-                    FOREIGN KEY (reviewed_by) REFERENCES users (id)
-                )
-            ''')
+                # Membership applications table with unique email constraint
+                '''
+                    CREATE TABLE IF NOT EXISTS membership_applications (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER,
+                        first_name TEXT NOT NULL,
+                        middle_name TEXT,
+                        last_name TEXT NOT NULL,
+                        email TEXT NOT NULL UNIQUE,
+                        email_normalized TEXT,
+                        phone_number TEXT NOT NULL,
+                        date_of_birth DATE,
+                        gender TEXT,
+                        nationality TEXT,
+                        address TEXT,
+                        city TEXT,
+                        state_province TEXT,
+                        country TEXT,
+                        postal_code TEXT,
+                        highest_degree TEXT NOT NULL,
+                        field_of_study TEXT,
+                        institution TEXT,
+                        graduation_year INTEGER,
+                        current_occupation TEXT,
+                        organization TEXT,
+                        position TEXT,
+                        years_of_experience INTEGER DEFAULT 0,
+                        primary_research_area TEXT,
+                        secondary_research_area TEXT,
+                        previous_publications TEXT,
+                        current_research_projects TEXT,
+                        programming_languages TEXT,
+                        technical_skills TEXT,
+                        software_proficiency TEXT,
+                        membership_type TEXT DEFAULT 'individual',
+                        how_did_you_hear TEXT,
+                        motivation TEXT,
+                        expected_contributions TEXT,
+                        status TEXT DEFAULT 'Pending',
+                        application_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        reviewed_at DATETIME,
+                        reviewed_by INTEGER,
+                        FOREIGN KEY (user_id) REFERENCES users (id),
+                        FOREIGN KEY (reviewed_by) REFERENCES users (id)
+                    )
+                ''',
             
-            # Bank of Ideas table
-            self.execute_sql('''
-                CREATE TABLE IF NOT EXISTS bank_of_ideas (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    email TEXT NOT NULL,
-                    submitter_name TEXT NOT NULL,
-                    title_degrees TEXT NOT NULL,
-                    project_title TEXT NOT NULL,
-                    project_nature TEXT NOT NULL,
-                    project_nature_other TEXT,
-                    project_type TEXT NOT NULL,
-                    project_type_other TEXT,
-                    brief_description TEXT NOT NULL,
-                    specialization_area TEXT NOT NULL,
-                    objectives TEXT NOT NULL,
-                    benefits TEXT NOT NULL,
-                    web_links TEXT,
-                    additional_notes TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
+                # Bank of Ideas table
+                '''
+                    CREATE TABLE IF NOT EXISTS bank_of_ideas (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER,
+                        email TEXT NOT NULL,
+                        email_normalized TEXT,
+                        submitter_name TEXT NOT NULL,
+                        title_degrees TEXT NOT NULL,
+                        project_title TEXT NOT NULL,
+                        project_nature TEXT NOT NULL,
+                        project_nature_other TEXT,
+                        project_type TEXT NOT NULL,
+                        project_type_other TEXT,
+                        brief_description TEXT NOT NULL,
+                        specialization_area TEXT NOT NULL,
+                        objectives TEXT NOT NULL,
+                        benefits TEXT NOT NULL,
+                        web_links TEXT,
+                        additional_notes TEXT,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (user_id) REFERENCES users (id)
+                    )
+                ''',
             
-            # Member nominations table
-            self.execute_sql('''
-                CREATE TABLE IF NOT EXISTS member_nominations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nominator_user_id INTEGER,
-                    nominator_email TEXT NOT NULL,
-                    nominee_full_name TEXT NOT NULL,
-                    nominee_place_of_work TEXT NOT NULL,
-                    nominee_country TEXT NOT NULL,
-                    nominee_address TEXT,
-                    nominee_phone TEXT NOT NULL,
-                    nominee_url_link TEXT,
-                    nominee_email TEXT NOT NULL,
-                    nominee_specialization TEXT NOT NULL,
-                    nominee_qualifications TEXT NOT NULL,
-                    nominating_member_name TEXT NOT NULL,
-                    status TEXT DEFAULT 'Pending',
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    reviewed_at DATETIME,
-                    reviewed_by INTEGER,
-                    FOREIGN KEY (nominator_user_id) REFERENCES users (id),
-                    FOREIGN KEY (reviewed_by) REFERENCES users (id)
-                )
-            ''')
+                # Member nominations table
+                '''
+                    CREATE TABLE IF NOT EXISTS member_nominations (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        nominator_user_id INTEGER,
+                        nominator_email TEXT NOT NULL,
+                        email_normalized TEXT,
+                        nominee_full_name TEXT NOT NULL,
+                        nominee_place_of_work TEXT NOT NULL,
+                        nominee_country TEXT NOT NULL,
+                        nominee_address TEXT,
+                        nominee_phone TEXT NOT NULL,
+                        nominee_url_link TEXT,
+                        nominee_email TEXT NOT NULL,
+                        nominee_specialization TEXT NOT NULL,
+                        nominee_qualifications TEXT NOT NULL,
+                        nominating_member_name TEXT NOT NULL,
+                        status TEXT DEFAULT 'Pending',
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        reviewed_at DATETIME,
+                        reviewed_by INTEGER,
+                        FOREIGN KEY (nominator_user_id) REFERENCES users (id),
+                        FOREIGN KEY (reviewed_by) REFERENCES users (id)
+                    )
+                ''',
             
-            # Research database table
-            self.execute_sql('''
-                CREATE TABLE IF NOT EXISTS research_database (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    publication_type TEXT NOT NULL,
-                    paper_title TEXT NOT NULL,
-                    conference_journal_book_title TEXT NOT NULL,
-                    publisher_name TEXT NOT NULL,
-                    publication_year TEXT NOT NULL,
-                    keywords TEXT,
-                    abstract TEXT,
-                    paper_url TEXT,
-                    article_classification TEXT,
-                    article_second_classification TEXT,
-                    article_third_classification TEXT,
-                    status TEXT DEFAULT 'Pending',
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    reviewed_at DATETIME,
-                    reviewed_by INTEGER,
-                    FOREIGN KEY (user_id) REFERENCES users (id),
-                    FOREIGN KEY (reviewed_by) REFERENCES users (id)
-                )
-            ''')
+                # Research database table
+                '''
+                    CREATE TABLE IF NOT EXISTS research_database (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER,
+                        publication_type TEXT NOT NULL,
+                        paper_title TEXT NOT NULL,
+                        conference_journal_book_title TEXT NOT NULL,
+                        publisher_name TEXT NOT NULL,
+                        publication_year TEXT NOT NULL,
+                        keywords TEXT,
+                        abstract TEXT,
+                        paper_url TEXT,
+                        article_classification TEXT,
+                        article_second_classification TEXT,
+                        article_third_classification TEXT,
+                        status TEXT DEFAULT 'Pending',
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        reviewed_at DATETIME,
+                        reviewed_by INTEGER,
+                        FOREIGN KEY (user_id) REFERENCES users (id),
+                        FOREIGN KEY (reviewed_by) REFERENCES users (id)
+                    )
+                ''',
             
-            # General suggestions table
-            self.execute_sql('''
-                CREATE TABLE IF NOT EXISTS general_suggestions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    email TEXT NOT NULL,
-                    full_name TEXT NOT NULL,
-                    suggestion_type TEXT NOT NULL,
-                    suggestion_title TEXT NOT NULL,
-                    suggestion_description TEXT NOT NULL,
-                    priority_level TEXT,
-                    implementation_timeline TEXT,
-                    additional_comments TEXT,
-                    status TEXT DEFAULT 'Pending',
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    reviewed_at DATETIME,
-                    reviewed_by INTEGER,
-                    FOREIGN KEY (user_id) REFERENCES users (id),
-                    FOREIGN KEY (reviewed_by) REFERENCES users (id)
-                )
-            ''')
+                # General suggestions table
+                '''
+                    CREATE TABLE IF NOT EXISTS general_suggestions (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER,
+                        email TEXT NOT NULL,
+                        email_normalized TEXT,
+                        full_name TEXT NOT NULL,
+                        suggestion_type TEXT NOT NULL,
+                        suggestion_title TEXT NOT NULL,
+                        suggestion_description TEXT NOT NULL,
+                        priority_level TEXT,
+                        implementation_timeline TEXT,
+                        additional_comments TEXT,
+                        status TEXT DEFAULT 'Pending',
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        reviewed_at DATETIME,
+                        reviewed_by INTEGER,
+                        FOREIGN KEY (user_id) REFERENCES users (id),
+                        FOREIGN KEY (reviewed_by) REFERENCES users (id)
+                    )
+                ''',
+                
+                # Authors of research_database entries, in author_order
+                '''
+                    CREATE TABLE IF NOT EXISTS research_authors (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        research_id INTEGER NOT NULL,
+                        author_name TEXT NOT NULL,
+                        author_email TEXT,
+                        author_affiliation TEXT,
+                        author_order INTEGER DEFAULT 1,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (research_id) REFERENCES research_database (id)
+                    )
+                ''',
+                "CREATE INDEX IF NOT EXISTS idx_research_authors_research_id ON research_authors (research_id)",
+                
+                # Idempotency keys of journaled submissions already applied
+                SUBMISSION_KEYS_DDL
+            ]
+            
+            # Duplicate checks look up email_normalized through these indexes
+            schema_statements += normalized_email_index_ddl()
+            
+            schema_hash = ddl_hash(schema_statements)
+            if self._schema_is_current(schema_hash):
+                logger.debug("✅ Schema v%s already applied, skipping DDL", SCHEMA_VERSION)
+                return
             
-            print(colored("✅ Database tables initialized successfully", "green"))
+            # Tables from before email_normalized get the column ahead of its index
+            # and their existing rows are backfilled right after
+            upgrade_statements = missing_column_ddl(self)
+            if upgrade_statements:
+                logger.info("🔄 Adding email_normalized to %s existing table(s)", len(upgrade_statements))
+            
+            # DDL and the version stamp commit together; a failed bootstrap is retried next start
+            self.execute_batch(
+                upgrade_statements + schema_statements + [SCHEMA_META_DDL, schema_meta_upsert(schema_hash)],
+                transaction=True
+            )
+            
+            if upgrade_statements:
+                try:
+                    backfill_normalized_emails(self)
+                except Exception as e:
+                    # Duplicate checks still match unset rows on email; migrate_database.py finishes the job
+                    logger.warning("⚠️ email_normalized backfill did not finish: %s", e)
+            
+            logger.info("✅ Database tables initialized successfully (schema v%s)", SCHEMA_VERSION)
             
         except Exception as e:
-            print(colored(f"❌ Error initializing database: {e}", "red"))
+            logger.error("❌ Error initializing database: %s", e)
             raise e
     
     # User management methods
     def create_user(self, email: str, password: str, first_name: str, last_name: str) -> Dict[str, Any]:
         """Create a new user"""
         try:
-            # Check if user already exists
-            result = self.execute_sql("SELECT id FROM users WHERE email = ?", [email])
-            
-            # Safe result checking
-            if self._is_valid_result(result):
-                return {'success': False, 'error': 'User already exists'}
-            
-            # Hash password
+            # Hash password before opening the transaction so the stream is not held open by bcrypt
             password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
             verification_token = secrets.token_urlsafe(32)
             
-            # Insert user
-            result = self.execute_sql('''
-                INSERT INTO users (email, password_hash, first_name, last_name, verification_token)
-                VALUES (?, ?, ?, ?, ?)
-            ''', [email, password_hash, first_name, last_name, verification_token])
+            # Existence check and INSERT run on one stream inside one transaction
+            with self.transaction() as tx:
+                existing = tx.execute("SELECT id FROM users WHERE email = ?", [email])
+                if existing.first() is not None:
+                    return {'success': False, 'error': 'User already exists'}
+                
+                # Insert user
+                result = tx.execute('''
+                    INSERT INTO users (email, password_hash, first_name, last_name, verification_token)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [email, password_hash, first_name, last_name, verification_token])
             
-            # Get the inserted user ID from the result
-            user_id = None
-            if self._is_valid_result(result, check_rows=False) and result['results'][0].get('last_insert_rowid'):
-                user_id = result['results'][0]['last_insert_rowid']
+            user_id = result.last_insert_rowid
             
-            print(colored("✅ User created successfully", "green"))
+            logger.info("✅ User created successfully")
             return {'success': True, 'user_id': user_id, 'verification_token': verification_token}
             
         except Exception as e:
-            print(colored(f"❌ Error creating user: {e}", "red"))
+            logger.error("❌ Error creating user: %s", e)
             return {'success': False, 'error': str(e)}
     
     def authenticate_user(self, email: str, password: str) -> Dict[str, Any]:
@@ -410,10 +995,10 @@ class TursoDatabase:
                 [email]
             )
             
-            if not self._is_valid_result(result):
+            user_data = result.first()
+            if user_data is None:
                 return {'success': False, 'error': 'Invalid credentials'}
             
-            user_data = result['results'][0]['rows'][0]
             user_id, password_hash, first_name, last_name, is_verified = user_data
             
             if not bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8')):
@@ -428,7 +1013,7 @@ class TursoDatabase:
                 VALUES (?, ?, ?)
             ''', [user_id, token, expires_at])
             
-            print(colored("✅ User authenticated successfully", "green"))
+            logger.info("✅ User authenticated successfully")
             return {
                 'success': True,
                 'user_id': user_id,
@@ -439,21 +1024,22 @@ class TursoDatabase:
             }
             
         except Exception as e:
-            print(colored(f"❌ Error authenticating user: {e}", "red"))
+            logger.error("❌ Error authenticating user: %s", e)
             return {'success': False, 'error': str(e)}
     
     def get_user_by_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Get user by session token"""
         try:
-            result = self.execute_sql('''
-                SELECT u.id, u.email, u.first_name, u.last_name, u.is_verified
+            # Expiry is checked here rather than in SQL so the query stays cacheable
+            result = self.execute_read('''
+                SELECT u.id, u.email, u.first_name, u.last_name, u.is_verified, st.expires_at
                 FROM users u
                 JOIN session_tokens st ON u.id = st.user_id
-                WHERE st.token = ? AND st.expires_at > ?
-            ''', [token, datetime.now().isoformat()])
+                WHERE st.token = ?
+            ''', [token], fallback_on_empty=True)
             
-            if self._is_valid_result(result):
-                user_data = result['results'][0]['rows'][0]
+            user_data = result.first()
+            if user_data is not None and str(user_data[5]) > datetime.now().isoformat():
                 return {
                     'id': user_data[0],
                     'email': user_data[1],
@@ -464,8 +1050,49 @@ class TursoDatabase:
             return None
             
         except Exception as e:
-            print(colored(f"❌ Error getting user by token: {e}", "red"))
+            logger.error("❌ Error getting user by token: %s", e)
             return None
+    
+    def transport_metrics(self) -> Dict[str, Any]:
+        """Retry counts and circuit breaker state of the HTTP transport"""
+        return self.transport.metrics()
+    
+    def replica_metrics(self) -> Optional[Dict[str, Any]]:
+        """Sync lag, staleness and local/primary read counts, or None without a replica"""
+        return self.replica.metrics() if self.replica is not None else None
+    
+    def routing_metrics(self) -> Optional[Dict[str, Any]]:
+        """Probe latency and health per endpoint and the primary/replica read split, or None without replica_urls"""
+        return self.router.metrics() if self.router is not None else None
+    
+    def cache_metrics(self) -> Dict[str, Any]:
+        """Read cache hits, misses, evictions and size"""
+        return self.cache.stats()
+    
+    def journal_metrics(self) -> Optional[Dict[str, Any]]:
+        """Journal depth, flush lag and outcomes, or None without a journal"""
+        return self.journal.metrics() if self.journal is not None else None
+    
+    def statement_metrics(self) -> Dict[str, Any]:
+        """Per-statement and per-form counts and latencies, shared by every database in the process"""
+        return REGISTRY.summary()
+    
+    def close(self):
+        """Release pooled HTTP connections"""
+        if self._warmup_thread is not None:
+            self._warmup_thread.join(timeout=self.warmup_timeout)
+        if self.journal is not None:
+            self.journal.stop()
+            self.journal.close()
+        if self.replica is not None:
+            self.replica.stop()
+        if self.router is not None:
+            self.router.stop()
+        with self._sessions_lock:
+            sessions, self._idle_sessions = self._idle_sessions, []
+        for session in sessions:
+            session.close()
+        self.transport.close()
 
 # Create alias for backward compatibility
 Database = TursoDatabase 
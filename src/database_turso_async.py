@@ -0,0 +1,395 @@
+"""
+Asyncio Turso Database Client
+Non-blocking variant of TursoDatabase with concurrent fan-out and a sync shim
+"""
+
+import asyncio
+import json
+import secrets
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Awaitable
+
+import bcrypt
+import streamlit as st
+
+try:
+    from src.database_turso import TursoDatabase, TursoStatementError
+    from src.turso_results import ResultSet
+    from src.turso_transport import TursoTransport, DEFAULT_POOL_MAXSIZE, DEFAULT_POOL_IDLE_TIMEOUT, DEFAULT_CONNECT_TIMEOUT
+    from src.turso_retry import RetryPolicy, statements_idempotent, statements_read_only
+    from src.query_cache import QueryCache
+    from src.metrics import REGISTRY
+    from src.log_utils import get_logger
+except ImportError:
+    from database_turso import TursoDatabase, TursoStatementError
+    from turso_results import ResultSet
+    from turso_transport import TursoTransport, DEFAULT_POOL_MAXSIZE, DEFAULT_POOL_IDLE_TIMEOUT, DEFAULT_CONNECT_TIMEOUT
+    from turso_retry import RetryPolicy, statements_idempotent, statements_read_only
+    from query_cache import QueryCache
+    from metrics import REGISTRY
+    from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# httpx gives us a native asyncio connection pool; without it requests run in worker threads
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    logger.warning("⚠️ httpx not available. Async Turso client will use worker threads.")
+    HTTPX_AVAILABLE = False
+
+
+async def gather(*awaitables: Awaitable, return_exceptions: bool = False) -> List[Any]:
+    """Run independent database calls concurrently and return their results in order"""
+    return list(await asyncio.gather(*awaitables, return_exceptions=return_exceptions))
+
+
+class _LoopThread:
+    """Background event loop used by run_sync when the caller has no loop of its own"""
+
+    _lock = threading.Lock()
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def get_loop(cls) -> asyncio.AbstractEventLoop:
+        with cls._lock:
+            if cls._loop is None or cls._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="turso-async-loop", daemon=True)
+                thread.start()
+                cls._loop = loop
+            return cls._loop
+
+
+def run_sync(awaitable: Awaitable) -> Any:
+    """Run a coroutine to completion from synchronous code
+
+    Coroutines run on one long-lived background loop, so the async client's
+    connection pool survives between calls (Streamlit reruns included).
+    """
+    loop = _LoopThread.get_loop()
+    return asyncio.run_coroutine_threadsafe(awaitable, loop).result()
+
+
+class AsyncTursoDatabase:
+    def __init__(self, database_url: str = None, auth_token: str = None, pool_options: Dict[str, Any] = None):
+        """Initialize async Turso client (no network I/O until the first query)"""
+        turso_config = dict(pool_options or {})
+
+        if (not database_url or not auth_token) and hasattr(st, 'secrets') and 'turso' in st.secrets:
+            turso_config = {**dict(st.secrets["turso"]), **turso_config}
+            database_url = st.secrets["turso"]["database_url"]
+            auth_token = st.secrets["turso"]["auth_token"]
+
+        if not database_url or not auth_token:
+            error_msg = "❌ Missing Turso credentials! Please check your secrets configuration."
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+
+        self.database_url = database_url.replace("libsql://", "https://", 1)
+        self.auth_token = auth_token
+        self.headers = {
+            "Authorization": f"Bearer {self.auth_token}",
+            "Content-Type": "application/json"
+        }
+        self.pool_maxsize = int(turso_config.get('pool_maxsize', DEFAULT_POOL_MAXSIZE))
+        self.idle_timeout = float(turso_config.get('pool_idle_timeout', DEFAULT_POOL_IDLE_TIMEOUT))
+        self.connect_timeout = float(turso_config.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT))
+        self.retry_policy = RetryPolicy.from_config(turso_config)
+
+        # Writes drop cached reads of the tables they touch; from_database shares the sync client's cache
+        self.cache = QueryCache.from_config(turso_config)
+        self._sync_db: Optional[TursoDatabase] = None
+
+        # httpx clients are bound to the loop they were created on; keyed by the
+        # loop itself so a new loop that reuses a dead one's id gets its own client
+        self._clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]' = weakref.WeakKeyDictionary()
+        self._fallback_transport: Optional[TursoTransport] = None
+        if not HTTPX_AVAILABLE:
+            self._fallback_transport = TursoTransport.from_config(self.headers, turso_config)
+            self._fallback_transport.retry_policy = self.retry_policy
+
+    @classmethod
+    def from_database(cls, db: TursoDatabase) -> 'AsyncTursoDatabase':
+        """Build an async client that talks to the same database as a sync TursoDatabase
+
+        Both clients share one retry policy, so an outage seen by either
+        opens the same circuit breaker. They also share the read cache and
+        the replica/router write tracking, so a write made through either
+        one is seen by the other's reads, and async queries wait for the
+        sync client's warm-up.
+        """
+        async_db = cls(db.database_url, db.auth_token, {
+            'pool_maxsize': db.transport.pool_maxsize,
+            'pool_idle_timeout': db.transport.idle_timeout,
+            'connect_timeout': db.transport.connect_timeout,
+        })
+        async_db.retry_policy = db.transport.retry_policy
+        async_db.cache = db.cache
+        async_db._sync_db = db
+        if async_db._fallback_transport is not None:
+            async_db._fallback_transport.retry_policy = db.transport.retry_policy
+        return async_db
+
+    def _client(self):
+        """Return the httpx client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        # A pooled connection references its loop, so a closed loop's client would
+        # keep the weak key alive; drop it (its sockets close when it is collected)
+        for closed in [other for other in list(self._clients) if other.is_closed()]:
+            self._clients.pop(closed, None)
+        client = self._clients.get(loop)
+        if client is None:
+            limits = httpx.Limits(
+                max_connections=self.pool_maxsize,
+                max_keepalive_connections=self.pool_maxsize,
+                keepalive_expiry=self.idle_timeout
+            )
+            client = httpx.AsyncClient(headers=self.headers, limits=limits)
+            self._clients[loop] = client
+        return client
+
+    async def _post_statements(self, statements: List[Dict[str, Any]], timeout: float = 30,
+                               idempotent: Optional[bool] = None) -> Any:
+        """Send a libSQL `statements` payload without blocking the event loop"""
+        if self._sync_db is not None and not self._sync_db.is_ready():
+            await asyncio.to_thread(self._sync_db._ensure_ready)
+        payload = {"statements": statements}
+        if idempotent is None:
+            idempotent = statements_idempotent(statements)
+        read_only = statements_read_only(statements)
+
+        sql_texts = [statement["q"] for statement in statements]
+        started = time.perf_counter()
+        try:
+            if HTTPX_AVAILABLE:
+                timeouts = httpx.Timeout(timeout, connect=min(self.connect_timeout, timeout))
+                # Serialized here rather than by httpx, so the payload size is known
+                body = json.dumps(payload).encode('utf-8')
+                response = await self.retry_policy.acall(
+                    lambda: self._client().post(self.database_url, content=body, timeout=timeouts),
+                    idempotent=idempotent
+                )
+                REGISTRY.record_payload("turso", len(body), len(response.content))
+            else:
+                response = await asyncio.to_thread(
+                    self._fallback_transport.post, self.database_url, payload, timeout, idempotent
+                )
+        except Exception:
+            REGISTRY.record_statements("turso", sql_texts, time.perf_counter() - started, failed=True)
+            raise
+        finally:
+            if not read_only:
+                # Even a failed write may have reached the server
+                self.cache.invalidate_sql(sql_texts)
+        elapsed = time.perf_counter() - started
+
+        if response.status_code != 200:
+            logger.error("❌ HTTP Error: %s", response.status_code)
+            logger.error("Response text: %s", response.text)
+            REGISTRY.record_statements("turso", sql_texts, elapsed, failed=True)
+            response.raise_for_status()
+
+        if not read_only and self._sync_db is not None:
+            self._sync_db._note_write()
+
+        raw_results = response.json()
+        failed = [index for index, raw in enumerate(raw_results if isinstance(raw_results, list) else [raw_results])
+                  if isinstance(raw, dict) and raw.get('error')]
+        REGISTRY.record_statements("turso", sql_texts, elapsed, failed=failed)
+        return raw_results
+
+    async def execute_sql(self, sql: str, params: List = None, idempotent: Optional[bool] = None) -> ResultSet:
+        """Execute SQL query using libSQL HTTP protocol"""
+        try:
+            raw_results = await self._post_statements([{"q": sql, "params": params or []}], idempotent=idempotent)
+            result = TursoDatabase._batch_results(raw_results, 1, transaction=False)[0]
+            if result.error:
+                raise TursoStatementError(0, result.error)
+            return result
+        except Exception as e:
+            logger.error("❌ Async SQL execution error: %s", e)
+            raise e
+
+    async def execute_batch(self, statements: List[Any], transaction: bool = False,
+                            idempotent: Optional[bool] = None) -> List[ResultSet]:
+        """Execute several statements in a single HTTP round trip"""
+        try:
+            raw_results = await self._post_statements(
+                TursoDatabase._batch_statements(statements, transaction), idempotent=idempotent
+            )
+            return TursoDatabase._batch_results(raw_results, len(statements), transaction)
+        except Exception as e:
+            logger.error("❌ Async batch execution error: %s", e)
+            raise e
+
+    async def execute_read(self, sql: str, params: List = None, fallback_on_empty: bool = False) -> ResultSet:
+        """Run a read from the shared cache, else through the same replica/router path as the sync client
+
+        See TursoDatabase.execute_read for fallback_on_empty.
+        """
+        cached = self.cache.get(sql, params)
+        if cached is not None:
+            return cached
+        db = self._sync_db
+        if db is not None and (db.replica is not None or db.router is not None):
+            # Replica and router reads are blocking; keep them off the event loop
+            return await asyncio.to_thread(db.execute_read, sql, params, fallback_on_empty)
+        generation = self.cache.generation(sql)
+        result = await self.execute_sql(sql, params)
+        # An empty lookup that must be re-checked on the primary is not worth keeping
+        if len(result) > 0 or not fallback_on_empty:
+            self.cache.put(sql, params, result, generation)
+        return result
+
+    async def gather_sql(self, queries: List[Any], return_exceptions: bool = False) -> List[Any]:
+        """Run independent queries concurrently, each on its own pooled connection
+
+        Each entry is either a SQL string or a (sql, params) pair. Unlike
+        execute_batch the statements do not share a transaction.
+        """
+        coroutines = []
+        for query in queries:
+            sql, params = (query, []) if isinstance(query, str) else query
+            coroutines.append(self.execute_sql(sql, params))
+        return await gather(*coroutines, return_exceptions=return_exceptions)
+
+    # User management methods
+    async def create_user(self, email: str, password: str, first_name: str, last_name: str) -> Dict[str, Any]:
+        """Create a new user"""
+        try:
+            # bcrypt is deliberately slow; keep it off the event loop
+            password_hash = (await asyncio.to_thread(
+                bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt()
+            )).decode('utf-8')
+            verification_token = secrets.token_urlsafe(32)
+
+            # Existence check and INSERT are one statement; the statements endpoint
+            # reports no last_insert_rowid, so the id comes back through RETURNING
+            inserted = (await self.execute_sql('''
+                INSERT INTO users (email, password_hash, first_name, last_name, verification_token)
+                SELECT ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM users WHERE email = ?)
+                RETURNING id
+            ''', [email, password_hash, first_name, last_name, verification_token, email])).first()
+
+            if inserted is None:
+                return {'success': False, 'error': 'User already exists'}
+
+            return {'success': True, 'user_id': inserted['id'], 'verification_token': verification_token}
+
+        except Exception as e:
+            logger.error("❌ Error creating user: %s", e)
+            return {'success': False, 'error': str(e)}
+
+    async def authenticate_user(self, email: str, password: str) -> Dict[str, Any]:
+        """Authenticate user login"""
+        try:
+            result = await self.execute_sql(
+                "SELECT id, password_hash, first_name, last_name, is_verified FROM users WHERE email = ?",
+                [email]
+            )
+
+            user_data = result.first()
+            if user_data is None:
+                return {'success': False, 'error': 'Invalid credentials'}
+
+            user_id, password_hash, first_name, last_name, is_verified = user_data
+
+            password_ok = await asyncio.to_thread(
+                bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8')
+            )
+            if not password_ok:
+                return {'success': False, 'error': 'Invalid credentials'}
+
+            token = secrets.token_urlsafe(32)
+            expires_at = (datetime.now() + timedelta(days=30)).isoformat()
+
+            await self.execute_sql('''
+                INSERT INTO session_tokens (user_id, token, expires_at)
+                VALUES (?, ?, ?)
+            ''', [user_id, token, expires_at])
+
+            return {
+                'success': True,
+                'user_id': user_id,
+                'token': token,
+                'first_name': first_name,
+                'last_name': last_name,
+                'is_verified': is_verified
+            }
+
+        except Exception as e:
+            logger.error("❌ Error authenticating user: %s", e)
+            return {'success': False, 'error': str(e)}
+
+    async def get_user_by_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """Get user by session token"""
+        try:
+            # Expiry is checked here rather than in SQL so the query stays cacheable
+            result = await self.execute_read('''
+                SELECT u.id, u.email, u.first_name, u.last_name, u.is_verified, st.expires_at
+                FROM users u
+                JOIN session_tokens st ON u.id = st.user_id
+                WHERE st.token = ?
+            ''', [token], fallback_on_empty=True)
+
+            user_data = result.first()
+            if user_data is not None and str(user_data[5]) > datetime.now().isoformat():
+                return {
+                    'id': user_data[0],
+                    'email': user_data[1],
+                    'first_name': user_data[2],
+                    'last_name': user_data[3],
+                    'is_verified': user_data[4]
+                }
+            return None
+
+        except Exception as e:
+            logger.error("❌ Error getting user by token: %s", e)
+            return None
+
+    def transport_metrics(self) -> Dict[str, Any]:
+        """Retry counts and circuit breaker state"""
+        return self.retry_policy.metrics_snapshot()
+
+    async def aclose(self):
+        """Close pooled connections for the running loop"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+        if self._fallback_transport is not None:
+            self._fallback_transport.close()
+
+
+class SyncTursoDatabase:
+    """Blocking facade over AsyncTursoDatabase for existing synchronous callers"""
+
+    def __init__(self, async_db: AsyncTursoDatabase):
+        self.async_db = async_db
+
+    def execute_sql(self, sql: str, params: List = None, idempotent: Optional[bool] = None) -> ResultSet:
+        return run_sync(self.async_db.execute_sql(sql, params, idempotent))
+
+    def execute_batch(self, statements: List[Any], transaction: bool = False,
+                      idempotent: Optional[bool] = None) -> List[ResultSet]:
+        return run_sync(self.async_db.execute_batch(statements, transaction, idempotent))
+
+    def execute_read(self, sql: str, params: List = None, fallback_on_empty: bool = False) -> ResultSet:
+        return run_sync(self.async_db.execute_read(sql, params, fallback_on_empty))
+
+    def gather_sql(self, queries: List[Any], return_exceptions: bool = False) -> List[Any]:
+        return run_sync(self.async_db.gather_sql(queries, return_exceptions))
+
+    def create_user(self, email: str, password: str, first_name: str, last_name: str) -> Dict[str, Any]:
+        return run_sync(self.async_db.create_user(email, password, first_name, last_name))
+
+    def authenticate_user(self, email: str, password: str) -> Dict[str, Any]:
+        return run_sync(self.async_db.authenticate_user(email, password))
+
+    def get_user_by_token(self, token: str) -> Optional[Dict[str, Any]]:
+        return run_sync(self.async_db.get_user_by_token(token))
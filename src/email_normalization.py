@@ -0,0 +1,103 @@
+"""
+Normalized Email Columns
+A stored, indexed email_normalized column per form table, so duplicate checks are index lookups instead of scans
+"""
+
+from typing import Optional, Dict, Any, List, Callable
+
+try:
+    from src.log_utils import get_logger
+except ImportError:
+    from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Form table -> the column email_normalized is derived from
+NORMALIZED_EMAIL_SOURCES = {
+    'membership_applications': 'email',
+    'bank_of_ideas': 'email',
+    'general_suggestions': 'email',
+    'member_nominations': 'nominator_email',
+}
+
+# One application per email; ideas, suggestions and nominations may repeat
+UNIQUE_NORMALIZED_EMAIL_TABLES = ('membership_applications',)
+
+# Rows read and updated per backfill transaction
+DEFAULT_BACKFILL_BATCH_SIZE = 500
+
+
+def normalize_email(email: Optional[str]) -> str:
+    """The form of an address that duplicate checks compare: trimmed and lowercased"""
+    return (email or '').strip().lower()
+
+
+def normalized_email_match(table: str) -> str:
+    """WHERE condition finding an address in a form table; bind the normalized address twice
+
+    Rows the backfill has not reached (or left unset as duplicates) have no
+    email_normalized yet and are compared on their source column. SQLite
+    serves both branches from the email_normalized index.
+    """
+    source = NORMALIZED_EMAIL_SOURCES.get(table, 'email')
+    return f"(email_normalized = ? OR (email_normalized IS NULL AND LOWER(TRIM({source})) = ?))"
+
+
+def normalized_email_index_ddl() -> List[str]:
+    """CREATE INDEX statements for every email_normalized column"""
+    return [
+        f"CREATE {'UNIQUE ' if table in UNIQUE_NORMALIZED_EMAIL_TABLES else ''}INDEX IF NOT EXISTS "
+        f"idx_{table}_email_normalized ON {table} (email_normalized)"
+        for table in NORMALIZED_EMAIL_SOURCES
+    ]
+
+
+def missing_column_ddl(db) -> List[str]:
+    """ALTER TABLE statements for form tables created before email_normalized existed
+
+    One round trip; a table that does not exist yet gets the column from its
+    CREATE TABLE instead.
+    """
+    tables = list(NORMALIZED_EMAIL_SOURCES)
+    results = db.execute_batch([f"PRAGMA table_info({table})" for table in tables])
+    statements = []
+    for table, result in zip(tables, results):
+        columns = {row['name'] for row in result}
+        if columns and 'email_normalized' not in columns:
+            statements.append(f"ALTER TABLE {table} ADD COLUMN email_normalized TEXT")
+    return statements
+
+
+def backfill_normalized_emails(db, batch_size: int = DEFAULT_BACKFILL_BATCH_SIZE,
+                               progress: Optional[Callable[[str, int], None]] = None) -> Dict[str, Dict[str, Any]]:
+    """Fill email_normalized for rows written before the column existed
+
+    Walks each table by id in batches of batch_size, one short transaction
+    per batch, so it can run against the live database and be re-run after
+    an interruption. A row whose address collides with another application
+    under the unique index is left NULL and reported in conflicting_ids
+    (clean_duplicate_emails.py removes such duplicates).
+    """
+    report: Dict[str, Dict[str, Any]] = {}
+    for table, source in NORMALIZED_EMAIL_SOURCES.items():
+        last_id, updated, conflicting_ids = 0, 0, []
+        while True:
+            page = db.execute_sql(
+                f"SELECT id, {source} FROM {table} WHERE id > ? AND email_normalized IS NULL ORDER BY id LIMIT ?",
+                [last_id, int(batch_size)]
+            ).rows
+            if not page:
+                break
+            updates = [[normalize_email(row[source]), row['id']] for row in page]
+            result = db.executemany(f"UPDATE {table} SET email_normalized = ? WHERE id = ?", updates,
+                                    chunk_size=batch_size)
+            updated += result['applied']
+            conflicting_ids.extend(updates[error['index']][1] for error in result['errors'])
+            last_id = page[-1]['id']
+            if progress is not None:
+                progress(table, updated)
+        if conflicting_ids:
+            logger.warning("⚠️ %s: %s rows share a normalized email and were left unset",
+                           table, len(conflicting_ids))
+        report[table] = {'updated': updated, 'conflicting_ids': conflicting_ids}
+    return report
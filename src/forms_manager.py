@@ -1,20 +1,26 @@
 try:
     from src.database import Database
+    from src.metrics import instrumented_submit
+    from src.log_utils import get_logger
 except ImportError:
     from database import Database
+    from metrics import instrumented_submit
+    from log_utils import get_logger
 from typing import Dict, Any, Optional
 from datetime import datetime
-from termcolor import colored
+
+logger = get_logger(__name__)
 
 class FormsManager:
     def __init__(self, db: Database):
         self.db = db
     
+    @instrumented_submit("gcs", "membership")
     def submit_membership_application(self, user_id: Optional[int], form_data: Dict[str, Any]) -> Dict[str, Any]:
         """Submit membership application"""
         conn = None
         try:
-            print(colored("📝 Submitting membership application...", "blue"))
+            logger.debug("📝 Submitting membership application...")
             conn = self.db.get_connection()
             cursor = conn.cursor()
             
@@ -41,24 +47,25 @@ class FormsManager:
                 datetime.now()
             ))
             
-            application_id = cursor.lastrowid
-            self.db.commit_and_upload(conn)
-            print(colored("✅ Membership application submitted successfully", "green"))
+            # Ids can change when the insert is re-applied on a newer copy
+            application_id = self.db.commit_and_upload(conn)
+            logger.info("✅ Membership application submitted successfully")
             
             return {'success': True, 'application_id': application_id}
             
         except Exception as e:
-            print(colored(f"❌ Error submitting membership application: {e}", "red"))
+            logger.error("❌ Error submitting membership application: %s", e)
             return {'success': False, 'error': str(e)}
         finally:
             if conn:
                 self.db.close_connection(conn)
 
+    @instrumented_submit("gcs", "bank_of_ideas")
     def submit_bank_of_ideas(self, user_id: Optional[int], form_data: Dict[str, Any]) -> Dict[str, Any]:
         """Submit bank of ideas suggestion (Research Project Ideas)"""
         conn = None
         try:
-            print(colored("📝 Submitting bank of ideas suggestion...", "blue"))
+            logger.debug("📝 Submitting bank of ideas suggestion...")
             conn = self.db.get_connection()
             cursor = conn.cursor()
             
@@ -80,24 +87,24 @@ class FormsManager:
                 datetime.now()
             ))
             
-            suggestion_id = cursor.lastrowid
-            self.db.commit_and_upload(conn)
-            print(colored("✅ Bank of ideas suggestion submitted successfully", "green"))
+            suggestion_id = self.db.commit_and_upload(conn)
+            logger.info("✅ Bank of ideas suggestion submitted successfully")
             
             return {'success': True, 'suggestion_id': suggestion_id}
             
         except Exception as e:
-            print(colored(f"❌ Error submitting bank of ideas: {e}", "red"))
+            logger.error("❌ Error submitting bank of ideas: %s", e)
             return {'success': False, 'error': str(e)}
         finally:
             if conn:
                 self.db.close_connection(conn)
     
+    @instrumented_submit("gcs", "general_suggestion")
     def submit_general_suggestion(self, user_id: Optional[int], form_data: Dict[str, Any]) -> Dict[str, Any]:
         """Submit general suggestion"""
         conn = None
         try:
-            print(colored("📝 Submitting general suggestion...", "blue"))
+            logger.debug("📝 Submitting general suggestion...")
             conn = self.db.get_connection()
             cursor = conn.cursor()
             
@@ -115,24 +122,24 @@ class FormsManager:
                 datetime.now()
             ))
             
-            suggestion_id = cursor.lastrowid
-            self.db.commit_and_upload(conn)
-            print(colored("✅ General suggestion submitted successfully", "green"))
+            suggestion_id = self.db.commit_and_upload(conn)
+            logger.info("✅ General suggestion submitted successfully")
             
             return {'success': True, 'suggestion_id': suggestion_id}
             
         except Exception as e:
-            print(colored(f"❌ Error submitting general suggestion: {e}", "red"))
+            logger.error("❌ Error submitting general suggestion: %s", e)
             return {'success': False, 'error': str(e)}
         finally:
             if conn:
                 self.db.close_connection(conn)
     
+    @instrumented_submit("gcs", "member_nomination")
     def submit_member_nomination(self, user_id: Optional[int], form_data: Dict[str, Any]) -> Dict[str, Any]:
         """Submit member nomination"""
         conn = None
         try:
-            print(colored("📝 Submitting member nomination...", "blue"))
+            logger.debug("📝 Submitting member nomination...")
             conn = self.db.get_connection()
             cursor = conn.cursor()
             
@@ -152,24 +159,24 @@ class FormsManager:
                 form_data['nominating_member_name'], datetime.now()
             ))
             
-            nomination_id = cursor.lastrowid
-            self.db.commit_and_upload(conn)
-            print(colored("✅ Member nomination submitted successfully", "green"))
+            nomination_id = self.db.commit_and_upload(conn)
+            logger.info("✅ Member nomination submitted successfully")
             
             return {'success': True, 'nomination_id': nomination_id}
             
         except Exception as e:
-            print(colored(f"❌ Error submitting member nomination: {e}", "red"))
+            logger.error("❌ Error submitting member nomination: %s", e)
             return {'success': False, 'error': str(e)}
         finally:
             if conn:
                 self.db.close_connection(conn)
     
+    @instrumented_submit("gcs", "research_database")
     def submit_research_database(self, user_id: Optional[int], form_data: Dict[str, Any]) -> Dict[str, Any]:
         """Submit research database entry"""
         conn = None
         try:
-            print(colored("📝 Submitting research database entry...", "blue"))
+            logger.debug("📝 Submitting research database entry...")
             conn = self.db.get_connection()
             cursor = conn.cursor()
             
@@ -189,14 +196,13 @@ class FormsManager:
                 form_data.get('article_third_classification'), datetime.now()
             ))
             
-            research_id = cursor.lastrowid
-            self.db.commit_and_upload(conn)
-            print(colored("✅ Research database entry submitted successfully", "green"))
+            research_id = self.db.commit_and_upload(conn)
+            logger.info("✅ Research database entry submitted successfully")
             
             return {'success': True, 'research_id': research_id}
             
         except Exception as e:
-            print(colored(f"❌ Error submitting research database entry: {e}", "red"))
+            logger.error("❌ Error submitting research database entry: %s", e)
             return {'success': False, 'error': str(e)}
         finally:
             if conn:
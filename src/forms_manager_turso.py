@@ -5,66 +5,130 @@ Direct form submissions to cloud database without file handling
 
 try:
     from src.database_turso import TursoDatabase
+    from src.database_turso_async import AsyncTursoDatabase, run_sync
+    from src.turso_results import ResultSet
+    from src.metrics import instrumented_submit
+    from src.email_normalization import NORMALIZED_EMAIL_SOURCES, normalize_email, normalized_email_match
+    from src.log_utils import get_logger
 except ImportError:
     from database_turso import TursoDatabase
+    from database_turso_async import AsyncTursoDatabase, run_sync
+    from turso_results import ResultSet
+    from metrics import instrumented_submit
+    from email_normalization import NORMALIZED_EMAIL_SOURCES, normalize_email, normalized_email_match
+    from log_utils import get_logger
 
-from typing import Dict, Any, Optional
+logger = get_logger(__name__)
+
+import re
+from typing import Dict, Any, Optional, List, Union
 from datetime import datetime
-from termcolor import colored
+
+DUPLICATE_EMAIL_RESULT = {
+    'success': False, 
+    'error': 'duplicate_email',
+    'error_en': 'Membership information for this email has already been submitted.',
+    'error_ar': 'معلومات العضوية للبريد الإلكتروني المستخدم تم إدخالها من قبل'
+}
+
+# Authors inserted per research_authors statement; four parameters each, far below SQLite's limit
+MAX_AUTHORS_PER_STATEMENT = 500
+
+
+def parse_authors(authors: Union[str, List[Any], None]) -> List[Dict[str, Optional[str]]]:
+    """Normalize the research form's authors into name/email/affiliation dicts, in order
+
+    Accepts a list of names or of dicts with those keys, or the form's free
+    text: one author per line or separated by semicolons, else by commas.
+    """
+    if not authors:
+        return []
+    if isinstance(authors, str):
+        separator = r"[;\n]" if re.search(r"[;\n]", authors) else ","
+        authors = re.split(separator, authors)
+    parsed = []
+    for author in authors:
+        if isinstance(author, dict):
+            name = (author.get('name') or author.get('author_name') or '').strip()
+            email = author.get('email') or author.get('author_email')
+            affiliation = author.get('affiliation') or author.get('author_affiliation')
+        else:
+            name, email, affiliation = str(author).strip(), None, None
+        if name:
+            parsed.append({'name': name, 'email': email, 'affiliation': affiliation})
+    return parsed
 
 class TursoFormsManager:
     def __init__(self, db: TursoDatabase):
         self.db = db
+        self._async_db = None
+    
+    @property
+    def async_db(self) -> AsyncTursoDatabase:
+        """Async client for the same database, created on first use"""
+        if self._async_db is None:
+            self._async_db = AsyncTursoDatabase.from_database(self.db)
+        return self._async_db
+    
+    def _insert_with_user_check(self, user_id: Optional[int], insert_sql: str, params: List) -> ResultSet:
+        """Run an INSERT whose first value is `(SELECT id FROM users WHERE id = ?)`
+        
+        The user lookup and the INSERT share one round trip; an unknown user id
+        resolves to NULL inside the statement instead of violating the foreign key.
+        Both run as stored SQL, so after the first submission on a stream only
+        the arguments travel.
+        """
+        if not user_id:
+            return self.db.execute_stored([(insert_sql, params)])[0]
+        
+        user_probe = ("SELECT id FROM users WHERE id = ?", [user_id])
+        user_result = self.db.cache.get(*user_probe)
+        if user_result is not None or self.db.replica is not None:
+            # The probe only feeds a warning, so a cached or replica answer is good enough
+            if user_result is None:
+                user_result = self.db.execute_read(*user_probe)
+            insert_result = self.db.execute_stored([(insert_sql, params)])[0]
+        else:
+            generation = self.db.cache.generation(user_probe[0])
+            user_result, insert_result = self.db.execute_stored([user_probe, (insert_sql, params)])
+            self.db.cache.put(*user_probe, user_result, generation)
+        
+        if user_result.first() is None:
+            logger.warning("⚠️ User ID %s not found, setting to NULL", user_id)
+        
+        return insert_result
+    
+    def _journal_insert(self, form_name: str, insert_sql: str, params: List,
+                        dedupe_key: Optional[str] = None) -> Optional[str]:
+        """Queue an INSERT on the write-behind journal and return its idempotency key
+        
+        The submission is durable once this returns; the user lookup subquery
+        resolves when the background flusher applies it. Returns None when a
+        submission with the same dedupe_key is still waiting to be flushed.
+        """
+        return self.db.journal.append(form_name, [(insert_sql, params)], dedupe_key=dedupe_key)
     
     def check_email_exists(self, email: str, table_name: str = 'membership_applications') -> Dict[str, Any]:
         """Check if email already exists in the specified table (case-insensitive)"""
         try:
             # Convert email to lowercase for case-insensitive comparison
-            email_lower = email.lower().strip()
-            print(colored(f"🔍 Checking if email exists: {email_lower} in table: {table_name}", "blue"))
-            
-
-            
-            # Query database with case-insensitive comparison
-            result = self.db.execute_sql(
-                f"SELECT id, email FROM {table_name} WHERE LOWER(TRIM(email)) = ?", 
-                [email_lower]
+            email_lower = normalize_email(email)
+            logger.debug("🔍 Checking if email exists: %s in table: %s", email_lower, table_name)
+            
+            # Index lookup on the stored normalized address; served by the local
+            # replica when enabled (the submit itself re-checks on the primary)
+            source = NORMALIZED_EMAIL_SOURCES.get(table_name, 'email')
+            result = self.db.execute_read(
+                f"SELECT id, {source} AS email FROM {table_name} WHERE {normalized_email_match(table_name)}", 
+                [email_lower, email_lower]
             )
             
             # Check if any rows were returned
-            has_existing = False
-            existing_email = None
-            
-            # Handle both list and dict result formats from Turso
-            if isinstance(result, dict) and result.get('results'):
-                results_data = result['results']
-                
-                # Check if it's the converted format (list wrapped in dict)
-                if isinstance(results_data, list) and len(results_data) > 0:
-                    # Original Turso list format converted to dict
-                    first_result = results_data[0]
-                    
-                    # Check for nested results structure
-                    if isinstance(first_result, dict):
-                        if 'results' in first_result and isinstance(first_result['results'], dict):
-                            # Nested structure: result['results'][0]['results']['rows']
-                            nested_results = first_result['results']
-                            rows = nested_results.get('rows', [])
-                        elif 'rows' in first_result:
-                            # Direct structure: result['results'][0]['rows']
-                            rows = first_result.get('rows', [])
-                        else:
-                            rows = []
-                    else:
-                        rows = []
-                else:
-                    # Direct dict format
-                    rows = results_data.get('rows', [])
-                
-                if rows and len(rows) > 0:
-                    has_existing = True
-                    existing_email = rows[0][1] if len(rows[0]) > 1 else email
-                    print(colored(f"🔍 Found existing email: {existing_email}", "yellow"))
+            existing = result.first()
+            has_existing = existing is not None
+            existing_email = existing['email'] if has_existing else None
+            if has_existing:
+                logger.debug("🔍 Found existing email: %s", existing_email)
             
             return {
                 'exists': has_existing,
@@ -73,20 +137,50 @@ class TursoFormsManager:
             }
             
         except Exception as e:
-            print(colored(f"❌ Error checking email existence: {e}", "red"))
+            logger.error("❌ Error checking email existence: %s", e)
             return {'exists': False, 'error': str(e)}
     
+    def check_submission_prerequisites(self, user_id: Optional[int], email: str,
+                                       table_name: str = 'membership_applications') -> Dict[str, Any]:
+        """Run the user-existence and email-duplicate checks concurrently
+        
+        Both queries are independent, so they go out at the same time and the
+        caller waits for one round trip instead of two.
+        """
+        try:
+            email_lower = normalize_email(email)
+            source = NORMALIZED_EMAIL_SOURCES.get(table_name, 'email')
+            queries = [(f"SELECT id, {source} AS email FROM {table_name} WHERE {normalized_email_match(table_name)}",
+                        [email_lower, email_lower])]
+            if user_id:
+                queries.append(("SELECT id FROM users WHERE id = ?", [user_id]))
+            
+            results = run_sync(self.async_db.gather_sql(queries))
+            
+            existing = results[0].first()
+            return {
+                'user_exists': bool(user_id) and results[1].first() is not None,
+                'email_exists': existing is not None,
+                'existing_email': existing['email'] if existing is not None else None,
+                'queried_email': email_lower
+            }
+            
+        except Exception as e:
+            logger.error("❌ Error checking submission prerequisites: %s", e)
+            return {'user_exists': False, 'email_exists': False, 'error': str(e)}
+    
+    @instrumented_submit("turso", "membership")
     def submit_membership_application(self, user_id: Optional[int], form_data: Dict[str, Any]) -> Dict[str, Any]:
         """Submit membership application directly to cloud"""
         try:
-            print(colored("📝 Submitting membership application to cloud...", "blue"))
+            logger.debug("📝 Submitting membership application to cloud...")
             
-            # Check if email already exists (case-insensitive and space-trimmed)
-            email = form_data['email'].strip().lower()
+            # Normalize email (case-insensitive and space-trimmed)
+            email = normalize_email(form_data['email'])
             
             # Validate email doesn't contain internal spaces
             if ' ' in email:
-                print(colored(f"❌ Email contains internal spaces: {email}", "red"))
+                logger.error("❌ Email contains internal spaces: %s", email)
                 return {
                     'success': False, 
                     'error': 'invalid_email_spaces',
@@ -96,95 +190,96 @@ class TursoFormsManager:
             
             form_data['email'] = email  # Update form data with normalized email
             
-            email_check = self.check_email_exists(email, 'membership_applications')
-            
-            if email_check.get('exists'):
-                existing_email = email_check.get('existing_email', email)
-                print(colored(f"❌ Email {email} already exists as {existing_email}", "red"))
-                return {
-                    'success': False, 
-                    'error': 'duplicate_email',
-                    'error_en': 'Membership information for this email has already been submitted.',
-                    'error_ar': 'معلومات العضوية للبريد الإلكتروني المستخدم تم إدخالها من قبل'
-                }
-            
-            print(colored(f"✅ Email {email} is available for new application", "green"))
-            
             # Split full name into first and last name
             full_name = form_data.get('full_name', '')
             name_parts = full_name.split(' ', 1)
             first_name = name_parts[0] if name_parts else ''
             last_name = name_parts[1] if len(name_parts) > 1 else ''
             
-            result = self.db.execute_sql('''
+            # Check and insert are one statement: the unique index on email_normalized
+            # turns a duplicate (including a concurrent one) into no row, so RETURNING
+            # tells the outcome without a separate SELECT. Rows not backfilled yet
+            # have no email_normalized and are matched on email instead
+            insert_sql = '''
                 INSERT INTO membership_applications (
-                    user_id, first_name, last_name, email, phone_number,
+                    user_id, first_name, last_name, email, email_normalized, phone_number,
                     country, highest_degree, field_of_study, institution,
                     current_occupation, organization, position,
                     primary_research_area, motivation, application_date
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', [
-                user_id, first_name, last_name, form_data['email'],
+                )
+                SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM membership_applications
+                    WHERE email_normalized IS NULL AND LOWER(TRIM(email)) = ?
+                )
+                ON CONFLICT DO NOTHING
+                RETURNING id
+            '''
+            params = [
+                user_id, first_name, last_name, form_data['email'], email,
                 form_data.get('phone', ''), form_data.get('country', ''),
                 form_data.get('academic_degree', ''), form_data.get('specialization', ''),
                 form_data.get('institution', ''), form_data.get('position', ''),
                 form_data.get('institution', ''), form_data.get('position', ''),
                 form_data.get('research_interests', ''), form_data.get('motivation', ''),
-                datetime.now().isoformat()
-            ])
-            
-            # Get the inserted application ID
-            application_id = None
-            if self.db._is_valid_result(result, check_rows=False) and result['results'][0].get('last_insert_rowid'):
-                application_id = result['results'][0]['last_insert_rowid']
-            
-            print(colored("✅ Membership application submitted successfully", "green"))
-            return {'success': True, 'application_id': application_id}
+                datetime.now().isoformat(), email
+            ]
+            
+            if self.db.journal is not None:
+                # The INSERT is applied later, so the duplicate and user checks run now,
+                # concurrently; if Turso cannot answer, the flush still rejects duplicates
+                prerequisites = self.check_submission_prerequisites(user_id, email)
+                if prerequisites.get('error'):
+                    logger.warning("⚠️ Could not check %s before journaling: %s", email, prerequisites['error'])
+                elif prerequisites['email_exists']:
+                    logger.error("❌ Email %s already exists", email)
+                    return dict(DUPLICATE_EMAIL_RESULT)
+                elif user_id and not prerequisites['user_exists']:
+                    logger.warning("⚠️ User ID %s not found, setting to NULL", user_id)
+                    params[0] = None
+                submission_key = self._journal_insert('membership_applications', insert_sql, params,
+                                                      dedupe_key=f"membership_applications:{email}")
+                if submission_key is None:
+                    logger.error("❌ Email %s already has a pending application", email)
+                    return dict(DUPLICATE_EMAIL_RESULT)
+                logger.info("✅ Membership application accepted for write-behind")
+                return {'success': True, 'application_id': None, 'submission_key': submission_key}
+            
+            inserted = self.db.execute_stored([(insert_sql, params)])[0].first()
+            if inserted is None:
+                logger.error("❌ Email %s already exists", email)
+                return dict(DUPLICATE_EMAIL_RESULT)
+            
+            logger.info("✅ Membership application submitted successfully")
+            return {'success': True, 'application_id': inserted['id']}
             
         except Exception as e:
-            print(colored(f"❌ Error submitting membership application: {e}", "red"))
+            logger.error("❌ Error submitting membership application: %s", e)
             error_str = str(e)
             
             # Check if it's a unique constraint violation (duplicate email)
             if 'unique' in error_str.lower() or 'constraint' in error_str.lower():
-                print(colored(f"❌ Detected unique constraint violation for email", "red"))
-                return {
-                    'success': False, 
-                    'error': 'duplicate_email',
-                    'error_en': 'Membership information for this email has already been submitted.',
-                    'error_ar': 'معلومات العضوية للبريد الإلكتروني المستخدم تم إدخالها من قبل'
-                }
+                logger.error("❌ Detected unique constraint violation for email")
+                return dict(DUPLICATE_EMAIL_RESULT)
             
             return {'success': False, 'error': error_str}
 
+    @instrumented_submit("turso", "bank_of_ideas")
     def submit_bank_of_ideas(self, user_id: Optional[int], form_data: Dict[str, Any]) -> Dict[str, Any]:
         """Submit bank of ideas suggestion directly to cloud"""
         try:
-            print(colored("📝 Submitting bank of ideas suggestion to cloud...", "blue"))
+            logger.debug("📝 Submitting bank of ideas suggestion to cloud...")
             
-            # Handle case where user_id might cause foreign key constraint
-            safe_user_id = None
-            if user_id:
-                try:
-                    check_result = self.db.execute_sql("SELECT id FROM users WHERE id = ?", [user_id])
-                    if self.db._is_valid_result(check_result):
-                        safe_user_id = user_id
-                    else:
-                        print(colored(f"⚠️ User ID {user_id} not found, setting to NULL", "yellow"))
-                        safe_user_id = None
-                except Exception as e:
-                    print(colored(f"⚠️ Error checking user ID: {e}, setting to NULL", "yellow"))
-                    safe_user_id = None
-            
-            result = self.db.execute_sql('''
+            insert_sql = '''
                 INSERT INTO bank_of_ideas (
-                    user_id, email, submitter_name, title_degrees, project_title,
+                    user_id, email, email_normalized, submitter_name, title_degrees, project_title,
                     project_nature, project_nature_other, project_type, project_type_other,
                     brief_description, specialization_area, objectives, benefits,
                     web_links, additional_notes, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', [
-                safe_user_id, form_data['email'], form_data['submitter_name'],
+                ) VALUES ((SELECT id FROM users WHERE id = ?), ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            '''
+            params = [
+                user_id, form_data['email'], normalize_email(form_data['email']), form_data['submitter_name'],
                 form_data['title_degrees'], form_data['project_title'],
                 form_data['project_nature'], form_data.get('project_nature_other'),
                 form_data['project_type'], form_data.get('project_type_other'),
@@ -192,47 +287,41 @@ class TursoFormsManager:
                 form_data['objectives'], form_data['benefits'],
                 form_data.get('web_links'), form_data.get('additional_notes'),
                 datetime.now().isoformat()
-            ])
+            ]
             
-            suggestion_id = None
-            if result.get('results') and result['results'][0].get('last_insert_rowid'):
-                suggestion_id = result['results'][0]['last_insert_rowid']
+            if self.db.journal is not None:
+                submission_key = self._journal_insert('bank_of_ideas', insert_sql, params)
+                logger.info("✅ Bank of ideas suggestion accepted for write-behind")
+                return {'success': True, 'suggestion_id': None, 'submission_key': submission_key}
             
-            print(colored("✅ Bank of ideas suggestion submitted successfully", "green"))
+            result = self._insert_with_user_check(user_id, insert_sql, params)
+            
+            suggestion_id = result.last_insert_rowid
+            
+            logger.info("✅ Bank of ideas suggestion submitted successfully")
             return {'success': True, 'suggestion_id': suggestion_id}
             
         except Exception as e:
-            print(colored(f"❌ Error submitting bank of ideas: {e}", "red"))
+            logger.error("❌ Error submitting bank of ideas: %s", e)
             return {'success': False, 'error': str(e)}
     
+    @instrumented_submit("turso", "general_suggestion")
     def submit_general_suggestion(self, user_id: Optional[int], form_data: Dict[str, Any]) -> Dict[str, Any]:
         """Submit general suggestion directly to cloud"""
         try:
-            print(colored("📝 Submitting general suggestion to cloud...", "blue"))
+            logger.debug("📝 Submitting general suggestion to cloud...")
             
-            # Handle case where user_id might cause foreign key constraint
-            safe_user_id = None
-            if user_id:
-                try:
-                    check_result = self.db.execute_sql("SELECT id FROM users WHERE id = ?", [user_id])
-                    if self.db._is_valid_result(check_result):
-                        safe_user_id = user_id
-                    else:
-                        print(colored(f"⚠️ User ID {user_id} not found, setting to NULL", "yellow"))
-                        safe_user_id = None
-                except Exception as e:
-                    print(colored(f"⚠️ Error checking user ID: {e}, setting to NULL", "yellow"))
-                    safe_user_id = None
-            
-            result = self.db.execute_sql('''
+            insert_sql = '''
                 INSERT INTO general_suggestions (
-                    user_id, email, full_name, suggestion_type, suggestion_title,
+                    user_id, email, email_normalized, full_name, suggestion_type, suggestion_title,
                     suggestion_description, priority_level, implementation_timeline,
                     additional_comments, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', [
-                safe_user_id, 
+                ) VALUES ((SELECT id FROM users WHERE id = ?), ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            '''
+            params = [
+                user_id, 
                 form_data['email'], 
+                normalize_email(form_data['email']),
                 form_data['name'],  # maps to full_name
                 form_data['category'],  # maps to suggestion_type
                 form_data['subject'],  # maps to suggestion_title
@@ -241,49 +330,43 @@ class TursoFormsManager:
                 '',  # implementation_timeline not collected in form
                 form_data.get('additional_info', ''),  # maps to additional_comments
                 datetime.now().isoformat()
-            ])
+            ]
+            
+            if self.db.journal is not None:
+                submission_key = self._journal_insert('general_suggestions', insert_sql, params)
+                logger.info("✅ General suggestion accepted for write-behind")
+                return {'success': True, 'suggestion_id': None, 'submission_key': submission_key}
             
-            suggestion_id = None
-            if result.get('results') and result['results'][0].get('last_insert_rowid'):
-                suggestion_id = result['results'][0]['last_insert_rowid']
+            result = self._insert_with_user_check(user_id, insert_sql, params)
             
-            print(colored("✅ General suggestion submitted successfully", "green"))
+            suggestion_id = result.last_insert_rowid
+            
+            logger.info("✅ General suggestion submitted successfully")
             return {'success': True, 'suggestion_id': suggestion_id}
             
         except Exception as e:
-            print(colored(f"❌ Error submitting general suggestion: {e}", "red"))
+            logger.error("❌ Error submitting general suggestion: %s", e)
             return {'success': False, 'error': str(e)}
     
+    @instrumented_submit("turso", "member_nomination")
     def submit_member_nomination(self, user_id: Optional[int], form_data: Dict[str, Any]) -> Dict[str, Any]:
         """Submit member nomination directly to cloud"""
         try:
-            print(colored("📝 Submitting member nomination to cloud...", "blue"))
+            logger.debug("📝 Submitting member nomination to cloud...")
             
-            # Handle case where user_id might cause foreign key constraint
-            safe_user_id = None
-            if user_id:
-                try:
-                    check_result = self.db.execute_sql("SELECT id FROM users WHERE id = ?", [user_id])
-                    if self.db._is_valid_result(check_result):
-                        safe_user_id = user_id
-                    else:
-                        print(colored(f"⚠️ User ID {user_id} not found, setting to NULL", "yellow"))
-                        safe_user_id = None
-                except Exception as e:
-                    print(colored(f"⚠️ Error checking user ID: {e}, setting to NULL", "yellow"))
-                    safe_user_id = None
-            
-            result = self.db.execute_sql('''
+            insert_sql = '''
                 INSERT INTO member_nominations (
-                    nominator_user_id, nominator_email, nominator_name, nominee_name, nominee_full_name, nominee_place_of_work,
+                    nominator_user_id, nominator_email, email_normalized, nominator_name, nominee_name, nominee_full_name, nominee_place_of_work,
                     nominee_country, nominee_address, nominee_phone, nominee_url_link,
                     nominee_email, nominee_specialization, nominee_qualifications, nominee_expertise_areas,
                     nomination_reason, nominee_contribution_potential, relationship_to_nominee,
                     nominating_member_name, additional_information, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', [
-                safe_user_id, 
+                ) VALUES ((SELECT id FROM users WHERE id = ?), ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            '''
+            params = [
+                user_id, 
                 form_data['nominator_email'], 
+                normalize_email(form_data['nominator_email']),
                 form_data['nominating_member_name'],  # Use nominating_member_name for nominator_name too
                 form_data['nominee_full_name'],  # Use nominee_full_name for nominee_name too
                 form_data['nominee_full_name'],
@@ -302,49 +385,41 @@ class TursoFormsManager:
                 form_data['nominating_member_name'], 
                 form_data.get('additional_comments', ''),
                 datetime.now().isoformat()
-            ])
+            ]
+            
+            if self.db.journal is not None:
+                submission_key = self._journal_insert('member_nominations', insert_sql, params)
+                logger.info("✅ Member nomination accepted for write-behind")
+                return {'success': True, 'nomination_id': None, 'submission_key': submission_key}
             
-            nomination_id = None
-            if result.get('results') and result['results'][0].get('last_insert_rowid'):
-                nomination_id = result['results'][0]['last_insert_rowid']
+            result = self._insert_with_user_check(user_id, insert_sql, params)
             
-            print(colored("✅ Member nomination submitted successfully", "green"))
+            nomination_id = result.last_insert_rowid
+            
+            logger.info("✅ Member nomination submitted successfully")
             return {'success': True, 'nomination_id': nomination_id}
             
         except Exception as e:
-            print(colored(f"❌ Error submitting member nomination: {e}", "red"))
+            logger.error("❌ Error submitting member nomination: %s", e)
             return {'success': False, 'error': str(e)}
     
+    @instrumented_submit("turso", "research_database")
     def submit_research_database(self, user_id: Optional[int], form_data: Dict[str, Any]) -> Dict[str, Any]:
         """Submit research database entry directly to cloud"""
         try:
-            print(colored("📝 Submitting research database entry to cloud...", "blue"))
+            logger.debug("📝 Submitting research database entry to cloud...")
             
-            # Handle case where user_id might cause foreign key constraint
-            # If user_id is provided but doesn't exist, set to NULL
-            safe_user_id = None
-            if user_id:
-                try:
-                    # Check if user exists
-                    check_result = self.db.execute_sql("SELECT id FROM users WHERE id = ?", [user_id])
-                    if self.db._is_valid_result(check_result):
-                        safe_user_id = user_id
-                    else:
-                        print(colored(f"⚠️ User ID {user_id} not found, setting to NULL", "yellow"))
-                        safe_user_id = None
-                except Exception as e:
-                    print(colored(f"⚠️ Error checking user ID: {e}, setting to NULL", "yellow"))
-                    safe_user_id = None
-            
-            result = self.db.execute_sql('''
+            insert_sql = '''
                 INSERT INTO research_database (
                     user_id, publication_type, paper_title, conference_journal_book_title,
                     publisher_name, publication_year, keywords, abstract,
                     paper_url, article_classification, article_second_classification,
                     article_third_classification, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', [
-                safe_user_id,  # Use safe_user_id instead of user_id
+                ) VALUES ((SELECT id FROM users WHERE id = ?), ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                RETURNING id, user_id
+            '''
+            params = [
+                user_id,  # resolved to NULL by the subquery if the user does not exist
                 form_data['research_type'],  # maps to publication_type
                 form_data['title'],  # maps to paper_title
                 form_data['journal_conference'],  # maps to conference_journal_book_title
@@ -357,19 +432,56 @@ class TursoFormsManager:
                 form_data.get('language', ''),  # maps to article_second_classification
                 form_data.get('additional_notes', ''),  # maps to article_third_classification
                 datetime.now().isoformat()
-            ])
+            ]
+            
+            statements = [(insert_sql, params)] + self._research_author_statements(form_data.get('authors'))
             
-            research_id = None
-            if result.get('results') and result['results'][0].get('last_insert_rowid'):
-                research_id = result['results'][0]['last_insert_rowid']
+            if self.db.journal is not None:
+                submission_key = self.db.journal.append('research_database', statements)
+                logger.info("✅ Research database entry accepted for write-behind")
+                return {'success': True, 'research_id': None, 'submission_key': submission_key}
             
-            print(colored("✅ Research database entry submitted successfully", "green"))
-            return {'success': True, 'research_id': research_id}
+            # Paper and authors commit together in one round trip; the user check is
+            # the subquery, which stores NULL for a user that does not exist. The
+            # paper's id comes from its own RETURNING row
+            paper = self.db.execute_batch(statements, transaction=True)[0].first()
+            if user_id and paper['user_id'] is None:
+                logger.warning("⚠️ User ID %s not found, setting to NULL", user_id)
+            
+            logger.info("✅ Research database entry submitted successfully with %s author(s)", len(statements) - 1)
+            return {'success': True, 'research_id': paper['id']}
             
         except Exception as e:
-            print(colored(f"❌ Error submitting research database entry: {e}", "red"))
+            logger.error("❌ Error submitting research database entry: %s", e)
             return {'success': False, 'error': str(e)}
     
+    @staticmethod
+    def _research_author_statements(authors: Union[str, List[Any], None]) -> List[Any]:
+        """Multi-row INSERTs into research_authors for the paper inserted just before them
+        
+        The first reads the paper's id from last_insert_rowid(), each later
+        one from the research_id of the author row inserted last. The id is
+        taken once, in a MATERIALIZED CTE, as last_insert_rowid() moves on to
+        each author row while the VALUES list is inserted.
+        """
+        parsed = parse_authors(authors)
+        statements = []
+        for start in range(0, len(parsed), MAX_AUTHORS_PER_STATEMENT):
+            chunk = parsed[start:start + MAX_AUTHORS_PER_STATEMENT]
+            values = ", ".join("(?, ?, ?, ?)" for _ in chunk)
+            params: List[Any] = []
+            for order, author in enumerate(chunk, start=start + 1):
+                params.extend([author['name'], author['email'], author['affiliation'], order])
+            paper_id = ("SELECT last_insert_rowid()" if start == 0 else
+                        "SELECT research_id FROM research_authors WHERE id = last_insert_rowid()")
+            statements.append((
+                f"WITH paper (id) AS MATERIALIZED ({paper_id}) "
+                "INSERT INTO research_authors (research_id, author_name, author_email, author_affiliation, author_order) "
+                f"SELECT paper.id, column1, column2, column3, column4 FROM paper, (VALUES {values})",
+                params
+            ))
+        return statements
+    
     def get_form_fields(self, form_type: str, language: str = 'en') -> Dict[str, Any]:
         """Get form field definitions for different form types"""
         # This method remains the same as it's just configuration
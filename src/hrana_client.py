@@ -0,0 +1,469 @@
+"""
+Hrana over HTTP Client for Turso
+Stateful streams (v2/v3 pipeline) so several statements can share one server-side connection
+"""
+
+import base64
+import json
+import threading
+import time
+from typing import Optional, Dict, Any, List, Set, Iterator
+
+import requests
+
+
+try:
+    from src.turso_transport import TursoTransport
+    from src.turso_results import ResultSet, Row
+    from src.log_utils import get_logger
+except ImportError:
+    from turso_transport import TursoTransport
+    from turso_results import ResultSet, Row
+    from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Protocol versions we know how to speak, newest first
+SUPPORTED_HRANA_VERSIONS = (3, 2)
+
+# Turso drops streams after about 10 seconds without a request; reopen before that
+DEFAULT_STREAM_IDLE_TIMEOUT = 8.0
+
+# Bytes read from a cursor response at a time
+CURSOR_CHUNK_SIZE = 64 * 1024
+
+
+class HranaError(Exception):
+    """Raised when the server reports an error for a stream request"""
+
+    def __init__(self, message: str, code: Optional[str] = None):
+        super().__init__(f"{message} ({code})" if code else message)
+        self.message = message
+        self.code = code
+
+
+class HranaCursorUnsupported(HranaError):
+    """Raised when the server has no cursor endpoint (Hrana v2 only)"""
+
+
+def encode_value(value: Any) -> Dict[str, Any]:
+    """Encode a Python value as a Hrana value object"""
+    if value is None:
+        return {"type": "null"}
+    if isinstance(value, bool):
+        return {"type": "integer", "value": "1" if value else "0"}
+    if isinstance(value, int):
+        # Integers travel as strings so 64-bit values survive JSON
+        return {"type": "integer", "value": str(value)}
+    if isinstance(value, float):
+        return {"type": "float", "value": value}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"type": "blob", "base64": base64.b64encode(bytes(value)).decode('ascii')}
+    return {"type": "text", "value": str(value)}
+
+
+def decode_value(value: Dict[str, Any]) -> Any:
+    """Decode a Hrana value object into a Python value"""
+    value_type = value.get("type")
+    if value_type == "integer":
+        return int(value["value"])
+    if value_type == "float":
+        return float(value["value"])
+    if value_type == "text":
+        return value["value"]
+    if value_type == "blob":
+        return base64.b64decode(value.get("base64", ""))
+    return None
+
+
+def make_stmt(sql: str, params: List = None, want_rows: bool = True) -> Dict[str, Any]:
+    """Build a Hrana statement object with positional arguments"""
+    return {
+        "sql": sql,
+        "args": [encode_value(param) for param in (params or [])],
+        "want_rows": want_rows
+    }
+
+
+def make_stored_stmt(sql_id: int, params: List = None, want_rows: bool = True) -> Dict[str, Any]:
+    """Build a Hrana statement object that refers to SQL stored with store_sql"""
+    return {
+        "sql_id": sql_id,
+        "args": [encode_value(param) for param in (params or [])],
+        "want_rows": want_rows
+    }
+
+
+def decode_row(cells: List[Dict[str, Any]]) -> List[Any]:
+    """Decode one row of Hrana value objects"""
+    return [decode_value(cell) for cell in cells]
+
+
+def to_result_set(result: Dict[str, Any]) -> ResultSet:
+    """Wrap a Hrana execute result; typed cells are decoded when rows are read"""
+    last_insert_rowid = result.get("last_insert_rowid")
+    return ResultSet(
+        columns=[col.get("name") for col in result.get("cols", [])],
+        raw_rows=result.get("rows", []),
+        rows_affected=result.get("affected_row_count", 0),
+        last_insert_rowid=int(last_insert_rowid) if last_insert_rowid is not None else None,
+        decode=decode_row
+    )
+
+
+class SqlRegistry:
+    """Client-side ids for statement text stored on the server with store_sql
+
+    Ids are shared by every stream of one client; each stream tracks which
+    of them it has stored, so a replacement stream re-stores them on demand.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+
+    def register(self, sql: str) -> int:
+        """Return the id for a statement, assigning one on first use"""
+        with self._lock:
+            sql_id = self._ids.get(sql)
+            if sql_id is None:
+                sql_id = len(self._ids) + 1
+                self._ids[sql] = sql_id
+            return sql_id
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ids)
+
+
+class HranaStream:
+    """One server-side SQL connection addressed through the Hrana baton
+
+    Requests queued with begin() ride along with the next execute(), and
+    commit()/rollback() can close the stream in the same round trip, so a
+    read-then-write transaction costs two HTTP requests. A stream is a
+    sequence of dependent requests and must not be shared between threads.
+    """
+
+    def __init__(self, transport: TursoTransport, base_url: str, version: int = 3, timeout: float = 30,
+                 registry: Optional[SqlRegistry] = None):
+        self.transport = transport
+        self.base_url = base_url.rstrip('/')
+        self.version = version if version in SUPPORTED_HRANA_VERSIONS else SUPPORTED_HRANA_VERSIONS[0]
+        self.timeout = timeout
+        self.baton: Optional[str] = None
+        self.closed = False
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self.registry = registry
+        self._stored: Set[int] = set()  # sql ids stored on this stream
+        self.last_used = time.monotonic()
+
+    def _pipeline_url(self) -> str:
+        return f"{self.base_url}/v{self.version}/pipeline"
+
+    def _cursor_url(self) -> str:
+        return f"{self.base_url}/v3/cursor"
+
+    def _send(self, stream_requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send one pipeline request and return the per-request results"""
+        if self.closed:
+            raise HranaError("Stream is closed")
+
+        payload = {"baton": self.baton, "requests": stream_requests}
+        self.last_used = time.monotonic()
+        response = self.transport.post(self._pipeline_url(), payload, timeout=self.timeout)
+
+        # Servers without v3 answer 404; downgrade once, before the stream exists
+        if response.status_code == 404 and self.baton is None and self.version > SUPPORTED_HRANA_VERSIONS[-1]:
+            logger.warning("⚠️ Hrana v%s not available, falling back to v2", self.version)
+            self.version = SUPPORTED_HRANA_VERSIONS[-1]
+            response = self.transport.post(self._pipeline_url(), payload, timeout=self.timeout)
+
+        if response.status_code != 200:
+            logger.error("❌ Hrana pipeline HTTP error: %s", response.status_code)
+            logger.error("Response text: %s", response.text)
+            response.raise_for_status()
+
+        body = response.json()
+        self.baton = body.get("baton")
+        if body.get("base_url"):
+            self.base_url = body["base_url"].rstrip('/')
+        if self.baton is None:
+            # The server closed the stream (explicit close or error)
+            self.closed = True
+
+        return body.get("results", [])
+
+    def _unwrap(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the response of one pipeline result or raise its error"""
+        if entry.get("type") == "error":
+            error = entry.get("error", {})
+            raise HranaError(error.get("message", "Unknown Hrana error"), error.get("code"))
+        return entry.get("response", {})
+
+    def _run(self, stream_requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Flush queued requests together with new ones and unwrap every result"""
+        with self._lock:
+            batch = self._pending + stream_requests
+            self._pending = []
+            new_ids = {request["sql_id"] for request in batch if request["type"] == "store_sql"}
+            self._stored |= new_ids
+            try:
+                results = self._send(batch)
+            except Exception:
+                # The server may not have stored them; store again on the next use
+                self._stored -= new_ids
+                raise
+        return [self._unwrap(entry) for entry in results]
+
+    def _execute_requests(self, sql: str, params: List = None, store: bool = False,
+                          storing: Optional[Set[int]] = None) -> List[Dict[str, Any]]:
+        """Requests that execute one statement, by stored id when requested"""
+        if not store or self.registry is None:
+            return [{"type": "execute", "stmt": make_stmt(sql, params)}]
+        sql_id = self.registry.register(sql)
+        stream_requests = []
+        if sql_id not in self._stored and (storing is None or sql_id not in storing):
+            stream_requests.append({"type": "store_sql", "sql_id": sql_id, "sql": sql})
+            if storing is not None:
+                storing.add(sql_id)
+        stream_requests.append({"type": "execute", "stmt": make_stored_stmt(sql_id, params)})
+        return stream_requests
+
+    def execute(self, sql: str, params: List = None, store: bool = False) -> ResultSet:
+        """Execute one statement on this stream"""
+        return self.execute_many([(sql, params)], store=store)[0]
+
+    def execute_many(self, statements: List[Any], store: bool = False) -> List[ResultSet]:
+        """Execute several statements on this stream in one pipeline request
+
+        With store=True each statement's text is sent with store_sql the
+        first time this stream sees it and referenced by id afterwards.
+        """
+        stream_requests = []
+        storing: Set[int] = set()
+        for statement in statements:
+            sql, params = (statement, []) if isinstance(statement, str) else statement
+            stream_requests.extend(self._execute_requests(sql, params, store, storing))
+        responses = self._run(stream_requests)
+        executed = [response for response in responses if response.get("type") == "execute"]
+        return [to_result_set(response.get("result", {}))
+                for response in executed[-len(statements):]]
+
+    def open_cursor(self, sql: str, params: List = None, idempotent: bool = False) -> 'HranaCursor':
+        """Execute one statement through the v3 cursor endpoint and return its rows as they arrive
+
+        The stream is busy until the cursor is read to the end or closed.
+        Raises HranaCursorUnsupported when the server has no cursor endpoint.
+        """
+        if self.version < 3:
+            raise HranaCursorUnsupported("Cursors need Hrana v3")
+        with self._lock:
+            if self.closed:
+                raise HranaError("Stream is closed")
+            if self._pending:
+                # Queued requests (BEGIN) cannot ride along in a cursor batch
+                pending, self._pending = self._pending, []
+                for entry in self._send(pending):
+                    self._unwrap(entry)
+
+            payload = {"baton": self.baton, "batch": {"steps": [{"stmt": make_stmt(sql, params)}]}}
+            self.last_used = time.monotonic()
+            response = self.transport.post_stream(self._cursor_url(), payload, timeout=self.timeout,
+                                                  idempotent=idempotent)
+            if response.status_code == 404 and self.baton is None:
+                response.close()
+                raise HranaCursorUnsupported("Server has no /v3/cursor endpoint")
+            if response.status_code != 200:
+                logger.error("❌ Hrana cursor HTTP error: %s", response.status_code)
+                logger.error("Response text: %s", response.text)
+                response.raise_for_status()
+            return HranaCursor(response, self)
+
+    def begin(self):
+        """Start a transaction; BEGIN is sent with the next request"""
+        with self._lock:
+            self._pending.append({"type": "execute", "stmt": make_stmt("BEGIN", want_rows=False)})
+
+    def commit(self, close: bool = False):
+        """Commit the open transaction, optionally closing the stream in the same request"""
+        stream_requests = [{"type": "execute", "stmt": make_stmt("COMMIT", want_rows=False)}]
+        if close:
+            stream_requests.append({"type": "close"})
+        self._run(stream_requests)
+
+    def rollback(self, close: bool = False):
+        """Roll back the open transaction, optionally closing the stream in the same request"""
+        if self.closed:
+            return
+        if self.baton is None:
+            # Nothing reached the server yet, so there is nothing to undo
+            with self._lock:
+                self._pending = []
+            self.closed = self.closed or close
+            return
+        stream_requests = [{"type": "execute", "stmt": make_stmt("ROLLBACK", want_rows=False)}]
+        if close:
+            stream_requests.append({"type": "close"})
+        self._run(stream_requests)
+
+    def close(self):
+        """Close the server-side stream"""
+        with self._lock:
+            self._pending = []
+            if self.closed or self.baton is None:
+                self.closed = True
+                return
+            try:
+                self._send([{"type": "close"}])
+            except Exception as e:
+                logger.warning("⚠️ Error closing Hrana stream: %s", e)
+            finally:
+                self.closed = True
+                self.baton = None
+
+    def __enter__(self) -> 'HranaStream':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class HranaCursor:
+    """Rows of one statement, decoded line by line from a /v3/cursor response
+
+    Only the row being read is held in memory, however large the result.
+    Iterate it once; rows_affected and last_insert_rowid are set when the
+    end of the statement is reached.
+    """
+
+    def __init__(self, response: requests.Response, stream: HranaStream):
+        self._response = response
+        self._lines = response.iter_lines(chunk_size=CURSOR_CHUNK_SIZE)
+        self._finished = False
+        self.completed = False  # read to the end, so the stream is usable again
+        self.bytes_received = 0
+        self.rows_affected = 0
+        self.last_insert_rowid: Optional[int] = None
+
+        # The stream's new baton comes first; the old one is already spent
+        header = self._next_entry()
+        stream.baton = header.get("baton")
+        if header.get("base_url"):
+            stream.base_url = header["base_url"].rstrip('/')
+        if stream.baton is None:
+            stream.closed = True
+
+        begin = self._next_entry()
+        self._raise_for_error(begin)
+        self.columns = [col.get("name") for col in begin.get("cols", [])]
+        self._index = {name: i for i, name in enumerate(self.columns)}
+
+    def _next_entry(self) -> Dict[str, Any]:
+        for line in self._lines:
+            if line:
+                self.bytes_received += len(line) + 1
+                return json.loads(line)
+        self.close()
+        raise HranaError("Cursor response ended early")
+
+    def _raise_for_error(self, entry: Dict[str, Any]):
+        if entry.get("type") in ("step_error", "error"):
+            self.close()
+            error = entry.get("error", {})
+            raise HranaError(error.get("message", "Unknown Hrana error"), error.get("code"))
+
+    def __iter__(self) -> Iterator[Row]:
+        while not self._finished:
+            entry = self._next_entry()
+            if entry.get("type") == "row":
+                yield Row(decode_row(entry["row"]), self._index)
+            elif entry.get("type") == "step_end":
+                self.rows_affected = entry.get("affected_row_count", 0)
+                last_insert_rowid = entry.get("last_insert_rowid")
+                self.last_insert_rowid = int(last_insert_rowid) if last_insert_rowid is not None else None
+                # Drain the rest so the connection goes back to the pool
+                for line in self._lines:
+                    self.bytes_received += len(line) + 1
+                self.completed = True
+                self.close()
+            else:
+                self._raise_for_error(entry)
+
+    def close(self):
+        """Stop reading; an unfinished response drops its connection"""
+        self._finished = True
+        self._response.close()
+
+    def __enter__(self) -> 'HranaCursor':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class HranaSession:
+    """Long-lived stream for repeated statements, reopened when the server drops it
+
+    Keeps one stream open between calls so stored SQL is sent once and
+    then referenced by id. When the stream has been idle long enough that
+    the server has likely expired it, or a request fails, the next call
+    opens a new stream and re-stores whatever it uses. Like HranaStream it
+    belongs to a single thread.
+    """
+
+    def __init__(self, transport: TursoTransport, base_url: str, version: int = 3,
+                 registry: Optional[SqlRegistry] = None, idle_timeout: float = DEFAULT_STREAM_IDLE_TIMEOUT):
+        self.transport = transport
+        self.base_url = base_url
+        self.version = version
+        self.registry = registry or SqlRegistry()
+        self.idle_timeout = idle_timeout
+        self.streams_opened = 0
+        self._stream: Optional[HranaStream] = None
+
+    def _current_stream(self) -> HranaStream:
+        stream = self._stream
+        if stream is not None and (stream.closed or time.monotonic() - stream.last_used > self.idle_timeout):
+            # Let the server expire the old stream; closing it would cost a round trip
+            stream = None
+        if stream is None:
+            self.streams_opened += 1
+            stream = HranaStream(self.transport, self.base_url, version=self.version, registry=self.registry)
+            self._stream = stream
+        return stream
+
+    def execute_many(self, statements: List[Any]) -> List[ResultSet]:
+        """Execute statements (no transaction) with their text stored on the stream"""
+        stream = self._current_stream()
+        had_baton = stream.baton is not None
+        try:
+            return stream.execute_many(statements, store=True)
+        except requests.HTTPError as e:
+            self._stream = None
+            status = e.response.status_code if e.response is not None else None
+            if not (had_baton and status in (400, 404)):
+                raise
+            # The server no longer knows the baton, so nothing ran; replay on a new stream
+            logger.debug("♻️ Hrana stream expired, reopening")
+            return self._current_stream().execute_many(statements, store=True)
+        except HranaError:
+            # Statement errors leave the stream usable
+            raise
+        except Exception:
+            self._stream = None
+            raise
+
+    def idle(self) -> bool:
+        """True when the stream is gone or old enough that the server has likely expired it"""
+        stream = self._stream
+        return stream is None or stream.closed or time.monotonic() - stream.last_used > self.idle_timeout
+
+    def close(self):
+        """Close the current stream, if any"""
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
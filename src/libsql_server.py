@@ -0,0 +1,600 @@
+"""
+Local libSQL HTTP Server
+Offline stand-in for Turso (legacy statements endpoint, Hrana v2/v3 pipeline and v3 cursor) backed by sqlite3
+
+Point TursoDatabase at it unchanged, for tests and benchmarks on a machine
+without Turso credentials:
+
+    python src/libsql_server.py --port 8080 --latency-ms 40 --jitter-ms 10
+    TURSO_DATABASE_URL=http://127.0.0.1:8080 TURSO_AUTH_TOKEN=local python test_forms_submission.py
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import random
+import secrets
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, Any, List, Tuple, Iterator, Generator
+
+try:
+    from src.hrana_client import encode_value, decode_value, SUPPORTED_HRANA_VERSIONS
+    from src.log_utils import get_logger
+except ImportError:
+    from hrana_client import encode_value, decode_value, SUPPORTED_HRANA_VERSIONS
+    from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Turso expires a stream after about 10 seconds without a request
+DEFAULT_SERVER_STREAM_IDLE_TIMEOUT = 10.0
+
+# Injected failures answer with this status unless told otherwise; 503 means "not executed"
+DEFAULT_ERROR_STATUS = 503
+
+# Rows fetched from SQLite at a time while a cursor response is streamed
+CURSOR_FETCH_SIZE = 256
+
+# JSON responses at least this large are gzipped when the client accepts it
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+
+
+class _StatementError(Exception):
+    """A statement failed; reported in the response body, not as an HTTP error"""
+
+
+class _Stream:
+    """Server side of a Hrana stream: one SQLite connection plus its stored SQL"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.stored_sql: Dict[int, str] = {}
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+def _legacy_cell(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return {"base64": base64.b64encode(value).decode('ascii')}
+    return value
+
+
+class LibSQLServer:
+    """sqlite3-backed server speaking the libSQL HTTP protocols TursoDatabase uses
+
+    Every stream gets its own SQLite connection to a shared database file,
+    so interactive transactions behave as on Turso. Latency (plus uniform
+    jitter) is added to every HTTP request. With error_rate, that share of
+    requests fails with error_status: before execution by default, or after
+    the statements ran with error_after_execute=True, to exercise the
+    client's "maybe sent" handling.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, host: str = "127.0.0.1", port: int = 0,
+                 auth_token: Optional[str] = None, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = DEFAULT_ERROR_STATUS,
+                 error_after_execute: bool = False,
+                 stream_idle_timeout: float = DEFAULT_SERVER_STREAM_IDLE_TIMEOUT, seed: Optional[int] = None,
+                 compress_min_bytes: Optional[int] = DEFAULT_COMPRESS_MIN_BYTES, accept_compressed: bool = True):
+        self._tmp_dir = None
+        if db_path is None:
+            self._tmp_dir = tempfile.mkdtemp(prefix="libsql_server_")
+            db_path = os.path.join(self._tmp_dir, "local.db")
+        self.db_path = db_path
+        self.host = host
+        self.port = port
+        self.auth_token = auth_token
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.error_rate = float(error_rate)
+        self.error_status = int(error_status)
+        self.error_after_execute = error_after_execute
+        self.stream_idle_timeout = float(stream_idle_timeout)
+        # None turns response compression off; accept_compressed=False answers gzip requests with 415
+        self.compress_min_bytes = compress_min_bytes
+        self.accept_compressed = accept_compressed
+
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._streams: Dict[str, _Stream] = {}
+        self._streams_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.reset_stats()
+
+        # WAL lets stream connections read while another one writes
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+
+    # Lifecycle
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> 'LibSQLServer':
+        """Serve on a background thread; port 0 picks a free port"""
+        handler = type("LibSQLRequestHandler", (_RequestHandler,), {"app": self})
+        self._httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="libsql-server", daemon=True)
+        self._thread.start()
+        logger.info("🧪 Local libSQL server listening on %s (db %s)", self.url, self.db_path)
+        return self
+
+    def stop(self):
+        """Stop serving, close open streams and remove a temporary database"""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        with self._streams_lock:
+            streams, self._streams = self._streams, {}
+        for stream in streams.values():
+            stream.conn.close()
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+
+    def __enter__(self) -> 'LibSQLServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    # Stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {
+                'requests': 0,
+                'legacy_requests': 0,
+                'pipeline_requests': 0,
+                'cursor_requests': 0,
+                'statements': 0,
+                'injected_errors': 0,
+                'streams_opened': 0,
+                'streams_expired': 0,
+                'bytes_in': 0,
+                'bytes_out': 0,
+                'compressed_requests': 0,
+                'compressed_responses': 0,
+            }
+
+    def _count(self, **increments: int):
+        with self._stats_lock:
+            for name, amount in increments.items():
+                self._stats[name] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        """Request, statement, stream and byte counters since start or reset_stats()"""
+        with self._stats_lock:
+            snapshot: Dict[str, Any] = dict(self._stats)
+        with self._streams_lock:
+            snapshot['open_streams'] = len(self._streams)
+        return snapshot
+
+    # Fault injection
+
+    def _delay(self):
+        if self.latency or self.jitter:
+            with self._random_lock:
+                offset = self._random.uniform(-self.jitter, self.jitter)
+            time.sleep(max(0.0, self.latency + offset))
+
+    def _inject_error(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+    # SQLite
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5, isolation_level=None, check_same_thread=False)
+
+    @staticmethod
+    def _execute(conn: sqlite3.Connection, sql: str, args: Any) -> Tuple[sqlite3.Cursor, List[str], List[List[Any]]]:
+        try:
+            cursor = conn.execute(sql, args)
+            columns = [description[0] for description in cursor.description or []]
+            rows = [list(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            raise _StatementError(str(e))
+        return cursor, columns, rows
+
+    # Legacy statements endpoint
+
+    def handle_statements(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """POST / with {"statements": [...]}: run in order, stop at the first error
+
+        Like Turso, a failure rolls back a transaction the batch opened, and
+        results carry no row counts or last_insert_rowid.
+        """
+        results = []
+        conn = self._connect()
+        try:
+            for statement in body.get("statements", []):
+                if isinstance(statement, str):
+                    sql, params = statement, []
+                else:
+                    sql, params = statement.get("q", ""), statement.get("params", [])
+                self._count(statements=1)
+                try:
+                    _, columns, rows = self._execute(conn, sql, params)
+                except _StatementError as e:
+                    results.append({"error": {"message": str(e)}})
+                    break
+                results.append({"results": {"columns": columns,
+                                            "rows": [[_legacy_cell(cell) for cell in row] for row in rows]}})
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.close()
+        return results
+
+    # Hrana pipeline
+
+    def _expire_streams(self):
+        now = time.monotonic()
+        with self._streams_lock:
+            expired = [baton for baton, stream in self._streams.items()
+                       if now - stream.last_used > self.stream_idle_timeout]
+            streams = [self._streams.pop(baton) for baton in expired]
+        for stream in streams:
+            stream.conn.close()
+        if streams:
+            self._count(streams_expired=len(streams))
+
+    @staticmethod
+    def _resolve_stmt(stream: _Stream, stmt: Dict[str, Any]) -> Tuple[str, Any]:
+        """SQL text (inline or stored) and decoded arguments of a Hrana statement"""
+        if "sql_id" in stmt and stmt["sql_id"] is not None:
+            if stmt["sql_id"] not in stream.stored_sql:
+                raise _StatementError(f"SQL with id {stmt['sql_id']} is not stored")
+            sql = stream.stored_sql[stmt["sql_id"]]
+        else:
+            sql = stmt.get("sql", "")
+        if stmt.get("named_args"):
+            args: Any = {arg["name"].lstrip(":@$"): decode_value(arg["value"]) for arg in stmt["named_args"]}
+        else:
+            args = [decode_value(arg) for arg in stmt.get("args", [])]
+        return sql, args
+
+    def _stmt_result(self, stream: _Stream, stmt: Dict[str, Any]) -> Dict[str, Any]:
+        sql, args = self._resolve_stmt(stream, stmt)
+        started = time.monotonic()
+        changes_before = stream.conn.total_changes
+        cursor, columns, rows = self._execute(stream.conn, sql, args)
+        self._count(statements=1)
+        affected = stream.conn.total_changes - changes_before
+        return {
+            "cols": [{"name": column, "decltype": None} for column in columns],
+            "rows": [[encode_value(cell) for cell in row] for row in rows] if stmt.get("want_rows", True) else [],
+            "affected_row_count": affected,
+            "last_insert_rowid": str(cursor.lastrowid) if cursor.lastrowid else None,
+            "rows_read": len(rows),
+            "rows_written": affected,
+            "query_duration_ms": round((time.monotonic() - started) * 1000, 3),
+        }
+
+    @staticmethod
+    def _condition(condition: Optional[Dict[str, Any]], step_results: List, step_errors: List,
+                   conn: sqlite3.Connection) -> bool:
+        if condition is None:
+            return True
+        kind = condition.get("type")
+        if kind == "ok":
+            return step_results[condition["step"]] is not None
+        if kind == "error":
+            return step_errors[condition["step"]] is not None
+        if kind == "not":
+            return not LibSQLServer._condition(condition["cond"], step_results, step_errors, conn)
+        if kind == "and":
+            return all(LibSQLServer._condition(c, step_results, step_errors, conn) for c in condition["conds"])
+        if kind == "or":
+            return any(LibSQLServer._condition(c, step_results, step_errors, conn) for c in condition["conds"])
+        if kind == "is_autocommit":
+            return not conn.in_transaction
+        raise _StatementError(f"Unknown batch condition {kind!r}")
+
+    def _stream_request(self, stream: _Stream, request: Dict[str, Any]) -> Dict[str, Any]:
+        kind = request.get("type")
+        if kind == "execute":
+            return {"type": "execute", "result": self._stmt_result(stream, request["stmt"])}
+        if kind == "batch":
+            step_results: List[Optional[Dict[str, Any]]] = []
+            step_errors: List[Optional[Dict[str, Any]]] = []
+            for step in request["batch"]["steps"]:
+                result, error = None, None
+                if self._condition(step.get("condition"), step_results, step_errors, stream.conn):
+                    try:
+                        result = self._stmt_result(stream, step["stmt"])
+                    except _StatementError as e:
+                        error = {"message": str(e)}
+                step_results.append(result)
+                step_errors.append(error)
+            return {"type": "batch", "result": {"step_results": step_results, "step_errors": step_errors}}
+        if kind == "sequence":
+            sql = stream.stored_sql.get(request["sql_id"]) if request.get("sql_id") is not None else request["sql"]
+            try:
+                stream.conn.executescript(sql)
+            except sqlite3.Error as e:
+                raise _StatementError(str(e))
+            return {"type": "sequence"}
+        if kind == "store_sql":
+            stream.stored_sql[request["sql_id"]] = request["sql"]
+            return {"type": "store_sql"}
+        if kind == "close_sql":
+            stream.stored_sql.pop(request["sql_id"], None)
+            return {"type": "close_sql"}
+        if kind == "get_autocommit":
+            return {"type": "get_autocommit", "is_autocommit": not stream.conn.in_transaction}
+        if kind == "close":
+            return {"type": "close"}
+        raise _StatementError(f"Unknown stream request {kind!r}")
+
+    def _acquire_stream(self, baton: Optional[str]) -> Optional[_Stream]:
+        """Open a stream for a null baton, else take the one it names (None if unknown or expired)"""
+        self._expire_streams()
+        with self._streams_lock:
+            if baton is None:
+                stream = _Stream(self._connect())
+            else:
+                return self._streams.pop(baton, None)
+        self._count(streams_opened=1)
+        return stream
+
+    def _release_stream(self, stream: _Stream, closed: bool) -> Optional[str]:
+        """Close the stream or park it under a new baton, which is returned"""
+        if closed:
+            if stream.conn.in_transaction:
+                stream.conn.rollback()
+            stream.conn.close()
+            return None
+        # A fresh baton per response, as Turso does; the old one is now invalid
+        new_baton = secrets.token_urlsafe(16)
+        with self._streams_lock:
+            self._streams[new_baton] = stream
+        return new_baton
+
+    def handle_pipeline(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """POST /v2|v3/pipeline; returns None when the baton is unknown or expired"""
+        stream = self._acquire_stream(body.get("baton"))
+        if stream is None:
+            return None
+
+        results = []
+        closed = False
+        with stream.lock:
+            for request in body.get("requests", []):
+                try:
+                    results.append({"type": "ok", "response": self._stream_request(stream, request)})
+                except _StatementError as e:
+                    results.append({"type": "error", "error": {"message": str(e), "code": "SQLITE_ERROR"}})
+                except (KeyError, TypeError) as e:
+                    results.append({"type": "error", "error": {"message": f"Malformed request: {e}",
+                                                               "code": "PROTOCOL_ERROR"}})
+                if request.get("type") == "close":
+                    closed = True
+                    break
+            stream.last_used = time.monotonic()
+
+        return {"baton": self._release_stream(stream, closed), "base_url": None, "results": results}
+
+    # Hrana cursor
+
+    def handle_cursor(self, body: Dict[str, Any]) -> Optional[Iterator[Dict[str, Any]]]:
+        """POST /v3/cursor: the entries of one batch, produced as SQLite returns rows
+
+        Returns None when the baton is unknown or expired. The stream is
+        parked under its new baton (sent first) only once every entry has
+        been produced, as on Turso, where the stream is busy until then.
+        """
+        stream = self._acquire_stream(body.get("baton"))
+        if stream is None:
+            return None
+        baton = secrets.token_urlsafe(16)
+
+        def entries() -> Iterator[Dict[str, Any]]:
+            step_results: List[Optional[Dict[str, Any]]] = []
+            step_errors: List[Optional[Dict[str, Any]]] = []
+            try:
+                with stream.lock:
+                    yield {"baton": baton, "base_url": None}
+                    for step_index, step in enumerate(body.get("batch", {}).get("steps", [])):
+                        result, error = None, None
+                        if self._condition(step.get("condition"), step_results, step_errors, stream.conn):
+                            try:
+                                sql, args = self._resolve_stmt(stream, step["stmt"])
+                                changes_before = stream.conn.total_changes
+                                cursor = stream.conn.execute(sql, args)
+                                self._count(statements=1)
+                                yield {"type": "step_begin", "step": step_index,
+                                       "cols": [{"name": d[0], "decltype": None} for d in cursor.description or []]}
+                                want_rows = step["stmt"].get("want_rows", True)
+                                while True:
+                                    rows = cursor.fetchmany(CURSOR_FETCH_SIZE)
+                                    if not rows:
+                                        break
+                                    if want_rows:
+                                        for row in rows:
+                                            yield {"type": "row", "row": [encode_value(cell) for cell in row]}
+                                affected = stream.conn.total_changes - changes_before
+                                result = {"affected_row_count": affected}
+                                yield {"type": "step_end", "affected_row_count": affected,
+                                       "last_insert_rowid": str(cursor.lastrowid) if cursor.lastrowid else None}
+                            except (sqlite3.Error, _StatementError) as e:
+                                error = {"message": str(e), "code": "SQLITE_ERROR"}
+                                yield {"type": "step_error", "step": step_index, "error": error}
+                        step_results.append(result)
+                        step_errors.append(error)
+                    stream.last_used = time.monotonic()
+            finally:
+                with self._streams_lock:
+                    self._streams[baton] = stream
+
+        return entries()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so the client's connection pool is exercised
+    disable_nagle_algorithm = True  # headers and body go out in separate writes; don't stall on delayed ACKs
+    app: LibSQLServer
+
+    def _reply(self, status: int, payload: Any):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        min_bytes = self.app.compress_min_bytes
+        if (min_bytes is not None and len(data) >= min_bytes
+                and "gzip" in self.headers.get("Accept-Encoding", "").lower()):
+            data = gzip.compress(data, compresslevel=6)
+            self.send_header("Content-Encoding", "gzip")
+            self.app._count(compressed_responses=1)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        self.app._count(bytes_out=len(data))
+
+    def _reply_ndjson(self, entries: Generator[Dict[str, Any], None, None]):
+        """Stream entries as newline-delimited JSON with chunked transfer encoding"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        sent = 0
+        buffer: List[bytes] = []
+        try:
+            for entry in entries:
+                buffer.append(json.dumps(entry).encode('utf-8') + b"\n")
+                if len(buffer) >= CURSOR_FETCH_SIZE or "type" not in entry:
+                    chunk = b"".join(buffer)
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                    sent += len(chunk)
+                    buffer = []
+            chunk = b"".join(buffer)
+            if chunk:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                sent += len(chunk)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading early; its stream stays parked until it expires
+            entries.close()
+            self.close_connection = True
+        self.app._count(bytes_out=sent)
+
+    def _authorized(self) -> bool:
+        if not self.app.auth_token:
+            return True
+        return self.headers.get("Authorization") == f"Bearer {self.app.auth_token}"
+
+    def do_GET(self):
+        versions = {f"/v{version}" for version in SUPPORTED_HRANA_VERSIONS}
+        if self.path in ("/health", "/version") or self.path in versions:
+            self._reply(200, {"status": "ok"})
+        else:
+            self._reply(404, {"error": "Not found"})
+
+    def do_POST(self):
+        app = self.app
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        app._count(requests=1, bytes_in=len(raw))
+        app._delay()
+
+        if not self._authorized():
+            return self._reply(401, {"error": "Unauthorized"})
+        encoding = self.headers.get("Content-Encoding", "").lower()
+        if encoding:
+            if encoding not in ("gzip", "deflate") or not app.accept_compressed:
+                return self._reply(415, {"error": f"Unsupported Content-Encoding: {encoding}"})
+            try:
+                raw = gzip.decompress(raw) if encoding == "gzip" else zlib.decompress(raw)
+            except (OSError, zlib.error):
+                return self._reply(400, {"error": "Invalid compressed body"})
+            app._count(compressed_requests=1)
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            return self._reply(400, {"error": "Invalid JSON"})
+
+        inject = app._inject_error()
+        if inject and not app.error_after_execute:
+            app._count(injected_errors=1)
+            return self._reply(app.error_status, {"error": "Injected failure"})
+
+        path = self.path.rstrip("/")
+        if path == "":
+            app._count(legacy_requests=1)
+            payload: Any = app.handle_statements(body)
+        elif path in {f"/v{version}/pipeline" for version in SUPPORTED_HRANA_VERSIONS}:
+            app._count(pipeline_requests=1)
+            payload = app.handle_pipeline(body)
+            if payload is None:
+                return self._reply(400, {"error": "Stream not found or expired"})
+        elif path == "/v3/cursor":
+            app._count(cursor_requests=1)
+            entries = app.handle_cursor(body)
+            if entries is None:
+                return self._reply(400, {"error": "Stream not found or expired"})
+            return self._reply_ndjson(entries)
+        else:
+            return self._reply(404, {"error": "Not found"})
+
+        if inject:
+            # The statements ran, but the client cannot know that
+            app._count(injected_errors=1)
+            return self._reply(app.error_status, {"error": "Injected failure after execution"})
+        self._reply(200, payload)
+
+    def log_message(self, format, *args):
+        logger.debug("libsql-server %s", format % args)
+
+
+def main():
+    """Run the stand-in server in the foreground"""
+    parser = argparse.ArgumentParser(description="Local libSQL HTTP server backed by sqlite3")
+    parser.add_argument("--db", help="SQLite file to serve (default: a temporary database)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--auth-token", help="require this bearer token")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- on top of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail (0-1)")
+    parser.add_argument("--error-status", type=int, default=DEFAULT_ERROR_STATUS)
+    parser.add_argument("--error-after-execute", action="store_true",
+                        help="fail after running the statements instead of before")
+    parser.add_argument("--seed", type=int, help="seed for jitter and error injection")
+    parser.add_argument("--no-compression", action="store_true", help="never gzip responses")
+    args = parser.parse_args()
+
+    server = LibSQLServer(
+        db_path=args.db, host=args.host, port=args.port, auth_token=args.auth_token,
+        latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate, error_status=args.error_status,
+        error_after_execute=args.error_after_execute, seed=args.seed,
+        compress_min_bytes=None if args.no_compression else DEFAULT_COMPRESS_MIN_BYTES
+    ).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Local Cloud Storage Stand-in
+In-memory objects with the google.cloud.storage Bucket/Blob methods Database uses, for tests and benchmarks
+"""
+
+import random
+import threading
+import time
+from typing import Optional, Dict, Any
+
+
+class LocalNotFound(Exception):
+    """Raised like google.api_core.exceptions.NotFound when the object does not exist"""
+    code = 404
+
+
+class LocalPreconditionFailed(Exception):
+    """Raised like google.api_core.exceptions.PreconditionFailed when a generation precondition fails"""
+    code = 412
+
+
+class _StoredObject:
+    """The object itself, shared by every blob handle on its name"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data: Optional[bytes] = None
+        self.metadata: Optional[Dict[str, str]] = None
+        self.generation = 0
+
+
+class LocalBucket:
+    """Bucket whose blob(name) handles share one stored object per name, like bucket.blob() in GCS
+
+    Latency, jitter and the round-trip counters belong to the bucket, so
+    they cover every handle.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: Optional[int] = None):
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._objects: Dict[str, _StoredObject] = {}
+        self.reset_stats()
+
+    def blob(self, name: str) -> "LocalBlob":
+        return LocalBlob(name, bucket=self)
+
+    def _object(self, name: str) -> _StoredObject:
+        with self._lock:
+            return self._objects.setdefault(name, _StoredObject())
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {'round_trips': 0, 'downloads': 0, 'uploads': 0, 'bytes_down': 0, 'bytes_up': 0}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _round_trip(self):
+        if self.latency or self.jitter:
+            with self._lock:
+                offset = self._random.uniform(-self.jitter, self.jitter)
+            time.sleep(max(0.0, self.latency + offset))
+        self._count('round_trips')
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+
+class LocalBlob:
+    """Handle on a single storage object kept in memory, with generations and simulated latency
+
+    Supports exists, reload, download_to_filename and upload_from_filename
+    (including if_generation_match), and the generation, size and metadata
+    attributes. Like a GCS Blob, those attributes describe what this handle
+    last saw; blob.bucket.blob(blob.name) gives another handle on the same
+    object. Every call counts as one round trip; downloads and uploads also
+    count their bytes.
+    """
+
+    def __init__(self, name: str = "quran_institute.db", latency: float = 0.0, jitter: float = 0.0,
+                 seed: Optional[int] = None, bucket: Optional[LocalBucket] = None):
+        self.name = name
+        self.bucket = bucket if bucket is not None else LocalBucket(latency, jitter, seed)
+        self.metadata: Optional[Dict[str, str]] = None
+        self.generation: Optional[int] = None
+        self.size: Optional[int] = None
+        self._object = self.bucket._object(name)
+
+    def reset_stats(self):
+        self.bucket.reset_stats()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.bucket.stats()
+
+    def _check_generation(self, if_generation_match: Optional[int]):
+        current = self._object.generation if self._object.data is not None else 0
+        if if_generation_match is not None and int(if_generation_match) != current:
+            raise LocalPreconditionFailed(
+                f"412 Precondition failed: generation {current} does not match {if_generation_match}")
+
+    def exists(self) -> bool:
+        self.bucket._round_trip()
+        with self._object.lock:
+            return self._object.data is not None
+
+    def reload(self):
+        """Refresh generation, size and metadata from the stored object"""
+        self.bucket._round_trip()
+        stored = self._object
+        with stored.lock:
+            if stored.data is None:
+                raise LocalNotFound(f"404 No such object: {self.name}")
+            self.generation = stored.generation
+            self.size = len(stored.data)
+            self.metadata = dict(stored.metadata) if stored.metadata is not None else None
+
+    def download_to_filename(self, filename: str, if_generation_match: Optional[int] = None):
+        self.bucket._round_trip()
+        stored = self._object
+        with stored.lock:
+            if stored.data is None:
+                raise LocalNotFound(f"404 No such object: {self.name}")
+            self._check_generation(if_generation_match)
+            data = stored.data
+            self.generation = stored.generation
+            self.size = len(data)
+        self.bucket._count('downloads')
+        self.bucket._count('bytes_down', len(data))
+        with open(filename, 'wb') as f:
+            f.write(data)
+
+    def upload_from_filename(self, filename: str, if_generation_match: Optional[int] = None):
+        with open(filename, 'rb') as f:
+            data = f.read()
+        self.bucket._round_trip()
+        stored = self._object
+        with stored.lock:
+            self._check_generation(if_generation_match)
+            stored.data = data
+            stored.metadata = dict(self.metadata) if self.metadata is not None else None
+            stored.generation += 1
+            self.generation = stored.generation
+            self.size = len(data)
+        self.bucket._count('uploads')
+        self.bucket._count('bytes_up', len(data))
@@ -0,0 +1,177 @@
+"""
+Logging for the Quran Institute Application
+Leveled, lazily formatted logging with optional JSON output and redaction of secrets and form PII
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any
+
+try:
+    from termcolor import colored
+    TERMCOLOR_AVAILABLE = True
+except ImportError:
+    TERMCOLOR_AVAILABLE = False
+
+# Every application logger lives under this namespace
+ROOT_LOGGER_NAME = "quran_institute"
+
+# Defaults, overridable with the LOG_LEVEL / LOG_FORMAT / LOG_REDACT environment
+# variables or a [logging] block in secrets.toml (level, format, redact)
+DEFAULT_LOG_LEVEL = "INFO"
+DEFAULT_LOG_FORMAT = "text"  # "text" for colored console lines, "json" for one object per line
+DEFAULT_LOG_REDACT = True
+
+LEVEL_COLORS = {
+    logging.DEBUG: "blue",
+    logging.INFO: "green",
+    logging.WARNING: "yellow",
+    logging.ERROR: "red",
+    logging.CRITICAL: "red",
+}
+
+# Patterns scrubbed from every emitted message; applied only to records that
+# pass the level check, so disabled log calls never pay for them
+REDACTION_PATTERNS = [
+    # Bearer headers and JWTs (Turso auth tokens are JWTs)
+    (re.compile(r"(?i)(bearer\s+)[\w\-.=]+"), r"\1***"),
+    (re.compile(r"eyJ[\w-]+\.[\w-]+\.[\w-]*"), "***"),
+    # key=value / "key": "value" pairs for credentials
+    (re.compile(r"(?i)((?:auth_token|verification_token|token|password_hash|password|authorization|private_key)"
+                r"['\"]?\s*[:=]\s*['\"]?)(?!\*\*\*|bearer\s)[^'\"\s,}]+"), r"\1***"),
+    # Email addresses keep their first character and domain
+    (re.compile(r"([A-Za-z0-9])[A-Za-z0-9._%+-]*@([A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,})"), r"\1***@\2"),
+    # Phone numbers: international (+...) and 3-3-4 local formats
+    (re.compile(r"(?<![\w+])\+\d[\d\s().-]{6,}\d"), "***"),
+    (re.compile(r"(?<!\d)\(?\d{3}\)?[\s.-]\d{3}[\s.-]\d{4}(?!\d)"), "***"),
+]
+
+_configure_lock = threading.Lock()
+_configured = False
+
+
+def redact(text: str) -> str:
+    """Scrub auth tokens, passwords, emails and phone numbers from a string"""
+    for pattern, replacement in REDACTION_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class TextFormatter(logging.Formatter):
+    """Single-line console output colored by level"""
+
+    def __init__(self, redact_output: bool = True, use_color: bool = True):
+        super().__init__()
+        self.redact_output = redact_output
+        self.use_color = use_color and TERMCOLOR_AVAILABLE
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.exc_info:
+            message = f"{message}\n{self.formatException(record.exc_info)}"
+        if self.redact_output:
+            message = redact(message)
+        if self.use_color:
+            return colored(message, LEVEL_COLORS.get(record.levelno, "white"))
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line for log shippers"""
+
+    def __init__(self, redact_output: bool = True):
+        super().__init__()
+        self.redact_output = redact_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            entry.update(fields)
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        return redact(line) if self.redact_output else line
+
+
+def _load_settings() -> Dict[str, Any]:
+    """Merge defaults, the [logging] secrets block and environment variables"""
+    settings: Dict[str, Any] = {
+        "level": DEFAULT_LOG_LEVEL,
+        "format": DEFAULT_LOG_FORMAT,
+        "redact": DEFAULT_LOG_REDACT,
+    }
+
+    try:
+        import streamlit as st
+        if hasattr(st, 'secrets') and 'logging' in st.secrets:
+            settings.update(dict(st.secrets["logging"]))
+    except Exception:
+        # No secrets file (scripts, tests) is fine; fall back to env/defaults
+        pass
+
+    if os.environ.get("LOG_LEVEL"):
+        settings["level"] = os.environ["LOG_LEVEL"]
+    if os.environ.get("LOG_FORMAT"):
+        settings["format"] = os.environ["LOG_FORMAT"]
+    if os.environ.get("LOG_REDACT"):
+        settings["redact"] = os.environ["LOG_REDACT"].lower() not in ("0", "false", "no", "off")
+
+    return settings
+
+
+def configure_logging(level: Optional[str] = None, json_output: Optional[bool] = None,
+                      redact_output: Optional[bool] = None, stream=None, force: bool = False) -> logging.Logger:
+    """Install the application handler once; explicit arguments override settings"""
+    global _configured
+
+    with _configure_lock:
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        if _configured and not force:
+            return root
+
+        settings = _load_settings()
+        level_name = str(level or settings["level"]).upper()
+        if json_output is None:
+            json_output = str(settings["format"]).lower() == "json"
+        if redact_output is None:
+            redact_output = bool(settings["redact"])
+
+        handler = logging.StreamHandler(stream or sys.stdout)
+        if json_output:
+            handler.setFormatter(JsonFormatter(redact_output=redact_output))
+        else:
+            handler.setFormatter(TextFormatter(redact_output=redact_output))
+
+        # Streamlit reruns re-import modules; never stack duplicate handlers
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(getattr(logging, level_name, logging.INFO))
+        root.propagate = False
+
+        _configured = True
+        return root
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return the logger for a module, configuring output on first use
+
+    Pass __name__; modules imported as src.x and as x share one logger.
+    Log with %-style arguments (logger.debug("Executing %s", sql)) so the
+    message is only formatted when the level is enabled.
+    """
+    if not _configured:
+        configure_logging()
+    module = name.rsplit('.', 1)[-1] if name.startswith('src.') else name
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{module}")
@@ -12,24 +12,21 @@ import re
 import json
 from typing import Dict, Any, Optional
 
-# Import termcolor with fallback
 try:
-    from termcolor import colored
-    print("✅ termcolor imported successfully")
-except ImportError as e:
-    print(f"❌ termcolor not available: {e}")
-    # Fallback function if termcolor is not available
-    def colored(text, color=None):
-        return text
+    from log_utils import get_logger
+except ImportError:
+    from src.log_utils import get_logger
+
+logger = get_logger("main")
 
 # Import custom modules (updated for deployment)
 # Use direct imports for Streamlit Cloud deployment
 try:
     from content_manager import ContentManager
-    print(colored("✅ ContentManager imported successfully", "green"))
+    logger.debug("✅ ContentManager imported successfully")
 except Exception as e:
-    print(colored(f"❌ Error importing ContentManager: {str(e)}", "red"))
-    print(colored(f"Error type: {type(e).__name__}", "red"))
+    logger.error("❌ Error importing ContentManager: %s", e)
+    logger.error("Error type: %s", type(e).__name__)
     raise
 
 # from forms_manager import FormsManager
@@ -37,45 +34,53 @@ except Exception as e:
 # Try Turso cloud SQLite, fallback to Google Cloud Storage if needed
 try:
     from database_turso import TursoDatabase as Database
-    print(colored("✅ TursoDatabase imported successfully", "green"))
+    logger.debug("✅ TursoDatabase imported successfully")
     USE_TURSO = True
 except Exception as e:
-    print(colored(f"❌ Error importing TursoDatabase: {str(e)}", "red"))
-    print(colored("🔄 Falling back to Google Cloud Storage database...", "yellow"))
+    logger.error("❌ Error importing TursoDatabase: %s", e)
+    logger.debug("🔄 Falling back to Google Cloud Storage database...")
     try:
         from database import Database
-        print(colored("✅ GCS Database imported as fallback", "green"))
+        logger.debug("✅ GCS Database imported as fallback")
         USE_TURSO = False
     except Exception as fallback_error:
-        print(colored(f"❌ Fallback also failed: {fallback_error}", "red"))
+        logger.error("❌ Fallback also failed: %s", fallback_error)
         raise
 
 try:
     if USE_TURSO:
         from forms_manager_turso import TursoFormsManager as FormsManager
-        print(colored("✅ TursoFormsManager imported successfully", "green"))
+        logger.debug("✅ TursoFormsManager imported successfully")
     else:
         from forms_manager import FormsManager
-        print(colored("✅ GCS FormsManager imported as fallback", "green"))
+        logger.debug("✅ GCS FormsManager imported as fallback")
 except Exception as e:
-    print(colored(f"❌ Error importing FormsManager: {str(e)}", "red"))
-    print(colored(f"Error type: {type(e).__name__}", "red"))
+    logger.error("❌ Error importing FormsManager: %s", e)
+    logger.error("Error type: %s", type(e).__name__)
     raise
 
 try:
     from ui_utils import get_text, apply_language_styles, get_language_direction
-    print(colored("✅ UI utils imported successfully", "green"))
+    logger.debug("✅ UI utils imported successfully")
+except Exception as e:
+    logger.error("❌ Error importing UI utils: %s", e)
+    logger.error("Error type: %s", type(e).__name__)
+    raise
+
+try:
+    from metrics import REGISTRY, start_metrics_server, DEFAULT_METRICS_HOST
+    logger.debug("✅ Metrics imported successfully")
 except Exception as e:
-    print(colored(f"❌ Error importing UI utils: {str(e)}", "red"))
-    print(colored(f"Error type: {type(e).__name__}", "red"))
+    logger.error("❌ Error importing metrics: %s", e)
+    logger.error("Error type: %s", type(e).__name__)
     raise
 
 try:
     from user_preferences import UserPreferences
-    print(colored("✅ UserPreferences imported successfully", "green"))
+    logger.debug("✅ UserPreferences imported successfully")
 except Exception as e:
-    print(colored(f"❌ Error importing UserPreferences: {str(e)}", "red"))
-    print(colored(f"Error type: {type(e).__name__}", "red"))
+    logger.error("❌ Error importing UserPreferences: %s", e)
+    logger.error("Error type: %s", type(e).__name__)
     raise
 
 # Page configuration
@@ -89,7 +94,7 @@ st.set_page_config(
 # Initialize user preferences manager
 @st.cache_resource
 def get_user_preferences():
-    print(colored("⚙️ Loading user preferences...", "green"))
+    logger.debug("⚙️ Loading user preferences...")
     return UserPreferences()
 
 user_prefs = get_user_preferences()
@@ -102,11 +107,11 @@ if 'user_id' not in st.session_state:
 if 'language' not in st.session_state:
     # Use saved language preference (defaults to Arabic)
     st.session_state.language = user_prefs.get_language()
-    print(colored(f"🌐 Setting default language to: {st.session_state.language}", "cyan"))
+    logger.debug("🌐 Setting default language to: %s", st.session_state.language)
 if 'page' not in st.session_state:
     st.session_state.page = 'home'
 
-print(colored("🔧 Initializing Streamlit application...", "cyan"))
+logger.debug("🔧 Initializing Streamlit application...")
 
 # Simple email validation function
 def validate_email(email: str) -> bool:
@@ -127,61 +132,87 @@ def validate_email(email: str) -> bool:
 @st.cache_resource
 def get_content_manager():
     try:
-        print(colored("📚 Loading content manager...", "green"))
+        logger.info("📚 Loading content manager...")
         return ContentManager()
     except Exception as e:
-        print(colored(f"❌ Error loading ContentManager: {str(e)}", "red"))
-        print(colored(f"Error type: {type(e).__name__}", "red"))
-        import traceback
-        print(colored(f"Traceback: {traceback.format_exc()}", "red"))
+        logger.error("❌ Error loading ContentManager: %s", e)
+        logger.error("Error type: %s", type(e).__name__)
+        logger.debug("Traceback", exc_info=True)
         raise
 
 @st.cache_resource
 def get_forms_manager():
     try:
-        print(colored("📝 Loading forms manager...", "green"))
+        logger.info("📝 Loading forms manager...")
         db = get_database()
         return FormsManager(db)
     except Exception as e:
-        print(colored(f"❌ Error loading FormsManager: {str(e)}", "red"))
-        print(colored(f"Error type: {type(e).__name__}", "red"))
+        logger.error("❌ Error loading FormsManager: %s", e)
+        logger.error("Error type: %s", type(e).__name__)
         raise
 
 @st.cache_resource
 def get_database():
     try:
-        print(colored("🗄️ Loading database...", "green"))
+        logger.info("🗄️ Loading database...")
         return Database()
     except Exception as e:
-        print(colored(f"❌ Error loading Database: {str(e)}", "red"))
-        print(colored(f"Error type: {type(e).__name__}", "red"))
+        logger.error("❌ Error loading Database: %s", e)
+        logger.error("Error type: %s", type(e).__name__)
         raise
 
 # Initialize managers with error handling
 try:
     content_manager = get_content_manager()
-    print(colored("✅ ContentManager initialized successfully", "green"))
+    logger.debug("✅ ContentManager initialized successfully")
 except Exception as e:
-    print(colored(f"❌ Failed to initialize ContentManager: {str(e)}", "red"))
+    logger.error("❌ Failed to initialize ContentManager: %s", e)
     st.error(f"Failed to initialize ContentManager: {str(e)}")
     st.stop()
 
 try:
     forms_manager = get_forms_manager()
-    print(colored("✅ FormsManager initialized successfully", "green"))
+    logger.debug("✅ FormsManager initialized successfully")
 except Exception as e:
-    print(colored(f"❌ Failed to initialize FormsManager: {str(e)}", "red"))
+    logger.error("❌ Failed to initialize FormsManager: %s", e)
     st.error(f"Failed to initialize FormsManager: {str(e)}")
     st.stop()
 
 try:
     database = get_database()
-    print(colored("✅ Database initialized successfully", "green"))
+    logger.debug("✅ Database initialized successfully")
 except Exception as e:
-    print(colored(f"❌ Failed to initialize Database: {str(e)}", "red"))
+    logger.error("❌ Failed to initialize Database: %s", e)
     st.error(f"Failed to initialize Database: {str(e)}")
     st.stop()
 
+def get_metrics_config() -> Dict[str, Any]:
+    """The [metrics] secrets block (port, host, admin_token), empty if absent"""
+    if hasattr(st, 'secrets') and 'metrics' in st.secrets:
+        return dict(st.secrets["metrics"])
+    return {}
+
+# Prometheus endpoint for a local scraper, started once per process
+@st.cache_resource
+def get_metrics_server():
+    metrics_config = get_metrics_config()
+    if not metrics_config.get('port'):
+        return None
+    try:
+        return start_metrics_server(metrics_config['port'], metrics_config.get('host', DEFAULT_METRICS_HOST))
+    except Exception as e:
+        # Metrics must never take the site down (e.g. the port is taken)
+        logger.error("❌ Failed to start metrics endpoint: %s", e)
+        return None
+
+get_metrics_server()
+
+def is_metrics_admin() -> bool:
+    """True when the page was opened with ?metrics=<[metrics] admin_token>"""
+    admin_token = get_metrics_config().get('admin_token')
+    supplied = st.query_params.get("metrics")
+    return bool(admin_token and supplied) and secrets.compare_digest(str(supplied), str(admin_token))
+
 def render_header():
     """Render the application header with logo and title"""
     # Apply language-specific styles first
@@ -310,7 +341,7 @@ def render_header():
             st.session_state.language = lang_options[selected_lang]
             # Save language preference
             user_prefs.set_language(st.session_state.language)
-            print(colored(f"🌐 Language changed to: {st.session_state.language}", "blue"))
+            logger.debug("🌐 Language changed to: %s", st.session_state.language)
             st.rerun()
         
         st.markdown('</div>', unsafe_allow_html=True)
@@ -390,7 +421,7 @@ def render_navigation():
                 button_text = f"{icon} {get_text(text_key, st.session_state.language)}"
                 if st.button(button_text, key=f"nav_{page_key}"):
                     st.session_state.page = page_key
-                    print(colored(f"🧭 Navigation: {page_key}", "yellow"))
+                    logger.debug("🧭 Navigation: %s", page_key)
                     st.rerun()
         
         st.markdown('</div>', unsafe_allow_html=True)
@@ -402,7 +433,7 @@ def render_navigation():
 
 def render_forms_page():
     """Render the forms page with proper navigation"""
-    print(colored("📝 Rendering forms page...", "cyan"))
+    logger.debug("📝 Rendering forms page...")
     
     # Initialize form selection in session state
     if 'selected_form' not in st.session_state:
@@ -415,12 +446,24 @@ def render_forms_page():
             if st.button("← " + get_text('back_to_forms', st.session_state.language), key="back_to_forms"):
                 # Clear form selection and go back to forms list
                 st.session_state.selected_form = None
-                print(colored("⬅️ Navigating back to forms list", "yellow"))
+                logger.debug("⬅️ Navigating back to forms list")
                 st.rerun()
     
     # Forms title
     st.title(get_text('forms', st.session_state.language))
     
+    # Only the forms need the database; other pages never wait for its warm-up
+    if st.session_state.selected_form and USE_TURSO and not database.is_ready():
+        try:
+            with st.spinner(get_text('database_connecting', st.session_state.language)):
+                ready = database.wait_until_ready()
+        except Exception as e:
+            logger.error("❌ Database unavailable: %s", e)
+            ready = False
+        if not ready:
+            st.error(get_text('database_unavailable', st.session_state.language))
+            return
+    
     if st.session_state.selected_form:
         if st.session_state.selected_form == 'membership':
             render_membership_form()
@@ -482,7 +525,7 @@ def render_form_selection():
         st.markdown(get_text('membership_desc', st.session_state.language))
         if st.button(get_text('apply_now', st.session_state.language), key="membership_btn"):
             st.session_state.selected_form = "membership"
-            print(colored("📝 Opening membership form", "green"))
+            logger.info("📝 Opening membership form")
             st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
         
@@ -491,7 +534,7 @@ def render_form_selection():
         st.markdown(get_text('research_desc', st.session_state.language))
         if st.button(get_text('submit_research', st.session_state.language), key="research_btn"):
             st.session_state.selected_form = "research"
-            print(colored("🔬 Opening research form", "green"))
+            logger.info("🔬 Opening research form")
             st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
     
@@ -501,7 +544,7 @@ def render_form_selection():
         st.markdown(get_text('nomination_desc', st.session_state.language))
         if st.button(get_text('nominate_member', st.session_state.language), key="nomination_btn"):
             st.session_state.selected_form = "nomination"
-            print(colored("👥 Opening nomination form", "green"))
+            logger.info("👥 Opening nomination form")
             st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
         
@@ -510,13 +553,13 @@ def render_form_selection():
         st.markdown(get_text('suggestions_desc', st.session_state.language))
         if st.button(get_text('submit_idea', st.session_state.language), key="ideas_btn"):
             st.session_state.selected_form = "bank_of_ideas"
-            print(colored("💡 Opening bank of ideas form", "green"))
+            logger.info("💡 Opening bank of ideas form")
             st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
 
 def render_bank_of_ideas_form():
     """Render the bank of ideas form"""
-    print(colored("💡 Rendering bank of ideas form...", "cyan"))
+    logger.debug("💡 Rendering bank of ideas form...")
     
     content_class = "arabic-content" if st.session_state.language == 'ar' else "english-content"
     text_align = "right" if st.session_state.language == 'ar' else "left"
@@ -583,19 +626,19 @@ def render_bank_of_ideas_form():
                     if result['success']:
                         st.success("✅ " + get_text('form_submitted', st.session_state.language))
                         st.balloons()
-                        print(colored("✅ Bank of ideas form submitted successfully", "green"))
+                        logger.info("✅ Bank of ideas form submitted successfully")
                     else:
                         st.error(f"❌ {get_text('error', st.session_state.language)}: {result.get('error', 'Unknown error')}")
-                        print(colored(f"❌ Error submitting bank of ideas: {result.get('error')}", "red"))
+                        logger.error("❌ Error submitting bank of ideas: %s", result.get('error'))
                 except Exception as e:
                     st.error(f"❌ {get_text('error', st.session_state.language)}: {str(e)}")
-                    print(colored(f"❌ Exception submitting bank of ideas: {str(e)}", "red"))
+                    logger.error("❌ Exception submitting bank of ideas: %s", e)
             else:
                 st.error("❌ " + get_text('fill_required_fields', st.session_state.language))
 
 def render_membership_form():
     """Render the membership application form"""
-    print(colored("📝 Rendering membership form...", "cyan"))
+    logger.debug("📝 Rendering membership form...")
     
     content_class = "arabic-content" if st.session_state.language == 'ar' else "english-content"
     text_align = "right" if st.session_state.language == 'ar' else "left"
@@ -676,7 +719,7 @@ def render_membership_form():
                     if result['success']:
                         st.success("✅ " + get_text('application_submitted', st.session_state.language))
                         st.balloons()
-                        print(colored("✅ Membership application submitted successfully", "green"))
+                        logger.info("✅ Membership application submitted successfully")
                     else:
                         # Handle duplicate email error with appropriate language
                         if result.get('error') == 'duplicate_email':
@@ -685,13 +728,13 @@ def render_membership_form():
                             else:
                                 error_message = f"❌ {result.get('error_en', 'Membership information for this email has already been submitted.')}"
                             st.error(error_message)
-                            print(colored(f"❌ Duplicate email error: {email}", "red"))
+                            logger.error("❌ Duplicate email error: %s", email)
                         else:
                             st.error(f"❌ {get_text('error', st.session_state.language)}: {result.get('error', 'Unknown error')}")
-                            print(colored(f"❌ Error submitting membership: {result.get('error')}", "red"))
+                            logger.error("❌ Error submitting membership: %s", result.get('error'))
                 except Exception as e:
                     st.error(f"❌ {get_text('error', st.session_state.language)}: {str(e)}")
-                    print(colored(f"❌ Exception submitting membership: {str(e)}", "red"))
+                    logger.error("❌ Exception submitting membership: %s", e)
             else:
                 if not email_valid:
                     error_msg = "يرجى إدخال عنوان بريد إلكتروني صحيح يحتوي على @" if st.session_state.language == 'ar' else "Please enter a valid email address containing @"
@@ -704,7 +747,7 @@ def render_membership_form():
 
 def render_research_database_form():
     """Render the research database form"""
-    print(colored("🔬 Rendering research database form...", "cyan"))
+    logger.debug("🔬 Rendering research database form...")
     
     content_class = "arabic-content" if st.session_state.language == 'ar' else "english-content"
     text_align = "right" if st.session_state.language == 'ar' else "left"
@@ -758,19 +801,19 @@ def render_research_database_form():
                     if result['success']:
                         st.success("✅ " + get_text('form_submitted', st.session_state.language))
                         st.balloons()
-                        print(colored("✅ Research form submitted successfully", "green"))
+                        logger.info("✅ Research form submitted successfully")
                     else:
                         st.error(f"❌ {get_text('error', st.session_state.language)}: {result.get('error', 'Unknown error')}")
-                        print(colored(f"❌ Error submitting research: {result.get('error')}", "red"))
+                        logger.error("❌ Error submitting research: %s", result.get('error'))
                 except Exception as e:
                     st.error(f"❌ {get_text('error', st.session_state.language)}: {str(e)}")
-                    print(colored(f"❌ Exception submitting research: {str(e)}", "red"))
+                    logger.error("❌ Exception submitting research: %s", e)
             else:
                 st.error("❌ " + get_text('fill_required_fields', st.session_state.language))
 
 def render_nomination_form():
     """Render the nomination form"""
-    print(colored("👥 Rendering nomination form...", "cyan"))
+    logger.debug("👥 Rendering nomination form...")
     
     content_class = "arabic-content" if st.session_state.language == 'ar' else "english-content"
     text_align = "right" if st.session_state.language == 'ar' else "left"
@@ -826,13 +869,13 @@ def render_nomination_form():
                     if result['success']:
                         st.success("✅ " + get_text('form_submitted', st.session_state.language))
                         st.balloons()
-                        print(colored("✅ Nomination form submitted successfully", "green"))
+                        logger.info("✅ Nomination form submitted successfully")
                     else:
                         st.error(f"❌ {get_text('error', st.session_state.language)}: {result.get('error', 'Unknown error')}")
-                        print(colored(f"❌ Error submitting nomination: {result.get('error')}", "red"))
+                        logger.error("❌ Error submitting nomination: %s", result.get('error'))
                 except Exception as e:
                     st.error(f"❌ {get_text('error', st.session_state.language)}: {str(e)}")
-                    print(colored(f"❌ Exception submitting nomination: {str(e)}", "red"))
+                    logger.error("❌ Exception submitting nomination: %s", e)
             else:
                 if not validate_email(nominee_email) or not validate_email(nominator_email):
                     error_msg = "يرجى إدخال عناوين بريد إلكتروني صحيحة تحتوي على @" if st.session_state.language == 'ar' else "Please enter valid email addresses containing @"
@@ -842,7 +885,7 @@ def render_nomination_form():
 
 def render_suggestions_form():
     """Render the general suggestions form"""
-    print(colored("💡 Rendering suggestions form...", "cyan"))
+    logger.debug("💡 Rendering suggestions form...")
     
     content_class = "arabic-content" if st.session_state.language == 'ar' else "english-content"
     text_align = "right" if st.session_state.language == 'ar' else "left"
@@ -889,13 +932,13 @@ def render_suggestions_form():
                     if result['success']:
                         st.success("✅ " + get_text('form_submitted', st.session_state.language))
                         st.balloons()
-                        print(colored("✅ Suggestion form submitted successfully", "green"))
+                        logger.info("✅ Suggestion form submitted successfully")
                     else:
                         st.error(f"❌ {get_text('error', st.session_state.language)}: {result.get('error', 'Unknown error')}")
-                        print(colored(f"❌ Error submitting suggestion: {result.get('error')}", "red"))
+                        logger.error("❌ Error submitting suggestion: %s", result.get('error'))
                 except Exception as e:
                     st.error(f"❌ {get_text('error', st.session_state.language)}: {str(e)}")
-                    print(colored(f"❌ Exception submitting suggestion: {str(e)}", "red"))
+                    logger.error("❌ Exception submitting suggestion: %s", e)
             else:
                 if not validate_email(email):
                     error_msg = "يرجى إدخال عنوان بريد إلكتروني صحيح يحتوي على @" if st.session_state.language == 'ar' else "Please enter a valid email address containing @"
@@ -1074,9 +1117,9 @@ def render_projects_page():
                     col1, col2, col3 = st.columns([1, 2, 1])
                     with col2:
                         st.image(project["image"], caption=f"{"مخطط المشروع" if st.session_state.language == 'ar' else 'Project Diagram'} {project['id']}", use_container_width=True)
-                    print(colored(f"✅ Successfully displayed image: {project['image']}", "green"))
+                    logger.debug("✅ Successfully displayed image: %s", project['image'])
                 except Exception as e:
-                    print(colored(f"⚠️ Could not display image {project['image']}: {e}", "yellow"))
+                    logger.warning("⚠️ Could not display image %s: %s", project['image'], e)
                     st.info(f"📷 {"صورة توضيحية متاحة" if st.session_state.language == 'ar' else "Illustration available"}: {project['image']}")
             
             # Project links if available
@@ -1350,9 +1393,43 @@ def render_donations_page():
     
 
 
+def render_metrics_page():
+    """Data-layer metrics for operators: statement counts and latencies per fingerprint and form"""
+    st.markdown("## 📈 Data-layer metrics")
+    summary = REGISTRY.summary()
+    
+    st.markdown("### Statements")
+    if summary['statements']:
+        st.dataframe(summary['statements'])
+    else:
+        st.info("No statements recorded yet.")
+    
+    st.markdown("### Form submissions")
+    if summary['forms']:
+        st.dataframe(summary['forms'])
+    else:
+        st.info("No form submissions recorded yet.")
+    
+    if USE_TURSO:
+        st.markdown("### Turso")
+        cache_col, transport_col = st.columns(2)
+        with cache_col:
+            st.markdown("**Read cache**")
+            st.json(database.cache_metrics())
+        with transport_col:
+            st.markdown("**Transport**")
+            st.json(database.transport_metrics())
+        for title, snapshot in (("Replica", database.replica_metrics()), ("Journal", database.journal_metrics())):
+            if snapshot is not None:
+                st.markdown(f"**{title}**")
+                st.json(snapshot)
+    
+    with st.expander("Prometheus text"):
+        st.code(REGISTRY.render(), language="text")
+
 def main():
     """Main application function"""
-    print(colored("🚀 Starting main application...", "cyan"))
+    logger.debug("🚀 Starting main application...")
     
     render_header()
     render_navigation()
@@ -1363,7 +1440,9 @@ def main():
     
     # Route to appropriate page
     current_page = st.session_state.get('page', 'home')
-    print(colored(f"📄 Rendering page: {current_page}", "blue"))
+    if is_metrics_admin():
+        current_page = "metrics"
+    logger.debug("📄 Rendering page: %s", current_page)
     
     if current_page == "home":
         render_home_page()
@@ -1383,6 +1462,8 @@ def main():
         render_forms_page()
     elif current_page == "contact":
         render_contact_page()
+    elif current_page == "metrics":
+        render_metrics_page()
     else:
         render_home_page()
     
@@ -0,0 +1,382 @@
+"""
+Data-Layer Metrics
+Statement, storage and form-submission counters and latency histograms, exported in Prometheus text format
+
+Recording is a dictionary lookup and a few additions under a lock, cheap
+enough to leave on in production. Expose the registry with
+start_metrics_server() (the [metrics] secrets block does this for the app):
+
+    curl http://127.0.0.1:9464/metrics
+"""
+
+import bisect
+import functools
+import re
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, Any, List, Tuple, Callable, Iterable, Union
+
+try:
+    from src.query_cache import normalize_sql
+    from src.log_utils import get_logger
+except ImportError:
+    from query_cache import normalize_sql
+    from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Metrics defaults, overridable from the [metrics] secrets block
+DEFAULT_METRICS_HOST = "127.0.0.1"  # the listener is for a local scraper, not the internet
+DEFAULT_MAX_FINGERPRINTS = 200  # distinct statement labels kept; the rest are counted as "other"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_PATTERN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_ROWS_PATTERN = re.compile(r"(?i)(\bvalues\s*\(\?\))(?:\s*,\s*\(\?\))+")
+_TRANSACTION_CONTROL = re.compile(r"(?i)^\s*(?:begin|commit|end|rollback)\b")
+
+
+@functools.lru_cache(maxsize=1024)
+def statement_fingerprint(sql: str) -> str:
+    """Statement text with literals, IN lists and multi-row VALUES collapsed, for use as a label"""
+    fingerprint = _LITERAL_PATTERN.sub("?", normalize_sql(sql))
+    fingerprint = _IN_LIST_PATTERN.sub("(?)", fingerprint)
+    fingerprint = _VALUES_ROWS_PATTERN.sub(r"\1, ...", fingerprint)
+    return fingerprint[:120]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}"
+                for labels, value in sorted(self.values().items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def series(self) -> Dict[Tuple[str, ...], Tuple[List[int], float, int]]:
+        with self._lock:
+            return {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+
+    def quantile(self, q: float, *labels: str) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None when empty or past the last bucket)"""
+        snapshot = self.series().get(labels)
+        if snapshot is None or snapshot[2] == 0:
+            return None
+        counts, _, count = snapshot
+        target = q * count
+        running = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            if running >= target:
+                return bound
+        return None
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, (counts, total, count) in sorted(self.series().items()):
+            running = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                running += bucket_count
+                le = 'le="%g"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {running}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """The data layer's metrics, plus the fingerprint cardinality cap"""
+
+    def __init__(self, max_fingerprints: int = DEFAULT_MAX_FINGERPRINTS):
+        self.max_fingerprints = int(max_fingerprints)
+        self._fingerprints: set = set()
+        self._fingerprints_lock = threading.Lock()
+
+        self.statement_duration = Histogram(
+            "quran_db_request_duration_seconds",
+            "Database round trip latency, labelled by the first statement sent",
+            ("backend", "fingerprint"))
+        self.statements = Counter(
+            "quran_db_statements_total", "Statements executed", ("backend", "fingerprint"))
+        self.statement_errors = Counter(
+            "quran_db_statement_errors_total", "Statements that failed or were in a failed request",
+            ("backend", "fingerprint"))
+        self.payload_bytes = Histogram(
+            "quran_db_payload_bytes", "Bytes sent to and received from the database backend",
+            ("backend", "direction"), buckets=SIZE_BUCKETS)
+        self.compression_ratio = Histogram(
+            "quran_db_compression_ratio", "Compressed over uncompressed size of gzip/deflate bodies",
+            ("backend", "direction"), buckets=RATIO_BUCKETS)
+        self.compression_saved_bytes = Counter(
+            "quran_db_compression_saved_bytes_total", "Bytes kept off the wire by compression",
+            ("backend", "direction"))
+        self.storage_duration = Histogram(
+            "quran_storage_transfer_duration_seconds", "Cloud Storage database download and upload latency",
+            ("operation",))
+        self.storage_errors = Counter(
+            "quran_storage_transfer_errors_total", "Cloud Storage transfers that failed", ("operation",))
+        self.storage_cache = Counter(
+            "quran_storage_cache_total", "Cloud Storage database opens served from the local copy (hit) or a download (miss)",
+            ("outcome",))
+        self.storage_conflicts = Counter(
+            "quran_storage_upload_conflicts_total",
+            "Cloud Storage uploads rejected because the database changed since download, by what happened next",
+            ("outcome",))
+        self.form_duration = Histogram(
+            "quran_form_submit_duration_seconds", "Form submission latency", ("backend", "form"))
+        self.form_submissions = Counter(
+            "quran_form_submissions_total", "Form submissions by outcome", ("backend", "form", "outcome"))
+        self._metrics = [self.statement_duration, self.statements, self.statement_errors, self.payload_bytes,
+                         self.compression_ratio, self.compression_saved_bytes, self.storage_duration,
+                         self.storage_errors, self.storage_cache, self.storage_conflicts,
+                         self.form_duration, self.form_submissions]
+
+    def fingerprint_label(self, sql: str) -> str:
+        """Fingerprint of sql, or "other" once max_fingerprints distinct ones have been seen"""
+        fingerprint = statement_fingerprint(sql)
+        if fingerprint in self._fingerprints:
+            return fingerprint
+        with self._fingerprints_lock:
+            if len(self._fingerprints) >= self.max_fingerprints:
+                return "other"
+            self._fingerprints.add(fingerprint)
+        return fingerprint
+
+    # Recording
+
+    def record_statements(self, backend: str, sql_texts: List[str], seconds: float,
+                          failed: Union[bool, Iterable[int]] = False):
+        """One round trip carrying sql_texts; BEGIN/COMMIT are not counted
+
+        failed is True when the whole request failed, or the indexes of the
+        statements the server rejected.
+        """
+        failed_indexes = set(range(len(sql_texts))) if failed is True else set(failed or ())
+        labels = [(index, self.fingerprint_label(sql)) for index, sql in enumerate(sql_texts)
+                  if not _TRANSACTION_CONTROL.match(sql)]
+        if not labels:
+            return
+        self.statement_duration.observe(seconds, backend, labels[0][1])
+        for index, label in labels:
+            self.statements.inc(backend, label)
+            if index in failed_indexes:
+                self.statement_errors.inc(backend, label)
+
+    def record_payload(self, backend: str, sent: int, received: int):
+        self.payload_bytes.observe(sent, backend, "sent")
+        self.payload_bytes.observe(received, backend, "received")
+
+    def record_compression(self, backend: str, direction: str, raw: int, wire: int):
+        """A body that went over the wire compressed; raw is its decoded size"""
+        if raw > 0:
+            self.compression_ratio.observe(wire / raw, backend, direction)
+            self.compression_saved_bytes.inc(backend, direction, amount=max(raw - wire, 0))
+
+    def record_storage(self, operation: str, seconds: float, error: bool = False):
+        self.storage_duration.observe(seconds, operation)
+        if error:
+            self.storage_errors.inc(operation)
+
+    def record_storage_cache(self, hit: bool):
+        self.storage_cache.inc("hit" if hit else "miss")
+
+    def record_storage_conflict(self, outcome: str):
+        """outcome is "retried" (writes re-applied on the newer copy) or "failed" (commit gave up)"""
+        self.storage_conflicts.inc(outcome)
+
+    def record_submission(self, backend: str, form: str, seconds: float, outcome: str):
+        self.form_duration.observe(seconds, backend, form)
+        self.form_submissions.inc(backend, form, outcome)
+
+    # Export
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Per-statement and per-form rows for the admin view, busiest first"""
+        errors = self.statement_errors.values()
+        statements = []
+        for (backend, fingerprint), count in self.statements.values().items():
+            durations = self.statement_duration.series().get((backend, fingerprint))
+            statements.append({
+                'backend': backend,
+                'statement': fingerprint,
+                'count': int(count),
+                'errors': int(errors.get((backend, fingerprint), 0)),
+                'round_trips': durations[2] if durations else 0,
+                'mean_ms': round(durations[1] / durations[2] * 1000, 2) if durations and durations[2] else None,
+                'p95_ms_le': self._quantile_ms(self.statement_duration, backend, fingerprint),
+            })
+
+        outcomes: Dict[Tuple[str, str], Dict[str, int]] = {}
+        for (backend, form, outcome), count in self.form_submissions.values().items():
+            outcomes.setdefault((backend, form), {})[outcome] = int(count)
+        forms = []
+        for (backend, form), (_, total, count) in self.form_duration.series().items():
+            forms.append({
+                'backend': backend,
+                'form': form,
+                'count': count,
+                **{f"outcome_{outcome}": value for outcome, value in outcomes.get((backend, form), {}).items()},
+                'mean_ms': round(total / count * 1000, 2) if count else None,
+                'p95_ms_le': self._quantile_ms(self.form_duration, backend, form),
+            })
+
+        return {
+            'statements': sorted(statements, key=lambda row: row['count'], reverse=True),
+            'forms': sorted(forms, key=lambda row: row['count'], reverse=True),
+        }
+
+    @staticmethod
+    def _quantile_ms(histogram: Histogram, *labels: str) -> Optional[float]:
+        bound = histogram.quantile(0.95, *labels)
+        return round(bound * 1000, 1) if bound is not None else None
+
+
+# This module is imported both as src.metrics and as metrics (see the import
+# fallbacks); whichever copy loads second reuses the first one's registry
+_other_copy = sys.modules.get('metrics' if __name__ == 'src.metrics' else 'src.metrics')
+REGISTRY: MetricsRegistry = getattr(_other_copy, 'REGISTRY', None) or MetricsRegistry()
+
+
+def instrumented_submit(backend: str, form: str) -> Callable:
+    """Decorate a submit_* method to record its latency and outcome
+
+    The outcome is "success", the result's error code (e.g. duplicate_email)
+    or "error"; "exception" if the method raised.
+    """
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "exception"
+            try:
+                result = method(*args, **kwargs)
+                if isinstance(result, dict):
+                    outcome = "success" if result.get('success') else str(result.get('error', 'error'))[:40]
+                    if ' ' in outcome:
+                        outcome = "error"  # a raw exception message, not an error code
+                return result
+            finally:
+                REGISTRY.record_submission(backend, form, time.perf_counter() - started, outcome)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        data = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics %s - %s", self.address_string(), format % args)
+
+
+_servers: Dict[Tuple[str, int], ThreadingHTTPServer] = {}
+_servers_lock = threading.Lock()
+
+
+class _MetricsServer(ThreadingHTTPServer):
+    """HTTP server that forgets itself on shutdown, so its address can be served again"""
+
+    daemon_threads = True
+    key: Optional[Tuple[str, int]] = None  # its entry in _servers
+
+    def shutdown(self):
+        with _servers_lock:
+            if _servers.get(self.key) is self:
+                del _servers[self.key]
+        super().shutdown()
+        self.server_close()
+
+
+def start_metrics_server(port: int, host: str = DEFAULT_METRICS_HOST,
+                         registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve /metrics on a daemon thread; calling again for the same address returns the running server"""
+    with _servers_lock:
+        server = _servers.get((host, int(port)))
+        if server is not None:
+            return server
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+        server = _MetricsServer((host, int(port)), handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        server.key = (host, server.server_address[1])
+        _servers[server.key] = server
+    logger.info("📈 Metrics endpoint at http://%s:%s/metrics", host, server.server_address[1])
+    return server
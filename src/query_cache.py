@@ -0,0 +1,211 @@
+"""
+Read Cache for the Data Layer
+Table-aware LRU of query results with per-table TTLs, invalidated by writes
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Set, Iterable
+
+# Cache defaults, overridable from the [turso] secrets block
+DEFAULT_CACHE_MAX_ENTRIES = 512  # 0 disables the cache
+DEFAULT_CACHE_TTL = 30.0  # seconds, for tables without their own TTL
+
+# Tables whose rows change rarely outlive the default; override with [turso] cache_table_ttls
+DEFAULT_CACHE_TABLE_TTLS = {
+    'users': 120.0,
+    'session_tokens': 60.0,
+}
+
+# Table names after FROM / JOIN / INTO / UPDATE, optionally quoted
+_TABLE_PATTERN = re.compile(r'(?i)\b(?:from|join|into|update)\s+["`\[]?([A-Za-z_][\w]*)')
+
+# The table a write statement changes (subqueries only read)
+_WRITE_TARGET_PATTERN = re.compile(
+    r'(?is)^\s*(?:insert(?:\s+or\s+\w+)?\s+into|replace\s+into|update(?:\s+or\s+\w+)?|delete\s+from'
+    r'|(?:create|drop|alter)\s+table(?:\s+if(?:\s+not)?\s+exists)?)\s+["`\[]?([A-Za-z_][\w]*)'
+)
+
+
+# Statements that never change a table (transaction control, plain reads)
+_NON_WRITE_PATTERN = re.compile(r'(?i)^\s*(?:begin|commit|end|rollback|savepoint|release|select|explain|values)\b')
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace so formatting differences share one cache entry"""
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def referenced_tables(sql: str) -> Set[str]:
+    """Tables a statement reads or writes (lower-cased)"""
+    return {name.lower() for name in _TABLE_PATTERN.findall(sql)}
+
+
+def written_table(sql: str) -> Optional[str]:
+    """The table a write statement changes, or None if it cannot be told"""
+    match = _WRITE_TARGET_PATTERN.match(sql)
+    return match.group(1).lower() if match else None
+
+
+class QueryCache:
+    """Thread-safe LRU of read results keyed by normalized SQL and parameters
+
+    An entry lives for the shortest TTL among the tables it reads and is
+    dropped as soon as any of those tables is written through the same
+    database object. Writes made by other processes are only seen once the
+    TTL runs out, so keep TTLs short for tables other instances write.
+
+    Every invalidation bumps a per-table generation. A reader takes
+    generation(sql) before it queries and hands it to put(), so a result
+    read before a write that finished in the meantime is not stored.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_MAX_ENTRIES, default_ttl: float = DEFAULT_CACHE_TTL,
+                 table_ttls: Optional[Dict[str, float]] = None):
+        self.max_entries = int(max_entries)
+        self.default_ttl = float(default_ttl)
+        self.table_ttls = {name.lower(): float(ttl) for name, ttl in (table_ttls or {}).items()}
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[Any, float, Set[str]]]" = OrderedDict()
+        self._by_table: Dict[str, Set[Tuple]] = {}
+        self._generations: Dict[str, int] = {}
+        self._clear_generation = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+            'stale_puts': 0,
+        }
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'QueryCache':
+        """Build from the [turso] secrets block (cache_max_entries, cache_ttl, cache_table_ttls)"""
+        table_ttls = dict(DEFAULT_CACHE_TABLE_TTLS)
+        table_ttls.update(dict(config.get('cache_table_ttls', {})))
+        return cls(
+            max_entries=config.get('cache_max_entries', DEFAULT_CACHE_MAX_ENTRIES),
+            default_ttl=config.get('cache_ttl', DEFAULT_CACHE_TTL),
+            table_ttls=table_ttls
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def _key(sql: str, params: Optional[List]) -> Tuple:
+        return (normalize_sql(sql), tuple(params or ()))
+
+    def _ttl(self, tables: Set[str]) -> float:
+        return min((self.table_ttls.get(table, self.default_ttl) for table in tables), default=self.default_ttl)
+
+    def _drop(self, key: Tuple):
+        _, _, tables = self._entries.pop(key)
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def get(self, sql: str, params: Optional[List] = None) -> Optional[Any]:
+        """Cached result for this query, or None on a miss"""
+        if not self.enabled:
+            return None
+        key = self._key(sql, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            result, expires_at, _ = entry
+            if time.monotonic() >= expires_at:
+                self._drop(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return result
+
+    def _generation(self, tables: Set[str]) -> Tuple:
+        return (self._clear_generation,) + tuple(self._generations.get(table, 0) for table in sorted(tables))
+
+    def generation(self, sql: str) -> Tuple:
+        """Invalidation count of the tables this query reads; take it before running the query"""
+        tables = referenced_tables(sql)
+        with self._lock:
+            return self._generation(tables)
+
+    def put(self, sql: str, params: Optional[List], result: Any, generation: Optional[Tuple] = None):
+        """Store a read result; statements that name no table are not cached
+
+        With generation (from generation() before the read), the result is
+        dropped if one of its tables was invalidated since.
+        """
+        if not self.enabled:
+            return
+        tables = referenced_tables(sql)
+        if not tables:
+            return
+        key = self._key(sql, params)
+        expires_at = time.monotonic() + self._ttl(tables)
+        with self._lock:
+            if generation is not None and generation != self._generation(tables):
+                self._stats['stale_puts'] += 1
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (result, expires_at, tables)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def invalidate_tables(self, tables: Iterable[str]):
+        """Drop every entry that read any of these tables"""
+        with self._lock:
+            for table in tables:
+                table = table.lower()
+                self._generations[table] = self._generations.get(table, 0) + 1
+                for key in list(self._by_table.get(table, ())):
+                    self._drop(key)
+                    self._stats['invalidations'] += 1
+
+    def invalidate_sql(self, statements: Iterable[str]):
+        """Invalidate the tables written by these statements; an unrecognized write clears everything"""
+        tables: Set[str] = set()
+        for sql in statements:
+            if _NON_WRITE_PATTERN.match(sql):
+                continue
+            table = written_table(sql)
+            if table is None:
+                self.clear()
+                return
+            tables.add(table)
+        if tables:
+            self.invalidate_tables(tables)
+
+    def clear(self):
+        """Drop everything, for writes whose tables are not known"""
+        with self._lock:
+            self._clear_generation += 1
+            self._stats['invalidations'] += len(self._entries)
+            self._entries.clear()
+            self._by_table.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            snapshot: Dict[str, Any] = dict(self._stats)
+            snapshot['entries'] = len(self._entries)
+        lookups = snapshot['hits'] + snapshot['misses']
+        snapshot['hit_ratio'] = round(snapshot['hits'] / lookups, 3) if lookups else None
+        snapshot['max_entries'] = self.max_entries
+        return snapshot
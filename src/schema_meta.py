@@ -0,0 +1,66 @@
+"""
+Schema Versioning
+Shared schema_meta bookkeeping so warm starts can skip re-running DDL
+"""
+
+import hashlib
+import re
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+# Bump when the DDL of either backend changes in a way that needs migrating;
+# the DDL hash also catches edits made without a bump
+SCHEMA_VERSION = 2
+
+SCHEMA_META_DDL = '''
+    CREATE TABLE IF NOT EXISTS schema_meta (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL,
+        ddl_hash TEXT NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+SCHEMA_META_SELECT = "SELECT version, ddl_hash FROM schema_meta WHERE id = 1"
+
+SCHEMA_META_UPSERT = '''
+    INSERT INTO schema_meta (id, version, ddl_hash, applied_at) VALUES (1, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET version = excluded.version, ddl_hash = excluded.ddl_hash,
+        applied_at = excluded.applied_at
+'''
+
+
+def ddl_hash(statements: List[str]) -> str:
+    """Content hash of a DDL list; indentation and blank lines do not change it"""
+    digest = hashlib.sha256()
+    for statement in statements:
+        digest.update(re.sub(r"\s+", " ", statement).strip().encode('utf-8'))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def schema_is_current(version: Any, applied_hash: Any, expected_hash: str,
+                      expected_version: int = SCHEMA_VERSION) -> bool:
+    """True if the recorded version and hash match the code's DDL"""
+    try:
+        return int(version) == expected_version and applied_hash == expected_hash
+    except (TypeError, ValueError):
+        return False
+
+
+def schema_meta_upsert(schema_hash: str, version: int = SCHEMA_VERSION) -> Tuple[str, List[Any]]:
+    """(sql, params) recording that `version`/`schema_hash` has been applied"""
+    return SCHEMA_META_UPSERT, [version, schema_hash, datetime.now().isoformat()]
+
+
+def schema_metadata(schema_hash: str, version: int = SCHEMA_VERSION) -> Dict[str, str]:
+    """Object metadata carrying the schema stamp (GCS blob metadata values are strings)"""
+    return {'schema_version': str(version), 'ddl_hash': schema_hash}
+
+
+def metadata_is_current(metadata: Optional[Dict[str, str]], expected_hash: str,
+                        expected_version: int = SCHEMA_VERSION) -> bool:
+    """True if object metadata carries the current schema stamp"""
+    metadata = metadata or {}
+    return schema_is_current(metadata.get('schema_version'), metadata.get('ddl_hash'),
+                             expected_hash, expected_version)
@@ -0,0 +1,352 @@
+"""
+Write-Behind Submission Journal
+Form submissions are made durable locally first and drained to Turso in the background
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+try:
+    from src.hrana_client import HranaError
+    from src.log_utils import get_logger
+except ImportError:
+    from hrana_client import HranaError
+    from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Journal defaults, overridable from the [turso] secrets block
+DEFAULT_JOURNAL_FLUSH_INTERVAL = 2.0  # seconds between drains when nothing new arrives
+DEFAULT_JOURNAL_BATCH_SIZE = 20  # submissions per flush transaction
+DEFAULT_JOURNAL_RETRY_BASE_DELAY = 1.0  # first backoff after a failed flush, doubled per attempt
+DEFAULT_JOURNAL_RETRY_MAX_DELAY = 60.0
+DEFAULT_JOURNAL_RETENTION = 24 * 3600.0  # seconds an applied entry stays queryable through status()
+
+JOURNAL_DDL = [
+    '''
+        CREATE TABLE IF NOT EXISTS journal (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT UNIQUE NOT NULL,
+            form_name TEXT NOT NULL,
+            statements TEXT NOT NULL,
+            dedupe_key TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            result_id INTEGER,
+            created_at REAL NOT NULL,
+            next_attempt_at REAL NOT NULL,
+            finished_at REAL
+        )
+    ''',
+    # One pending submission per dedupe key (membership email), enforced atomically
+    '''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_journal_pending_dedupe
+        ON journal (dedupe_key) WHERE status = 'pending' AND dedupe_key IS NOT NULL
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_journal_status ON journal (status, next_attempt_at)",
+]
+
+# Recorded on Turso in the same transaction as the submission; a replayed
+# flush collides on the primary key and rolls back instead of inserting twice
+SUBMISSION_KEYS_DDL = '''
+    CREATE TABLE IF NOT EXISTS submission_keys (
+        idempotency_key TEXT PRIMARY KEY,
+        form_name TEXT NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+SUBMISSION_KEY_INSERT = "INSERT INTO submission_keys (idempotency_key, form_name, applied_at) VALUES (?, ?, ?)"
+
+
+def _is_key_conflict(message: str) -> bool:
+    return 'submission_keys' in message and 'unique' in message.lower()
+
+
+def _is_statement_error(error: HranaError) -> bool:
+    """True when the statement itself failed, so sending it again would fail again
+
+    SQLite and SQL errors carry SQLITE_* / SQL_* codes; stream errors (expired
+    baton, closed stream, protocol errors) are worth retrying later.
+    """
+    return (error.code or '').startswith(('SQLITE_', 'SQL_'))
+
+
+class SubmissionJournal:
+    """Durable local queue of form INSERTs, flushed to Turso by a background thread
+
+    append() commits the submission to a local SQLite file (WAL,
+    synchronous=FULL, so the commit is fsynced) and returns at once. The
+    flusher sends pending entries in one transaction per batch, each with
+    its idempotency key; if the batch fails it retries entry by entry so one
+    bad submission cannot hold back the rest. Network and stream failures
+    back off and retry indefinitely; a statement Turso rejects is kept as
+    'failed'. Applied entries stay in the file for retention seconds so
+    status() can report them.
+    """
+
+    def __init__(self, db, path: str, flush_interval: float = DEFAULT_JOURNAL_FLUSH_INTERVAL,
+                 batch_size: int = DEFAULT_JOURNAL_BATCH_SIZE,
+                 retry_base_delay: float = DEFAULT_JOURNAL_RETRY_BASE_DELAY,
+                 retry_max_delay: float = DEFAULT_JOURNAL_RETRY_MAX_DELAY,
+                 retention: float = DEFAULT_JOURNAL_RETENTION):
+        self.db = db
+        self.path = path
+        self.flush_interval = float(flush_interval)
+        self.batch_size = int(batch_size)
+        self.retry_base_delay = float(retry_base_delay)
+        self.retry_max_delay = float(retry_max_delay)
+        self.retention = float(retention)
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._consecutive_failures = 0
+
+        self._stats = {
+            'appended': 0,
+            'flushed': 0,
+            'rejected': 0,
+            'failed': 0,
+            'flushes': 0,
+            'flush_errors': 0,
+            'last_flush_lag_ms': 0.0,
+        }
+
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        for statement in JOURNAL_DDL:
+            self._conn.execute(statement)
+
+    # Writing
+
+    def append(self, form_name: str, statements: List[Tuple[str, List]],
+               dedupe_key: Optional[str] = None) -> Optional[str]:
+        """Durably queue a submission; returns its idempotency key
+
+        Returns None if a submission with the same dedupe_key is still pending.
+        """
+        key = uuid.uuid4().hex
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO journal (idempotency_key, form_name, statements, dedupe_key, created_at, next_attempt_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [key, form_name, json.dumps(statements), dedupe_key, now, now]
+                )
+                self._stats['appended'] += 1
+        except sqlite3.IntegrityError:
+            return None
+        self._wake.set()
+        logger.debug("📥 Journaled %s submission %s", form_name, key)
+        return key
+
+    def status(self, key: str) -> Optional[Dict[str, Any]]:
+        """Current state of a submission: pending, applied, rejected or failed
+
+        Returns None for an unknown key, or for an applied one older than the
+        retention window.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, attempts, last_error, result_id FROM journal WHERE idempotency_key = ?", [key]
+            ).fetchone()
+        if row is None:
+            return None
+        return {'status': row[0], 'attempts': row[1], 'last_error': row[2], 'result_id': row[3]}
+
+    # Flushing
+
+    def _due_entries(self) -> List[Tuple[int, str, str, List, float]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, idempotency_key, form_name, statements, created_at FROM journal "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY seq LIMIT ?",
+                [time.time(), self.batch_size]
+            ).fetchall()
+        return [(seq, key, form_name, json.loads(statements), created_at)
+                for seq, key, form_name, statements, created_at in rows]
+
+    def _finish(self, seq: int, status: str, result_id: Optional[int] = None, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE journal SET status = ?, result_id = ?, last_error = ?, finished_at = ?, "
+                "attempts = attempts + 1 WHERE seq = ?",
+                [status, result_id, error, time.time(), seq]
+            )
+
+    def _defer(self, entries: List[Tuple], error: Exception):
+        """Back off after a transport failure; the entries stay pending"""
+        self._consecutive_failures += 1
+        delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** (self._consecutive_failures - 1)))
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE journal SET attempts = attempts + 1, last_error = ?, next_attempt_at = ? WHERE seq = ?",
+                [[str(error), time.time() + delay, entry[0]] for entry in entries]
+            )
+            self._stats['flush_errors'] += 1
+        logger.warning("⚠️ Journal flush failed, retrying %s submissions in %.0fs: %s", len(entries), delay, error)
+
+    def _send(self, entries: List[Tuple]) -> List[Any]:
+        """Apply entries in one Turso transaction; returns the ResultSet of each entry's first statement
+
+        The first statement is the submission's own INSERT; any after it
+        (research authors) hang off the row it created.
+        """
+        applied_at = datetime.now().isoformat()
+        statements: List[Any] = []
+        first_indexes = []
+        for _, key, form_name, entry_statements, _ in entries:
+            statements.append((SUBMISSION_KEY_INSERT, [key, form_name, applied_at]))
+            first_indexes.append(len(statements))
+            statements.extend((sql, params) for sql, params in entry_statements)
+        # Interactive transaction: Hrana reports rows affected, which the
+        # guarded membership INSERT needs, and reuses stored statement text
+        with self.db.transaction() as stream:
+            results = stream.execute_many(statements, store=True)
+        return [results[index] for index in first_indexes]
+
+    def _record(self, entry: Tuple, result) -> str:
+        seq, key, form_name, _, created_at = entry
+        if result.rows_affected == 0:
+            # A guarded INSERT found a duplicate that reached Turso first
+            self._finish(seq, 'rejected', error="duplicate")
+            logger.error("❌ Journaled %s submission %s rejected as a duplicate", form_name, key)
+            return 'rejected'
+        self._finish(seq, 'applied', result_id=result.last_insert_rowid)
+        return 'applied'
+
+    def flush(self) -> int:
+        """Drain due entries once; returns the number that reached a final state"""
+        finished = 0
+        with self._flush_lock:
+            while True:
+                entries = self._due_entries()
+                if not entries:
+                    break
+                deferred: Optional[Exception] = None
+                try:
+                    outcomes = [self._record(entry, result) for entry, result in zip(entries, self._send(entries))]
+                except HranaError as batch_error:
+                    if not _is_statement_error(batch_error):
+                        self._defer(entries, batch_error)
+                        return finished
+                    # Isolate the offending submission; the others still go through
+                    outcomes = []
+                    for index, entry in enumerate(entries):
+                        try:
+                            outcomes.append(self._record(entry, self._send([entry])[0]))
+                        except HranaError as e:
+                            if not _is_statement_error(e):
+                                deferred = e
+                            elif _is_key_conflict(e.message):
+                                # Applied by an earlier flush whose response was lost
+                                self._finish(entry[0], 'applied')
+                                outcomes.append('applied')
+                            else:
+                                self._finish(entry[0], 'failed', error=e.message)
+                                logger.error("❌ Journaled %s submission %s failed: %s", entry[2], entry[1], e.message)
+                                outcomes.append('failed')
+                        except Exception as e:
+                            deferred = e
+                        if deferred:
+                            self._defer(entries[index:], deferred)
+                            break
+                    logger.debug("Batch flush split after: %s", batch_error)
+                except Exception as e:
+                    self._defer(entries, e)
+                    return finished
+
+                now = time.time()
+                done = entries[:len(outcomes)]
+                with self._lock:
+                    self._stats['flushes'] += 1
+                    for outcome in outcomes:
+                        self._stats['flushed' if outcome == 'applied' else outcome] += 1
+                    if done:
+                        self._stats['last_flush_lag_ms'] = round(max((now - entry[4]) * 1000 for entry in done), 2)
+                    # Applied entries live on in Turso; keep them only as long as status() should see them
+                    self._conn.execute("DELETE FROM journal WHERE status = 'applied' AND finished_at < ?",
+                                       [now - self.retention])
+                finished += len(done)
+                if deferred:
+                    return finished
+                self._consecutive_failures = 0
+                logger.debug("📤 Flushed %s journaled submissions", len(entries))
+        return finished
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("❌ Journal flusher error: %s", e)
+            self._wake.wait(self.flush_interval)
+
+    def start(self):
+        """Start the background flusher (pending entries from a previous run are sent first)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="turso-journal-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self, drain_timeout: float = 5.0):
+        """Stop the flusher after one last attempt to drain what is due"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=drain_timeout)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning("⚠️ Journal drain on shutdown failed: %s", e)
+
+    # Observability
+
+    def problems(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent rejected and failed submissions, newest first
+
+        These never reach Turso, so someone has to follow them up.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idempotency_key, form_name, status, dedupe_key, last_error, finished_at FROM journal "
+                "WHERE status IN ('rejected', 'failed') ORDER BY finished_at DESC LIMIT ?", [limit]
+            ).fetchall()
+        return [{'key': key, 'form_name': form_name, 'status': status, 'dedupe_key': dedupe_key,
+                 'error': error, 'finished_at': datetime.fromtimestamp(finished_at).isoformat()}
+                for key, form_name, status, dedupe_key, error, finished_at in rows]
+
+    def metrics(self) -> Dict[str, Any]:
+        """Journal depth, flush lag and outcome counters"""
+        now = time.time()
+        with self._lock:
+            depth, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(created_at) FROM journal WHERE status = 'pending'"
+            ).fetchone()
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM journal WHERE status IN ('rejected', 'failed') GROUP BY status"
+            ).fetchall())
+            snapshot: Dict[str, Any] = dict(self._stats)
+        snapshot['depth'] = depth
+        snapshot['oldest_pending_age_seconds'] = round(now - oldest, 3) if oldest is not None else None
+        snapshot['failed_entries'] = counts.get('failed', 0)
+        snapshot['rejected_entries'] = counts.get('rejected', 0)
+        snapshot['problems'] = self.problems(limit=10)
+        snapshot['path'] = self.path
+        return snapshot
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,298 @@
+"""
+Local Read Replica for Turso
+Opt-in SQLite file synced from the primary so hot reads never leave the process
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, List, Hashable
+
+try:
+    from src.turso_results import ResultSet
+    from src.query_cache import referenced_tables
+    from src.log_utils import get_logger
+except ImportError:
+    from turso_results import ResultSet
+    from query_cache import referenced_tables
+    from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Replica defaults, overridable from the [turso] secrets block
+DEFAULT_REPLICA_SYNC_INTERVAL = 30.0  # seconds between background syncs
+DEFAULT_REPLICA_MAX_STALENESS = 300.0  # never serve reads from a snapshot older than this
+
+# Objects copied into the replica; triggers are left out so the copy cannot fire them
+REPLICATED_OBJECT_TYPES = ("table", "index", "view")
+
+# Credentials never reach the replica file: these tables are not copied (reads of
+# them go to the primary) and these columns are copied as empty strings
+EXCLUDED_TABLES = ("session_tokens",)
+REDACTED_COLUMNS = {
+    'users': ("password_hash", "verification_token", "reset_token", "reset_token_expires"),
+}
+
+
+def current_session_key() -> Hashable:
+    """Identify the reader/writer for read-your-writes: the Streamlit session, else the thread"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        try:
+            ctx = get_script_run_ctx(suppress_warning=True)
+        except TypeError:
+            # Streamlit releases before suppress_warning
+            ctx = get_script_run_ctx()
+        if ctx is not None:
+            return ctx.session_id
+    except Exception:
+        pass
+    return threading.get_ident()
+
+
+class LocalReplica:
+    """Snapshot of the primary in a local SQLite file, refreshed in the background
+
+    Each sync copies the schema and the tables from the primary in one
+    consistent transactional batch, writes them to a temporary file only the
+    owner can read and atomically swaps it in, so readers never see a
+    half-written replica. Session tokens and password hashes are left out.
+    Syncs run on the interval only: a session that wrote reads from the
+    primary until the next sync includes its write (read-your-writes).
+
+    A full copy reads every row of every table, so its cost grows with the
+    database. Each sync therefore first fetches the schema and a row count
+    and MAX(rowid) per table in one small request, and keeps the current
+    file when none of them moved and this process has not written since the
+    last copy. An UPDATE by another process changes neither marker, so a
+    full copy still runs at least once every max_staleness seconds.
+    """
+
+    def __init__(self, db, path: str, sync_interval: float = DEFAULT_REPLICA_SYNC_INTERVAL,
+                 max_staleness: float = DEFAULT_REPLICA_MAX_STALENESS):
+        self.db = db
+        self.path = path
+        self.sync_interval = float(sync_interval)
+        self.max_staleness = float(max_staleness)
+
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._local = threading.local()
+        self._generation = 0
+        self._synced_from: Optional[float] = None  # monotonic start time of the last good sync
+        self._last_writes: Dict[Hashable, float] = {}
+        # Schema and per-table (count, MAX(rowid)) markers of the last full copy
+        self._copied_from: Optional[float] = None
+        self._copied_schema: Optional[List[List[Any]]] = None
+        self._copied_markers: Dict[str, List[Any]] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._stats = {
+            'syncs': 0,
+            'syncs_skipped': 0,
+            'sync_errors': 0,
+            'last_sync_duration_ms': 0.0,
+            'last_sync_rows': 0,
+            'reads_local': 0,
+            'reads_primary': 0,
+        }
+
+    # Sync
+
+    @staticmethod
+    def _schema_sql() -> str:
+        object_types = ", ".join(f"'{object_type}'" for object_type in REPLICATED_OBJECT_TYPES)
+        return (f"SELECT type, name, tbl_name, sql FROM sqlite_master "
+                f"WHERE type IN ({object_types}) AND sql IS NOT NULL AND name NOT LIKE 'sqlite_%' "
+                f"ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END")
+
+    @staticmethod
+    def _marker_sql(name: str) -> str:
+        return f'SELECT COUNT(*), MAX(rowid) FROM "{name}"'
+
+    def _unchanged(self, started: float) -> bool:
+        """True if the last full copy still matches the primary's schema and table markers"""
+        if self._copied_schema is None or started - self._copied_from >= self.max_staleness:
+            return False
+        with self._lock:
+            if any(at >= self._copied_from for at in self._last_writes.values()):
+                return False
+        tables = list(self._copied_markers)
+        results = self.db.execute_batch(
+            [self._schema_sql()] + [self._marker_sql(name) for name in tables], transaction=True
+        )
+        schema = [list(row) for row in results[0] if row['tbl_name'] not in EXCLUDED_TABLES]
+        return schema == self._copied_schema and all(
+            list(result.first()) == self._copied_markers[name] for name, result in zip(tables, results[1:])
+        )
+
+    def sync(self) -> bool:
+        """Copy the primary into the replica file; returns False if the sync failed"""
+        with self._sync_lock:
+            started = time.monotonic()
+            tmp_path = f"{self.path}.tmp"
+            try:
+                if self._unchanged(started):
+                    with self._lock:
+                        self._synced_from = started
+                        self._stats['syncs_skipped'] += 1
+                        self._last_writes = {key: at for key, at in self._last_writes.items() if at >= started}
+                    logger.debug("🔄 Replica unchanged on the primary, keeping the current copy")
+                    return True
+
+                schema = self.db.execute_sql(self._schema_sql())
+                schema = [row for row in schema if row['tbl_name'] not in EXCLUDED_TABLES]
+                tables = [row['name'] for row in schema if row['type'] == 'table']
+                # One transaction, so every table and its marker come from the same snapshot
+                results = self.db.execute_batch(
+                    [f'SELECT * FROM "{name}"' for name in tables] + [self._marker_sql(name) for name in tables],
+                    transaction=True
+                ) if tables else []
+                table_results, marker_results = results[:len(tables)], results[len(tables):]
+
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                copied_rows = 0
+                # Owner-only from the start; the file still holds member contact details
+                os.close(os.open(tmp_path, os.O_CREAT | os.O_WRONLY, 0o600))
+                conn = sqlite3.connect(tmp_path)
+                try:
+                    for row in schema:
+                        if row['type'] == 'table':
+                            conn.execute(row['sql'])
+                    for name, result in zip(tables, table_results):
+                        if len(result) == 0:
+                            continue
+                        placeholders = ", ".join("?" for _ in result.columns)
+                        redacted = [index for index, column in enumerate(result.columns)
+                                    if column in REDACTED_COLUMNS.get(name, ())]
+                        rows = [list(row) for row in result]
+                        for values in rows:
+                            for index in redacted:
+                                values[index] = ''
+                        conn.executemany(f'INSERT INTO "{name}" VALUES ({placeholders})', rows)
+                        copied_rows += len(result)
+                    for row in schema:
+                        if row['type'] != 'table':
+                            conn.execute(row['sql'])
+                    conn.commit()
+                finally:
+                    conn.close()
+                os.replace(tmp_path, self.path)
+                self._copied_from = started
+                self._copied_schema = [list(row) for row in schema]
+                self._copied_markers = {name: list(result.first()) for name, result in zip(tables, marker_results)}
+
+                duration_ms = (time.monotonic() - started) * 1000
+                with self._lock:
+                    self._generation += 1
+                    self._synced_from = started
+                    self._stats['syncs'] += 1
+                    self._stats['last_sync_duration_ms'] = round(duration_ms, 2)
+                    self._stats['last_sync_rows'] = copied_rows
+                    # Writes older than this sync are now visible locally
+                    self._last_writes = {key: at for key, at in self._last_writes.items() if at >= started}
+                logger.debug("🔄 Replica synced: %s tables, %s rows in %.0fms", len(tables), copied_rows, duration_ms)
+                return True
+
+            except Exception as e:
+                with self._lock:
+                    self._stats['sync_errors'] += 1
+                logger.warning("⚠️ Replica sync failed: %s", e)
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Clear first so a write noted during the sync triggers another one
+            self._wake.clear()
+            self.sync()
+            self._wake.wait(self.sync_interval)
+
+    def start(self):
+        """Start the background sync thread (first sync runs immediately)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="turso-replica-sync", daemon=True)
+            self._thread.start()
+
+    def request_sync(self):
+        """Ask the background thread to sync now instead of waiting out the interval"""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    # Reads and writes
+
+    def note_write(self, session_key: Optional[Hashable] = None):
+        """Record that a session wrote to the primary; its reads bypass the replica until the next sync"""
+        key = current_session_key() if session_key is None else session_key
+        with self._lock:
+            self._last_writes[key] = time.monotonic()
+
+    @staticmethod
+    def covers(sql: str) -> bool:
+        """False for queries that read a table the replica does not hold"""
+        return not referenced_tables(sql) & set(EXCLUDED_TABLES)
+
+    def can_serve(self, session_key: Optional[Hashable] = None) -> bool:
+        """True if the replica is synced, fresh enough and includes this session's writes"""
+        key = current_session_key() if session_key is None else session_key
+        with self._lock:
+            if self._synced_from is None:
+                return False
+            if time.monotonic() - self._synced_from > self.max_staleness:
+                return False
+            last_write = self._last_writes.get(key)
+            return last_write is None or last_write < self._synced_from
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread read-only connection, reopened after each sync swaps the file"""
+        generation = self._generation
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.generation != generation:
+            if conn is not None:
+                conn.close()
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.conn = conn
+            self._local.generation = generation
+        return conn
+
+    def query(self, sql: str, params: List = None) -> ResultSet:
+        """Run a read against the local file"""
+        cursor = self._connection().execute(sql, params or [])
+        columns = [description[0] for description in cursor.description or []]
+        rows = [list(row) for row in cursor.fetchall()]
+        with self._lock:
+            self._stats['reads_local'] += 1
+        return ResultSet(columns=columns, raw_rows=rows)
+
+    def note_primary_read(self):
+        with self._lock:
+            self._stats['reads_primary'] += 1
+
+    # Observability
+
+    def staleness(self) -> Optional[float]:
+        """Seconds of primary history the replica may be missing, or None before the first sync"""
+        with self._lock:
+            if self._synced_from is None:
+                return None
+            return time.monotonic() - self._synced_from
+
+    def metrics(self) -> Dict[str, Any]:
+        """Sync counters, staleness and local/primary read split"""
+        staleness = self.staleness()
+        with self._lock:
+            snapshot: Dict[str, Any] = dict(self._stats)
+            snapshot['generation'] = self._generation
+            snapshot['pending_writers'] = len(self._last_writes)
+        snapshot['staleness_seconds'] = round(staleness, 3) if staleness is not None else None
+        snapshot['path'] = self.path
+        return snapshot
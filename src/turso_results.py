@@ -0,0 +1,144 @@
+"""
+Typed Results for Turso Queries
+One decoded ResultSet per statement, whatever wire format the server answered in
+"""
+
+from typing import Optional, Dict, Any, List, Callable, Iterator
+
+
+class Row:
+    """One result row; index by position or column name, unpack like a tuple"""
+
+    __slots__ = ('_values', '_index')
+
+    def __init__(self, values: List[Any], index: Dict[str, int]):
+        self._values = values
+        self._index = index  # shared by every row of the same ResultSet
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._values[self._index[key]]
+        return self._values[key]
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._values[self._index[name]]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._values)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Row):
+            return self._values == other._values
+        if isinstance(other, (list, tuple)):
+            return list(self._values) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Row({', '.join(f'{name}={self._values[i]!r}' for name, i in self._index.items())})"
+
+    def get(self, name: str, default: Any = None) -> Any:
+        position = self._index.get(name)
+        return default if position is None else self._values[position]
+
+    def keys(self) -> List[str]:
+        return list(self._index)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: self._values[i] for name, i in self._index.items()}
+
+
+class ResultSet:
+    """Decoded result of one statement
+
+    Raw rows are kept as they arrived and wrapped in Row objects only when
+    read, so iterating a large SELECT never builds the whole table in memory
+    twice. Typed cells (Hrana) are decoded per row on the same lazy path.
+    """
+
+    __slots__ = ('columns', '_index', '_raw_rows', '_decode', '_rows',
+                 'rows_affected', 'last_insert_rowid', 'error')
+
+    def __init__(self, columns: List[str] = None, raw_rows: List[Any] = None,
+                 rows_affected: int = 0, last_insert_rowid: Optional[int] = None,
+                 error: Optional[str] = None,
+                 decode: Optional[Callable[[Any], List[Any]]] = None):
+        self.columns = list(columns or [])
+        self._index = {name: i for i, name in enumerate(self.columns)}
+        self._raw_rows = raw_rows or []
+        self._decode = decode
+        self._rows: Optional[List[Row]] = None
+        self.rows_affected = rows_affected or 0
+        self.last_insert_rowid = last_insert_rowid
+        self.error = error
+
+    @classmethod
+    def from_response(cls, raw: Any) -> 'ResultSet':
+        """Decode one entry of a libSQL `statements` response
+
+        Accepts the nested legacy shape {"results": {"columns", "rows"}},
+        a flat {"columns", "rows"} entry and an {"error": ...} entry.
+        """
+        if not isinstance(raw, dict):
+            return cls(error=f"Unexpected result type: {type(raw).__name__}")
+
+        if raw.get('error'):
+            error = raw['error']
+            return cls(error=error.get('message', str(error)) if isinstance(error, dict) else str(error))
+
+        body = raw['results'] if isinstance(raw.get('results'), dict) else raw
+        last_insert_rowid = body.get('last_insert_rowid', raw.get('last_insert_rowid'))
+        rows_affected = body.get('affected_row_count', body.get('rows_affected', body.get('rows_written', 0)))
+        return cls(
+            columns=body.get('columns', []),
+            raw_rows=body.get('rows', []),
+            rows_affected=rows_affected,
+            last_insert_rowid=int(last_insert_rowid) if last_insert_rowid is not None else None
+        )
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def _make_row(self, raw_row: Any) -> Row:
+        return Row(self._decode(raw_row) if self._decode else raw_row, self._index)
+
+    @property
+    def rows(self) -> List[Row]:
+        """All rows, materialized once and cached"""
+        if self._rows is None:
+            self._rows = [self._make_row(raw_row) for raw_row in self._raw_rows]
+        return self._rows
+
+    def __iter__(self) -> Iterator[Row]:
+        if self._rows is not None:
+            return iter(self._rows)
+        # Stream rows without caching them; used by exports over large tables
+        return (self._make_row(raw_row) for raw_row in self._raw_rows)
+
+    def __len__(self) -> int:
+        return len(self._raw_rows)
+
+    def first(self) -> Optional[Row]:
+        """First row or None"""
+        if not self._raw_rows:
+            return None
+        return self.rows[0] if self._rows is not None else self._make_row(self._raw_rows[0])
+
+    def scalar(self, default: Any = None) -> Any:
+        """First column of the first row, e.g. for COUNT(*)"""
+        row = self.first()
+        return row[0] if row is not None and len(row) > 0 else default
+
+    def __repr__(self) -> str:
+        if self.error:
+            return f"ResultSet(error={self.error!r})"
+        return (f"ResultSet(columns={self.columns!r}, rows={len(self)}, "
+                f"rows_affected={self.rows_affected}, last_insert_rowid={self.last_insert_rowid})")
@@ -0,0 +1,361 @@
+"""
+Retry Policy for Turso
+Exponential backoff with jitter, idempotency-aware retry rules and a circuit breaker
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import Optional, Dict, Any, List, Mapping, Callable, Awaitable
+
+import requests
+from urllib3.exceptions import NewConnectionError, ConnectTimeoutError
+
+try:
+    from src.log_utils import get_logger
+except ImportError:
+    from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Retry and breaker defaults, overridable from the [turso] secrets block
+DEFAULT_RETRY_MAX_ATTEMPTS = 3        # total attempts per request, including the first
+DEFAULT_RETRY_BASE_DELAY = 0.2        # seconds; doubled per attempt before jitter
+DEFAULT_RETRY_MAX_DELAY = 2.0         # upper bound on a single backoff sleep
+DEFAULT_BREAKER_FAILURE_THRESHOLD = 5  # consecutive failures before the breaker opens
+DEFAULT_BREAKER_RESET_TIMEOUT = 30.0  # seconds the breaker stays open before a trial request
+
+# How a failed attempt ended, which decides whether a replay is safe
+NOT_SENT = "not_sent"      # the request never reached the server (refused, connect timeout)
+REJECTED = "rejected"      # the server refused it without executing (429, 503)
+MAYBE_SENT = "maybe_sent"  # the server may have executed it (read timeout, 500/502/504)
+
+REJECTED_STATUSES = {429, 503}
+MAYBE_SENT_STATUSES = {500, 502, 504}
+
+_READ_ONLY_KEYWORDS = {"SELECT", "EXPLAIN", "VALUES"}
+_TRANSACTION_KEYWORDS = {"BEGIN", "COMMIT", "ROLLBACK", "END"}
+_WRITE_KEYWORDS = re.compile(r"\b(INSERT|UPDATE|DELETE|REPLACE|UPSERT)\b", re.IGNORECASE)
+_IF_EXISTS = re.compile(r"\bIF\s+(NOT\s+)?EXISTS\b", re.IGNORECASE)
+
+try:
+    import httpx
+    _HTTPX_NOT_SENT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    _HTTPX_MAYBE_SENT = (httpx.ReadTimeout, httpx.WriteTimeout, httpx.RemoteProtocolError, httpx.ReadError,
+                         httpx.WriteError)
+except ImportError:
+    _HTTPX_NOT_SENT = ()
+    _HTTPX_MAYBE_SENT = ()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit breaker is open"""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Turso circuit breaker is open; retrying in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+def _leading_keyword(sql: str) -> str:
+    stripped = sql.lstrip().lstrip('(')
+    return stripped.split(None, 1)[0].upper() if stripped else ""
+
+
+def is_read_only_sql(sql: str) -> bool:
+    """True if the statement only reads (SELECT, EXPLAIN, read-only WITH, PRAGMA queries)"""
+    keyword = _leading_keyword(sql)
+    if keyword in _READ_ONLY_KEYWORDS:
+        return True
+    if keyword == "WITH":
+        return not _WRITE_KEYWORDS.search(sql)
+    if keyword == "PRAGMA":
+        # PRAGMA x = y changes settings; PRAGMA x / PRAGMA x(arg) only reads
+        return "=" not in sql
+    return False
+
+
+def is_idempotent_sql(sql: str) -> bool:
+    """True if replaying the statement cannot change the outcome
+
+    Reads, transaction control and IF [NOT] EXISTS DDL qualify; INSERT,
+    UPDATE and DELETE never do.
+    """
+    if is_read_only_sql(sql):
+        return True
+    keyword = _leading_keyword(sql)
+    if keyword in _TRANSACTION_KEYWORDS or keyword == "PRAGMA":
+        return True
+    if keyword in ("CREATE", "DROP"):
+        return bool(_IF_EXISTS.search(sql))
+    return False
+
+
+def statements_idempotent(statements: List[Dict[str, Any]]) -> bool:
+    """True if every statement of a libSQL `statements` payload is idempotent"""
+    return all(is_idempotent_sql(statement.get("q", "")) for statement in statements)
+
+
+def statements_read_only(statements: List[Dict[str, Any]]) -> bool:
+    """True if a `statements` payload writes nothing (BEGIN/COMMIT around reads is fine)"""
+    return all(is_read_only_sql(statement.get("q", "")) or
+               _leading_keyword(statement.get("q", "")) in _TRANSACTION_KEYWORDS
+               for statement in statements)
+
+
+def classify_exception(error: Exception) -> Optional[str]:
+    """Map a transport exception to NOT_SENT / MAYBE_SENT, or None if it is not transient"""
+    if isinstance(error, requests.exceptions.ConnectTimeout) or isinstance(error, _HTTPX_NOT_SENT):
+        return NOT_SENT
+    if isinstance(error, requests.exceptions.ConnectionError):
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        if isinstance(reason, (NewConnectionError, ConnectTimeoutError)):
+            return NOT_SENT
+        return MAYBE_SENT
+    if isinstance(error, requests.exceptions.Timeout) or isinstance(error, _HTTPX_MAYBE_SENT):
+        return MAYBE_SENT
+    return None
+
+
+def classify_status(status_code: int) -> Optional[str]:
+    """Map an HTTP status to REJECTED / MAYBE_SENT, or None if it should not be retried"""
+    if status_code in REJECTED_STATUSES:
+        return REJECTED
+    if status_code in MAYBE_SENT_STATUSES:
+        return MAYBE_SENT
+    return None
+
+
+class TransportMetrics:
+    """Thread-safe retry and breaker counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            'requests': 0,
+            'attempts': 0,
+            'retries': 0,
+            'failures': 0,
+            'short_circuits': 0,
+            'breaker_opens': 0,
+        }
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+
+class CircuitBreaker:
+    """Fail fast after repeated transport failures instead of waiting out every timeout
+
+    closed: requests flow; consecutive failures are counted.
+    open: requests raise CircuitOpenError until reset_timeout has passed.
+    half_open: one trial request is let through; success closes the
+    breaker, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = DEFAULT_BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_BREAKER_RESET_TIMEOUT,
+                 metrics: Optional[TransportMetrics] = None):
+        self.failure_threshold = int(failure_threshold)
+        self.reset_timeout = float(reset_timeout)
+        self.metrics = metrics or TransportMetrics()
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    @property
+    def consecutive_failures(self) -> int:
+        with self._lock:
+            return self._failures
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker admits its trial request"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent now"""
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("✅ Turso circuit breaker closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a half-open trial that failed for a reason unrelated to the server"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or (
+                    self._state == self.CLOSED and 0 < self.failure_threshold <= self._failures):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self.metrics.incr('breaker_opens')
+                logger.warning("⚠️ Turso circuit breaker opened after %s consecutive failures", self._failures)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter around one HTTP request
+
+    A failed attempt is replayed when the request never reached the server
+    (connection refused, connect timeout, 429/503), or when it may have
+    reached the server but the request is idempotent. Writes that may
+    already have been applied are surfaced to the caller, never replayed.
+    """
+
+    def __init__(self, max_attempts: int = DEFAULT_RETRY_MAX_ATTEMPTS,
+                 base_delay: float = DEFAULT_RETRY_BASE_DELAY,
+                 max_delay: float = DEFAULT_RETRY_MAX_DELAY,
+                 breaker: Optional[CircuitBreaker] = None,
+                 metrics: Optional[TransportMetrics] = None):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.metrics = metrics or (breaker.metrics if breaker else TransportMetrics())
+        self.breaker = breaker or CircuitBreaker(metrics=self.metrics)
+
+    @classmethod
+    def from_config(cls, config: Optional[Mapping[str, Any]] = None) -> 'RetryPolicy':
+        """Build a policy from the retry_* and breaker_* keys of a [turso] secrets block"""
+        config = config or {}
+        metrics = TransportMetrics()
+        breaker = CircuitBreaker(
+            failure_threshold=config.get('breaker_failure_threshold', DEFAULT_BREAKER_FAILURE_THRESHOLD),
+            reset_timeout=config.get('breaker_reset_timeout', DEFAULT_BREAKER_RESET_TIMEOUT),
+            metrics=metrics
+        )
+        return cls(
+            max_attempts=config.get('retry_max_attempts', DEFAULT_RETRY_MAX_ATTEMPTS),
+            base_delay=config.get('retry_base_delay', DEFAULT_RETRY_BASE_DELAY),
+            max_delay=config.get('retry_max_delay', DEFAULT_RETRY_MAX_DELAY),
+            breaker=breaker,
+            metrics=metrics
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Sleep before retry number `attempt` (1-based): uniform in [0, base * 2^(attempt-1)]"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def _should_retry(self, kind: str, idempotent: bool, attempt: int) -> bool:
+        if attempt >= self.max_attempts:
+            return False
+        if kind == MAYBE_SENT and not idempotent:
+            return False
+        return self.breaker.allow()
+
+    def _before_send(self):
+        self.metrics.incr('requests')
+        if not self.breaker.allow():
+            self.metrics.incr('short_circuits')
+            raise CircuitOpenError(self.breaker.retry_in())
+
+    def _outcome(self, response: Any = None, error: Optional[Exception] = None) -> Optional[str]:
+        """Record one attempt with the breaker; return its retry class or None when done"""
+        kind = classify_exception(error) if error is not None else classify_status(response.status_code)
+        if kind is None:
+            if error is None:
+                self.breaker.record_success()
+            else:
+                self.breaker.release()
+            return None
+        self.breaker.record_failure()
+        return kind
+
+    def call(self, send: Callable[[], Any], idempotent: bool = False) -> Any:
+        """Run send() with retries; returns the last response or raises the last error"""
+        self._before_send()
+        attempt = 0
+        while True:
+            attempt += 1
+            self.metrics.incr('attempts')
+            try:
+                response, error = send(), None
+            except Exception as e:
+                response, error = None, e
+
+            kind = self._outcome(response, error)
+            if kind is None or not self._should_retry(kind, idempotent, attempt):
+                if kind is not None:
+                    self.metrics.incr('failures')
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self.backoff(attempt)
+            self.metrics.incr('retries')
+            logger.warning("⚠️ Turso request failed (%s), retry %s/%s in %.2fs",
+                           error or response.status_code, attempt, self.max_attempts - 1, delay)
+            time.sleep(delay)
+
+    async def acall(self, send: Callable[[], Awaitable[Any]], idempotent: bool = False) -> Any:
+        """Async variant of call(); backoff sleeps do not block the event loop"""
+        self._before_send()
+        attempt = 0
+        while True:
+            attempt += 1
+            self.metrics.incr('attempts')
+            try:
+                response, error = await send(), None
+            except Exception as e:
+                response, error = None, e
+
+            kind = self._outcome(response, error)
+            if kind is None or not self._should_retry(kind, idempotent, attempt):
+                if kind is not None:
+                    self.metrics.incr('failures')
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self.backoff(attempt)
+            self.metrics.incr('retries')
+            logger.warning("⚠️ Turso request failed (%s), retry %s/%s in %.2fs",
+                           error or response.status_code, attempt, self.max_attempts - 1, delay)
+            await asyncio.sleep(delay)
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Counters plus current breaker state, for dashboards and health checks"""
+        snapshot: Dict[str, Any] = self.metrics.snapshot()
+        snapshot['breaker_state'] = self.breaker.state
+        snapshot['consecutive_failures'] = self.breaker.consecutive_failures
+        return snapshot
@@ -0,0 +1,179 @@
+"""
+Read Routing Across Turso Replicas
+Reads go to the lowest-latency healthy endpoint found by background probing; writes stay on the primary
+"""
+
+import threading
+import time
+from typing import Optional, Dict, Any, List, Hashable
+
+try:
+    from src.turso_transport import TursoTransport
+    from src.turso_replica import current_session_key
+    from src.log_utils import get_logger
+except ImportError:
+    from turso_transport import TursoTransport
+    from turso_replica import current_session_key
+    from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Routing defaults, overridable from the [turso] secrets block
+DEFAULT_PROBE_INTERVAL = 15.0  # seconds between latency probes of every endpoint
+DEFAULT_PROBE_TIMEOUT = 2.0  # a probe slower than this counts as a failure
+DEFAULT_READ_YOUR_WRITES_WINDOW = 10.0  # seconds a session reads from the primary after writing
+DEFAULT_UNHEALTHY_AFTER = 2  # consecutive failed probes or reads before an endpoint is skipped
+LATENCY_SMOOTHING = 0.3  # weight of the newest probe in the moving average
+
+PROBE_PAYLOAD = {"statements": ["SELECT 1"]}
+
+
+def to_http_url(url: str) -> str:
+    """libsql:// URLs are served over HTTPS"""
+    return url.replace("libsql://", "https://", 1) if url.startswith("libsql://") else url
+
+
+class _Endpoint:
+    """Probe state of one URL"""
+
+    def __init__(self, url: str, transport: TursoTransport, primary: bool = False):
+        self.url = url
+        self.transport = transport
+        self.primary = primary
+        self.latency_ms: Optional[float] = None
+        self.failures = 0
+        self.reads = 0
+        self.read_errors = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.latency_ms is not None and self.failures < DEFAULT_UNHEALTHY_AFTER
+
+
+class ReadRouter:
+    """Chooses the endpoint for each read: the fastest healthy replica, or the primary
+
+    A background thread sends SELECT 1 to every endpoint and keeps a moving
+    average of the round trip. Reads go to the endpoint with the lowest
+    average; the primary competes too, so a replica is only used when it is
+    actually closer. A session that wrote reads from the primary for
+    read_your_writes_window seconds, long enough for replicas to catch up.
+    Each replica has its own transport, so a failing replica cannot trip
+    the primary's circuit breaker.
+    """
+
+    def __init__(self, primary_url: str, primary_transport: TursoTransport, replica_urls: List[str],
+                 headers: Dict[str, str], config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.probe_interval = float(config.get('replica_probe_interval', DEFAULT_PROBE_INTERVAL))
+        self.probe_timeout = float(config.get('replica_probe_timeout', DEFAULT_PROBE_TIMEOUT))
+        self.read_your_writes_window = float(config.get('read_your_writes_window', DEFAULT_READ_YOUR_WRITES_WINDOW))
+
+        self.primary = _Endpoint(primary_url, primary_transport, primary=True)
+        self.endpoints = [self.primary] + [
+            _Endpoint(to_http_url(url).rstrip('/'), TursoTransport.from_config(headers, config))
+            for url in replica_urls
+        ]
+
+        self._lock = threading.Lock()
+        self._last_writes: Dict[Hashable, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'probes': 0, 'probe_failures': 0, 'reads_primary': 0, 'reads_replica': 0, 'fallbacks': 0}
+
+    # Probing
+
+    def probe(self):
+        """Measure every endpoint once"""
+        for endpoint in self.endpoints:
+            started = time.perf_counter()
+            try:
+                response = endpoint.transport.post(endpoint.url, PROBE_PAYLOAD, timeout=self.probe_timeout,
+                                                   idempotent=True)
+                if response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with self._lock:
+                    self._stats['probes'] += 1
+                    endpoint.failures = 0
+                    endpoint.last_error = None
+                    endpoint.latency_ms = elapsed_ms if endpoint.latency_ms is None else round(
+                        LATENCY_SMOOTHING * elapsed_ms + (1 - LATENCY_SMOOTHING) * endpoint.latency_ms, 3)
+            except Exception as e:
+                with self._lock:
+                    self._stats['probes'] += 1
+                    self._stats['probe_failures'] += 1
+                    endpoint.failures += 1
+                    endpoint.last_error = str(e)
+                logger.debug("Probe of %s failed: %s", endpoint.url, e)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.probe_interval)
+
+    def start(self):
+        """Start probing in the background; reads use the primary until the first round is in"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="turso-read-router", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        for endpoint in self.endpoints[1:]:
+            endpoint.transport.close()
+
+    # Routing
+
+    def note_write(self, session_key: Optional[Hashable] = None):
+        """Send this session's reads to the primary for the read-your-writes window"""
+        key = current_session_key() if session_key is None else session_key
+        now = time.monotonic()
+        with self._lock:
+            self._last_writes[key] = now
+            # Forget sessions whose window has passed
+            if len(self._last_writes) > 1000:
+                self._last_writes = {k: at for k, at in self._last_writes.items()
+                                     if now - at < self.read_your_writes_window}
+
+    def choose(self, session_key: Optional[Hashable] = None) -> _Endpoint:
+        """Endpoint for the next read"""
+        key = current_session_key() if session_key is None else session_key
+        with self._lock:
+            last_write = self._last_writes.get(key)
+            if last_write is not None and time.monotonic() - last_write < self.read_your_writes_window:
+                self._stats['reads_primary'] += 1
+                return self.primary
+            candidates = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+            best = min(candidates, key=lambda endpoint: endpoint.latency_ms, default=self.primary)
+            self._stats['reads_primary' if best.primary else 'reads_replica'] += 1
+            best.reads += 1
+            return best
+
+    def mark_failed(self, endpoint: _Endpoint, error: Exception):
+        """A read on this replica failed; count it like a failed probe"""
+        with self._lock:
+            endpoint.failures += 1
+            endpoint.read_errors += 1
+            endpoint.last_error = str(error)
+            self._stats['fallbacks'] += 1
+        logger.warning("⚠️ Read on replica %s failed, using the primary: %s", endpoint.url, error)
+
+    # Observability
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-endpoint latency and health, plus the primary/replica read split"""
+        with self._lock:
+            snapshot: Dict[str, Any] = dict(self._stats)
+            snapshot['endpoints'] = [{
+                'url': endpoint.url,
+                'primary': endpoint.primary,
+                'latency_ms': round(endpoint.latency_ms, 2) if endpoint.latency_ms is not None else None,
+                'healthy': endpoint.healthy,
+                'reads': endpoint.reads,
+                'read_errors': endpoint.read_errors,
+                'last_error': endpoint.last_error,
+            } for endpoint in self.endpoints]
+        return snapshot
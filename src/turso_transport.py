@@ -0,0 +1,226 @@
+"""
+HTTP Transport for Turso
+Pooled keep-alive connections shared by every caller of one TursoDatabase
+"""
+
+import contextlib
+import gzip
+import json
+import threading
+import time
+from typing import Optional, Dict, Any, Mapping, Tuple, Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+try:
+    from src.log_utils import get_logger
+    from src.turso_retry import RetryPolicy
+    from src.metrics import REGISTRY
+except ImportError:
+    from log_utils import get_logger
+    from turso_retry import RetryPolicy
+    from metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+# Connection pool defaults, overridable from the [turso] secrets block
+DEFAULT_POOL_CONNECTIONS = 4      # number of distinct hosts kept pooled
+DEFAULT_POOL_MAXSIZE = 10         # keep-alive connections kept per host
+DEFAULT_POOL_BLOCK = False        # wait for a free connection instead of opening an extra one
+DEFAULT_POOL_IDLE_TIMEOUT = 60.0  # seconds before idle connections are dropped
+DEFAULT_CONNECT_TIMEOUT = 5.0     # seconds to establish a connection; an outage fails fast
+
+# Compression defaults; responses are always negotiated, request bodies only when enabled
+DEFAULT_REQUEST_COMPRESSION = False  # gzip request bodies; the server must accept Content-Encoding: gzip
+DEFAULT_COMPRESSION_MIN_BYTES = 1024  # smaller bodies go out as-is, gzip framing would eat the saving
+DEFAULT_COMPRESSION_LEVEL = 6
+
+ACCEPT_ENCODING = "gzip, deflate"
+
+
+class TursoTransport:
+    """Thread-safe pool of keep-alive HTTP connections to the Turso endpoint"""
+
+    def __init__(self, headers: Dict[str, str],
+                 pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 pool_block: bool = DEFAULT_POOL_BLOCK,
+                 idle_timeout: float = DEFAULT_POOL_IDLE_TIMEOUT,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 request_compression: bool = DEFAULT_REQUEST_COMPRESSION,
+                 compression_min_bytes: int = DEFAULT_COMPRESSION_MIN_BYTES,
+                 compression_level: int = DEFAULT_COMPRESSION_LEVEL):
+        self.headers = dict(headers)
+        self.pool_connections = int(pool_connections)
+        self.pool_maxsize = int(pool_maxsize)
+        self.pool_block = bool(pool_block)
+        self.idle_timeout = float(idle_timeout)
+        self.connect_timeout = float(connect_timeout)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.request_compression = str(request_compression).lower() not in ('0', 'false', 'no', 'off')
+        self.compression_min_bytes = int(compression_min_bytes)
+        self.compression_level = int(compression_level)
+
+        self._lock = threading.Lock()
+        self._compression = {
+            'requests_compressed': 0,
+            'request_bytes_raw': 0,
+            'request_bytes_wire': 0,
+            'responses_compressed': 0,
+            'response_bytes_raw': 0,
+            'response_bytes_wire': 0,
+        }
+        self._session: Optional[requests.Session] = None
+        self._last_used = 0.0
+        self._in_flight = 0  # requests currently running on self._session
+
+    @classmethod
+    def from_config(cls, headers: Dict[str, str], config: Optional[Mapping[str, Any]] = None) -> 'TursoTransport':
+        """Build a transport from the pool_*, retry_*, breaker_* and compression keys of a [turso] secrets block"""
+        config = config or {}
+        return cls(
+            headers,
+            pool_connections=config.get('pool_connections', DEFAULT_POOL_CONNECTIONS),
+            pool_maxsize=config.get('pool_maxsize', DEFAULT_POOL_MAXSIZE),
+            pool_block=config.get('pool_block', DEFAULT_POOL_BLOCK),
+            idle_timeout=config.get('pool_idle_timeout', DEFAULT_POOL_IDLE_TIMEOUT),
+            connect_timeout=config.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT),
+            retry_policy=RetryPolicy.from_config(config),
+            request_compression=config.get('request_compression', DEFAULT_REQUEST_COMPRESSION),
+            compression_min_bytes=config.get('compression_min_bytes', DEFAULT_COMPRESSION_MIN_BYTES),
+            compression_level=config.get('compression_level', DEFAULT_COMPRESSION_LEVEL),
+        )
+
+    def _new_session(self) -> requests.Session:
+        """Create a session whose adapter keeps connections alive between requests"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+            max_retries=0
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.headers)
+        session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        return session
+
+    @contextlib.contextmanager
+    def _session_in_use(self) -> Iterator[requests.Session]:
+        """The shared session, replaced first if its connections sat idle too long
+
+        The session counts as in flight until the block exits, and a session
+        with requests in flight is never evicted, so no request has its
+        connection pool closed underneath it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (self._session is not None and self._in_flight == 0 and self.idle_timeout > 0
+                    and now - self._last_used > self.idle_timeout):
+                # The server has most likely closed these sockets already; start fresh
+                # rather than paying for a failed write on a half-closed connection.
+                logger.debug("♻️ Evicting idle Turso connections")
+                self._session.close()
+                self._session = None
+            if self._session is None:
+                self._session = self._new_session()
+            self._in_flight += 1
+            self._last_used = now
+            session = self._session
+        try:
+            yield session
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._last_used = time.monotonic()
+
+    def _encode(self, payload: Any) -> Tuple[bytes, bytes, Dict[str, str]]:
+        """Serialize a payload; returns the JSON, the bytes to send and their headers"""
+        raw = json.dumps(payload).encode('utf-8')
+        headers = {"Content-Type": "application/json"}
+        if self.request_compression and len(raw) >= self.compression_min_bytes:
+            compressed = gzip.compress(raw, compresslevel=self.compression_level, mtime=0)
+            if len(compressed) < len(raw):
+                headers["Content-Encoding"] = "gzip"
+                return raw, compressed, headers
+        return raw, raw, headers
+
+    def _send(self, url: str, payload: Any, timeout: float, idempotent: bool,
+              stream: bool = False) -> Tuple[requests.Response, int]:
+        """POST under the retry policy; returns the response and the uncompressed request size"""
+        timeouts = (min(self.connect_timeout, timeout), timeout)
+        # Serialized once here rather than by requests, so the payload size is known
+        raw, body, headers = self._encode(payload)
+
+        def request() -> requests.Response:
+            nonlocal body, headers
+            with self._session_in_use() as session:
+                response = session.post(url, data=body, headers=headers, timeout=timeouts, stream=stream)
+                if response.status_code == 415 and body is not raw:
+                    # The server rejected the encoding without running anything, so resending is safe.
+                    # It happens inside the attempt: one logical request, and not a failure for the breaker.
+                    logger.warning("⚠️ Turso refused gzip request bodies; sending them uncompressed from now on")
+                    self.request_compression = False
+                    response.close()
+                    body, headers = raw, {"Content-Type": "application/json"}
+                    response = session.post(url, data=body, headers=headers, timeout=timeouts, stream=stream)
+                return response
+
+        response = self.retry_policy.call(request, idempotent=idempotent)
+        if body is not raw:
+            self._count_compression("request", len(raw), len(body))
+        return response, len(raw)
+
+    def _count_compression(self, direction: str, raw: int, wire: int):
+        with self._lock:
+            self._compression[f'{direction}s_compressed'] += 1
+            self._compression[f'{direction}_bytes_raw'] += raw
+            self._compression[f'{direction}_bytes_wire'] += wire
+        REGISTRY.record_compression("turso", "sent" if direction == "request" else "received", raw, wire)
+
+    def post(self, url: str, payload: Any, timeout: float = 30, idempotent: bool = False) -> requests.Response:
+        """POST a JSON payload over a pooled connection under the retry policy
+
+        Pass idempotent=True only when replaying the request cannot apply a
+        write twice; otherwise a request that may have reached the server is
+        never retried. gzip and deflate responses are decoded transparently.
+        """
+        response, sent = self._send(url, payload, timeout, idempotent)
+        received = len(response.content)
+        if response.headers.get("Content-Encoding", "").lower() in ("gzip", "deflate"):
+            # tell() counts the bytes read off the socket, before decoding
+            self._count_compression("response", received, response.raw.tell())
+        REGISTRY.record_payload("turso", sent, received)
+        return response
+
+    def post_stream(self, url: str, payload: Any, timeout: float = 30, idempotent: bool = False) -> requests.Response:
+        """POST like post(), but leave the body unread so it can be consumed incrementally
+
+        Retries cover getting the response headers only; the caller must
+        close the response (or read it to the end) to return the connection.
+        """
+        response, sent = self._send(url, payload, timeout, idempotent, stream=True)
+        # The received size is only known once the caller has read the body
+        REGISTRY.payload_bytes.observe(sent, "turso", "sent")
+        return response
+
+    def metrics(self) -> Dict[str, Any]:
+        """Retry counters, circuit breaker state and compression totals"""
+        snapshot = self.retry_policy.metrics_snapshot()
+        with self._lock:
+            compression: Dict[str, Any] = dict(self._compression)
+        for direction in ("request", "response"):
+            raw = compression[f'{direction}_bytes_raw']
+            compression[f'{direction}_ratio'] = round(compression[f'{direction}_bytes_wire'] / raw, 3) if raw else None
+        compression['request_compression'] = self.request_compression
+        snapshot['compression'] = compression
+        return snapshot
+
+    def close(self):
+        """Close all pooled connections"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
@@ -34,6 +34,8 @@ TRANSLATIONS = {
         
         # Navigation and UI
         'back_to_forms': 'Back to Forms',
+        'database_connecting': 'Connecting to the database...',
+        'database_unavailable': 'The database is temporarily unavailable. Please try again in a moment.',
         'select_form_message': 'Please select a form to fill out:',
         'apply_now': 'Apply Now',
         'submit_research': 'Submit Research',
@@ -225,6 +227,8 @@ TRANSLATIONS = {
         
         # Navigation and UI
         'back_to_forms': 'العودة للنماذج',
+        'database_connecting': 'جارٍ الاتصال بقاعدة البيانات...',
+        'database_unavailable': 'قاعدة البيانات غير متاحة مؤقتاً. يرجى المحاولة مرة أخرى بعد قليل.',
         'select_form_message': 'يرجى اختيار نموذج للتعبئة:',
         'apply_now': 'تقدم الآن',
         'submit_research': 'إرسال البحث',
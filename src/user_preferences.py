@@ -1,6 +1,11 @@
 import json
 import os
-from termcolor import colored
+try:
+    from src.log_utils import get_logger
+except ImportError:
+    from log_utils import get_logger
+
+logger = get_logger(__name__)
 from typing import Dict, Any
 
 # Configuration
@@ -30,14 +35,14 @@ class UserPreferences:
                     loaded_preferences = json.load(f)
                     # Merge with defaults to ensure all keys exist
                     self.preferences = {**self.default_preferences, **loaded_preferences}
-                    print(colored(f"✅ User preferences loaded successfully", "green"))
+                    logger.debug("✅ User preferences loaded successfully")
             else:
                 self.preferences = self.default_preferences.copy()
-                print(colored(f"ℹ️ Creating new preferences file with defaults", "yellow"))
+                logger.info("ℹ️ Creating new preferences file with defaults")
                 self.save_preferences()
         except Exception as e:
-            print(colored(f"❌ Error loading preferences: {e}", "red"))
-            print(colored(f"Using default preferences", "yellow"))
+            logger.error("❌ Error loading preferences: %s", e)
+            logger.debug("Using default preferences")
             self.preferences = self.default_preferences.copy()
         
         return self.preferences
@@ -47,10 +52,10 @@ class UserPreferences:
         try:
             with open(self.preferences_file, 'w', encoding='utf-8') as f:
                 json.dump(self.preferences, f, ensure_ascii=False, indent=2)
-            print(colored(f"✅ User preferences saved successfully", "green"))
+            logger.info("✅ User preferences saved successfully")
             return True
         except Exception as e:
-            print(colored(f"❌ Error saving preferences: {e}", "red"))
+            logger.error("❌ Error saving preferences: %s", e)
             return False
     
     def get_preference(self, key: str, default=None):
@@ -63,7 +68,7 @@ class UserPreferences:
             self.preferences[key] = value
             return self.save_preferences()
         except Exception as e:
-            print(colored(f"❌ Error setting preference {key}: {e}", "red"))
+            logger.error("❌ Error setting preference %s: %s", key, e)
             return False
     
     def get_language(self) -> str:
@@ -75,7 +80,7 @@ class UserPreferences:
         if language in ['en', 'ar']:
             return self.set_preference('language', language)
         else:
-            print(colored(f"❌ Invalid language: {language}. Use 'en' or 'ar'", "red"))
+            logger.error("❌ Invalid language: %s. Use 'en' or 'ar'", language)
             return False
     
     def get_theme(self) -> str:
@@ -100,7 +105,7 @@ class UserPreferences:
             self.preferences = self.default_preferences.copy()
             return self.save_preferences()
         except Exception as e:
-            print(colored(f"❌ Error resetting preferences: {e}", "red"))
+            logger.error("❌ Error resetting preferences: %s", e)
             return False
     
     def export_preferences(self, filepath: str) -> bool:
@@ -108,10 +113,10 @@ class UserPreferences:
         try:
             with open(filepath, 'w', encoding='utf-8') as f:
                 json.dump(self.preferences, f, ensure_ascii=False, indent=2)
-            print(colored(f"✅ Preferences exported to {filepath}", "green"))
+            logger.info("✅ Preferences exported to %s", filepath)
             return True
         except Exception as e:
-            print(colored(f"❌ Error exporting preferences: {e}", "red"))
+            logger.error("❌ Error exporting preferences: %s", e)
             return False
     
     def import_preferences(self, filepath: str) -> bool:
@@ -123,11 +128,11 @@ class UserPreferences:
                     # Validate and merge with defaults
                     self.preferences = {**self.default_preferences, **imported_preferences}
                     self.save_preferences()
-                    print(colored(f"✅ Preferences imported from {filepath}", "green"))
+                    logger.info("✅ Preferences imported from %s", filepath)
                     return True
             else:
-                print(colored(f"❌ File not found: {filepath}", "red"))
+                logger.error("❌ File not found: %s", filepath)
                 return False
         except Exception as e:
-            print(colored(f"❌ Error importing preferences: {e}", "red"))
+            logger.error("❌ Error importing preferences: %s", e)
             return False 
\ No newline at end of file
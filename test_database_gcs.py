@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests for the Cloud Storage database's local copy
+Run against an in-memory LocalBlob, so no credentials or network are needed
+"""
+
+import pytest
+
+from database import Database, StorageConflict
+from local_gcs import LocalBlob
+
+
+def test_local_copy_is_reused_until_the_generation_changes(tmp_path, monkeypatch):
+    """Reads open the cached file; only a new generation is downloaded, and only once"""
+    monkeypatch.chdir(tmp_path)  # Database keeps its writable copies in the working directory
+    blob = LocalBlob()
+    db = Database(blob=blob, cache_dir=str(tmp_path / "cache"))
+    other = Database(blob=blob, cache_dir=str(tmp_path / "other"))
+
+    assert other.create_user("cache@example.com", "secret", "Cache", "User")['success']
+    token = other.authenticate_user("cache@example.com", "secret")['token']
+
+    blob.reset_stats()
+    assert db.get_user_by_token(token)['email'] == "cache@example.com"
+    assert db.get_user_by_token(token)['email'] == "cache@example.com"
+    assert blob.stats()['downloads'] == 1
+    assert blob.stats()['round_trips'] == 3  # one download plus a metadata GET per connection
+
+    # A writer caches what it uploaded, so its next connection downloads nothing
+    blob.reset_stats()
+    assert db.authenticate_user("cache@example.com", "secret")['success']
+    assert db.get_user_by_token(token) is not None
+    assert blob.stats()['downloads'] == 0
+    assert db.cache_stats()['hits'] == 3
+    assert len(list((tmp_path / "cache").iterdir())) == 1  # older generations are removed
+
+
+def test_concurrent_commits_are_merged_instead_of_overwritten(tmp_path, monkeypatch):
+    """Two workers commit on the same generation; the loser re-applies its insert on the winner's upload"""
+    monkeypatch.chdir(tmp_path)
+    blob = LocalBlob()
+    first = Database(blob=blob, cache_dir=str(tmp_path / "first"))
+    second = Database(blob=blob, cache_dir=str(tmp_path / "second"))
+
+    conn_first, conn_second = first.get_connection(), second.get_connection()
+    conn_first.execute("INSERT INTO general_suggestions (email, full_name, suggestion_type, suggestion_title, "
+                       "suggestion_description) VALUES ('a@example.com', 'A', 'x', 'first', 'x')")
+    conn_second.execute("INSERT INTO general_suggestions (email, full_name, suggestion_type, suggestion_title, "
+                        "suggestion_description) VALUES ('b@example.com', 'B', 'x', 'second', 'x')")
+    assert first.commit_and_upload(conn_first) == 1
+    assert second.commit_and_upload(conn_second) == 2  # same local rowid, renumbered by the merge
+    first.close_connection(conn_first)
+    second.close_connection(conn_second)
+
+    assert second.upload_stats() == {'uploads': 1, 'conflicts': 1, 'reapplied': 1, 'reruns': 0, 'failed': 0}
+    conn = first.get_connection(read_only=True)
+    titles = [row[0] for row in conn.execute("SELECT suggestion_title FROM general_suggestions ORDER BY id")]
+    first.close_connection(conn)
+    assert titles == ["first", "second"]
+
+    # A merge that breaks a constraint is reported, not uploaded
+    assert first.create_user("dup@example.com", "secret", "A", "User")['success']
+    conn = second.get_connection()
+    conn.execute("INSERT INTO users (email, password_hash, first_name, last_name) VALUES (?, ?, ?, ?)",
+                 ("late@example.com", "x", "B", "User"))
+    assert first.create_user("late@example.com", "secret", "A", "User")['success']
+    with pytest.raises(StorageConflict):
+        second.commit_and_upload(conn)
+    second.close_connection(conn)
+
+
+def test_statements_are_told_apart_by_what_they_do(tmp_path, monkeypatch):
+    """CTE reads and EXPLAIN are reads; a CTE INSERT is a write whose rowid survives a merge"""
+    monkeypatch.chdir(tmp_path)
+    blob = LocalBlob()
+    db = Database(blob=blob, cache_dir=str(tmp_path / "db"))
+    other = Database(blob=blob, cache_dir=str(tmp_path / "other"))
+
+    conn = db.get_connection()
+    conn.execute("WITH recent AS (SELECT id FROM users) SELECT COUNT(*) FROM recent")
+    conn.execute("EXPLAIN SELECT * FROM users")
+    assert conn.writes == [] and conn.last_insert_rowid is None
+    db.close_connection(conn)
+
+    conn = db.get_connection()
+    conn.execute("WITH row (title) AS (VALUES ('cte')) "
+                 "INSERT INTO general_suggestions (email, full_name, suggestion_type, suggestion_title, "
+                 "suggestion_description) SELECT 'c@example.com', 'C', 'x', title, 'x' FROM row")
+    conn.execute("UPDATE general_suggestions SET full_name = 'Cte' WHERE suggestion_title = 'cte'")
+    assert len(conn.writes) == 2 and conn.last_insert_rowid == 1
+    conn_other = other.get_connection()
+    conn_other.execute("INSERT INTO general_suggestions (email, full_name, suggestion_type, suggestion_title, "
+                       "suggestion_description) VALUES ('o@example.com', 'O', 'x', 'other', 'x')")
+    other.commit_and_upload(conn_other)
+    other.close_connection(conn_other)
+    assert db.commit_and_upload(conn) == 2  # renumbered by the merge
+    db.close_connection(conn)
+
+
+def test_read_then_write_operations_run_again_on_conflict(tmp_path, monkeypatch):
+    """Writes that followed a read are not replayed; the operation runs again and its check sees the winner"""
+    monkeypatch.chdir(tmp_path)
+    blob = LocalBlob()
+    db = Database(blob=blob, cache_dir=str(tmp_path / "db"))
+    other = Database(blob=blob, cache_dir=str(tmp_path / "other"))
+
+    attempts = []
+
+    def register(conn):
+        attempts.append(conn)
+        if conn.execute("SELECT id FROM users WHERE email = ?", ("race@example.com",)).fetchone():
+            return 'exists'
+        if len(attempts) == 1:
+            # Another worker registers the same address between this check and the upload
+            assert other.create_user("race@example.com", "secret", "Other", "Worker")['success']
+        conn.execute("INSERT INTO users (email, password_hash, first_name, last_name) VALUES (?, ?, ?, ?)",
+                     ("race@example.com", "x", "This", "Worker"))
+        db.commit_and_upload(conn)
+        return 'created'
+
+    assert db.run_write(register) == 'exists'
+    assert len(attempts) == 2
+    assert db.upload_stats()['reruns'] == 1 and db.upload_stats()['reapplied'] == 0
+    conn = db.get_connection(read_only=True)
+    names = conn.execute("SELECT first_name FROM users WHERE email = 'race@example.com'").fetchall()
+    db.close_connection(conn)
+    assert names == [("Other",)]
+
+
+def test_failed_upload_is_reported_to_the_submitter(tmp_path, monkeypatch):
+    """An upload error is raised, so the form reports failure instead of a submission that was never saved"""
+    from forms_manager import FormsManager
+
+    monkeypatch.chdir(tmp_path)
+    blob = LocalBlob()
+    db = Database(blob=blob, cache_dir=str(tmp_path / "cache"))
+
+    def unreachable(*args, **kwargs):
+        raise ConnectionError("storage unreachable")
+    monkeypatch.setattr(LocalBlob, "upload_from_filename", unreachable)
+
+    result = FormsManager(db).submit_general_suggestion(None, {
+        'email': 'lost@example.com', 'full_name': 'Lost', 'suggestion_type': 'x', 'suggestion_title': 'lost',
+        'suggestion_description': 'x'})
+    assert not result['success'] and 'unreachable' in result['error']
+    assert not db.create_user("lost@example.com", "secret", "Lost", "User")['success']
+    assert db.upload_stats()['failed'] == 2
+
+    monkeypatch.undo()
+    conn = db.get_connection(read_only=True)
+    assert conn.execute("SELECT COUNT(*) FROM general_suggestions").fetchone() == (0,)
+    db.close_connection(conn)
@@ -74,8 +74,8 @@ def test_database_connection():
         for table in tables_to_check:
             try:
                 result = db.execute_sql(f"SELECT COUNT(*) FROM {table}")
-                if db._is_valid_result(result):
-                    count = result['results'][0]['rows'][0][0]
+                count = result.scalar()
+                if count is not None:
                     print(colored(f"✅ Table '{table}' exists with {count} records", "green"))
                 else:
                     print(colored(f"❌ Table '{table}' query failed", "red"))
@@ -180,8 +180,8 @@ def test_form_submissions(db):
         for table in tables_to_check:
             try:
                 result = db.execute_sql(f"SELECT COUNT(*) FROM {table}")
-                if db._is_valid_result(result):
-                    count = result['results'][0]['rows'][0][0]
+                count = result.scalar()
+                if count is not None:
                     print(colored(f"📋 Table '{table}': {count} records", "blue"))
             except Exception as e:
                 print(colored(f"❌ Error counting records in '{table}': {e}", "red"))
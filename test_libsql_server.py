@@ -0,0 +1,701 @@
+#!/usr/bin/env python3
+"""
+Tests for the local libSQL server against the real TursoDatabase client
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from libsql_server import LibSQLServer
+from database_turso import TursoDatabase, TursoStatementError
+from metrics import REGISTRY
+from database_turso_async import AsyncTursoDatabase, SyncTursoDatabase, run_sync
+from forms_manager_turso import TursoFormsManager
+from turso_transport import TursoTransport
+from turso_retry import RetryPolicy, CircuitBreaker, CircuitOpenError
+from email_normalization import backfill_normalized_emails
+from hrana_client import HranaError
+from submission_journal import SubmissionJournal
+
+
+def test_statements_and_batches(db):
+    """Legacy statements endpoint: reads, writes and transactional batches"""
+    assert db.execute_sql("SELECT 1 AS one").scalar() == 1
+    
+    result = db.create_user('server@example.com', 'pw', 'Local', 'Server')
+    assert result['success']
+    assert db.execute_read("SELECT email FROM users WHERE email = ?", ['server@example.com']).first()['email'] == 'server@example.com'
+    
+    try:
+        db.execute_batch([
+            ("INSERT INTO users (email, password_hash, first_name, last_name) VALUES (?, ?, ?, ?)", ['tx@example.com', 'x', 'a', 'b']),
+            "INSERT INTO no_such_table VALUES (1)"
+        ], transaction=True)
+        assert False, "batch should have failed"
+    except TursoStatementError as e:
+        assert e.index == 1
+    assert db.execute_sql("SELECT COUNT(*) FROM users WHERE email = 'tx@example.com'").scalar() == 0
+
+
+def test_hrana_pipeline(db):
+    """Stored SQL, interactive transactions and row counts over the Hrana pipeline"""
+    forms_manager = TursoFormsManager(db)
+    form_data = {'email': 'pipeline@example.com', 'full_name': 'Pipe Line'}
+    
+    first = forms_manager.submit_membership_application(None, dict(form_data))
+    assert first['success'] and first['application_id'] is not None
+    assert forms_manager.submit_membership_application(None, dict(form_data))['error'] == 'duplicate_email'
+    
+    try:
+        with db.transaction() as tx:
+            tx.execute("INSERT INTO users (email, password_hash, first_name, last_name) VALUES ('rb@example.com', 'x', 'a', 'b')")
+            raise RuntimeError("roll back")
+    except RuntimeError:
+        pass
+    assert db.execute_sql("SELECT COUNT(*) FROM users WHERE email = 'rb@example.com'").scalar() == 0
+
+
+def test_async_client_returns_ids_and_invalidates_the_shared_cache(db):
+    """create_user reports the new id; async writes drop the sync client's cached reads"""
+    async_db = AsyncTursoDatabase.from_database(db)
+    sync_facade = SyncTursoDatabase(async_db)
+    try:
+        created = sync_facade.create_user('async@example.com', 'pw', 'Async', 'Client')
+        assert created['success']
+        assert created['user_id'] == db.execute_sql("SELECT id FROM users WHERE email = 'async@example.com'").scalar()
+        assert sync_facade.create_user('async@example.com', 'pw', 'Async', 'Client')['error'] == 'User already exists'
+        
+        count_sql = "SELECT COUNT(*) FROM users WHERE last_name = ?"
+        assert db.execute_read(count_sql, ['Client']).scalar() == 1
+        sync_facade.execute_sql("INSERT INTO users (email, password_hash, first_name, last_name) VALUES (?, ?, ?, ?)",
+                                ['async2@example.com', 'x', 'Async', 'Client'])
+        assert db.execute_read(count_sql, ['Client']).scalar() == 2
+    finally:
+        run_sync(async_db.aclose())
+
+
+def test_async_client_gets_a_fresh_http_client_per_event_loop(db):
+    """Each asyncio.run gets its own httpx client and a finished loop's client is dropped"""
+    async_db = AsyncTursoDatabase.from_database(db)
+
+    async def query():
+        return (await async_db.execute_sql("SELECT 1")).scalar(), async_db._client()
+
+    first_value, first_client = asyncio.run(query())
+    second_value, second_client = asyncio.run(query())
+    assert first_value == second_value == 1
+    assert second_client is not first_client
+    assert list(async_db._clients.values()) == [second_client]
+
+
+def test_async_token_lookup_matches_the_sync_read_path(db, libsql_server):
+    """get_user_by_token reads through the shared cache, rejects expired tokens and records payload sizes"""
+    async_db = AsyncTursoDatabase.from_database(db)
+    sync_facade = SyncTursoDatabase(async_db)
+    try:
+        created = sync_facade.create_user('token@example.com', 'pw', 'Token', 'User')
+        token = sync_facade.authenticate_user('token@example.com', 'pw')['token']
+        db.execute_sql("INSERT INTO session_tokens (user_id, token, expires_at) VALUES (?, ?, ?)",
+                       [created['user_id'], 'expired-token', '2000-01-01T00:00:00'])
+
+        sent_before = REGISTRY.payload_bytes.series()[("turso", "sent")][2]
+        assert sync_facade.get_user_by_token(token)['email'] == 'token@example.com'
+        assert REGISTRY.payload_bytes.series()[("turso", "sent")][2] == sent_before + 1
+        libsql_server.reset_stats()
+        assert sync_facade.get_user_by_token(token)['id'] == created['user_id']
+        assert libsql_server.stats()['requests'] == 0
+        assert db.get_user_by_token(token)['id'] == created['user_id']
+        assert sync_facade.get_user_by_token('expired-token') is None
+        assert db.get_user_by_token('expired-token') is None
+    finally:
+        run_sync(async_db.aclose())
+
+
+def test_cache_drops_results_read_before_a_write(db):
+    """A read that races a write to its table is not cached after the write invalidated it"""
+    sql, params = "SELECT COUNT(*) FROM users WHERE first_name = ?", ['Racer']
+    generation = db.cache.generation(sql)
+    stale = db.execute_sql(sql, params)
+    db.execute_sql("INSERT INTO users (email, password_hash, first_name, last_name) VALUES (?, ?, ?, ?)",
+                   ['racer@example.com', 'x', 'Racer', 'R'])
+    db.cache.put(sql, params, stale, generation)
+    assert db.cache.get(sql, params) is None
+    assert db.cache.stats()['stale_puts'] == 1
+    assert db.execute_read(sql, params).scalar() == 1
+
+
+def test_writes_invalidate_cached_reads_of_their_table(db):
+    """A write drops the cached reads of the table it changes and leaves the others"""
+    users_sql = "SELECT COUNT(*) FROM users WHERE last_name = ?"
+    other_sql = "SELECT COUNT(*) FROM general_suggestions WHERE suggestion_title = ?"
+    assert db.execute_read(users_sql, ['Cached']).scalar() == 0
+    assert db.execute_read(other_sql, ['cached']).scalar() == 0
+    hits = db.cache.stats()['hits']
+    assert db.execute_read(users_sql, ['Cached']).scalar() == 0
+    assert db.cache.stats()['hits'] == hits + 1
+    
+    db.execute_sql("INSERT INTO users (email, password_hash, first_name, last_name) VALUES (?, ?, ?, ?)",
+                   ['cached@example.com', 'x', 'C', 'Cached'])
+    assert db.cache.get(users_sql, ['Cached']) is None
+    assert db.cache.get(other_sql, ['cached']) is not None
+    assert db.execute_read(users_sql, ['Cached']).scalar() == 1
+
+def test_hrana_sessions_are_pooled_across_threads(db):
+    """A thread per call (as Streamlit reruns do) reuses a bounded set of sessions"""
+    def submit(n):
+        return db.execute_stored([("SELECT ? AS n", [n])])[0].scalar()
+    
+    for n in range(20):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            assert sorted(pool.map(submit, [n, n + 100])) == [n, n + 100]
+    assert len(db._idle_sessions) <= db.session_pool_size
+    assert sum(session.streams_opened for session in db._idle_sessions) <= db.session_pool_size
+
+
+def test_auth_and_error_injection():
+    """Wrong tokens are refused; injected 503s are retried by the client"""
+    with LibSQLServer(auth_token="secret", error_rate=0.5, seed=7) as server:
+        response = requests.post(server.url, json={"statements": ["SELECT 1"]},
+                                 headers={"Authorization": "Bearer wrong"})
+        assert response.status_code == 401
+        
+        database = TursoDatabase(server.url, "secret", {'retry_max_attempts': 10, 'retry_base_delay': 0.001,
+                                                         'breaker_failure_threshold': 100})
+        try:
+            for _ in range(10):
+                assert database.execute_sql("SELECT 1").scalar() == 1
+            assert server.stats()['injected_errors'] > 0
+        finally:
+            database.close()
+
+
+def test_idle_eviction_spares_sessions_in_use():
+    """An idle session is replaced, but never while a request is still running on it"""
+    transport = TursoTransport({}, idle_timeout=0.01)
+    with transport._session_in_use() as busy:
+        time.sleep(0.02)
+        with transport._session_in_use() as concurrent:
+            assert concurrent is busy
+    time.sleep(0.02)
+    with transport._session_in_use() as fresh:
+        assert fresh is not busy
+    transport.close()
+
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    """Consecutive failures open the breaker; after the reset timeout one trial decides"""
+    with LibSQLServer(auth_token="breaker", error_rate=1.0, error_status=503) as server:
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+        transport = TursoTransport({"Authorization": "Bearer breaker"},
+                                   retry_policy=RetryPolicy(max_attempts=1, breaker=breaker))
+        payload = {"statements": ["SELECT 1"]}
+        try:
+            for _ in range(2):
+                assert transport.post(server.url, payload, idempotent=True).status_code == 503
+            assert breaker.state == CircuitBreaker.OPEN
+            requests_before = server.stats()['requests']
+            try:
+                transport.post(server.url, payload, idempotent=True)
+                assert False, "an open breaker should fail fast"
+            except CircuitOpenError:
+                pass
+            assert server.stats()['requests'] == requests_before
+            
+            # A failed trial opens it again at once
+            time.sleep(0.25)
+            assert transport.post(server.url, payload, idempotent=True).status_code == 503
+            assert breaker.state == CircuitBreaker.OPEN
+            
+            server.error_rate = 0.0
+            time.sleep(0.25)
+            assert transport.post(server.url, payload, idempotent=True).status_code == 200
+            assert breaker.state == CircuitBreaker.CLOSED
+        finally:
+            transport.close()
+
+
+def test_writes_are_not_replayed_after_maybe_sent(libsql_server):
+    """A 500 after execution is retried for reads but surfaced for an INSERT, which ran once"""
+    with LibSQLServer(auth_token="maybe", error_status=500, error_after_execute=True) as server:
+        database = TursoDatabase(server.url, server.auth_token, {'retry_max_attempts': 4, 'retry_base_delay': 0.001,
+                                                                  'breaker_failure_threshold': 100})
+        try:
+            database.wait_until_ready()
+            server.error_rate = 1.0
+            server.reset_stats()
+            try:
+                database.execute_sql("INSERT INTO users (email, password_hash, first_name, last_name) "
+                                     "VALUES ('maybe@example.com', 'x', 'May', 'Be')")
+                assert False, "the write should have failed"
+            except Exception:
+                pass
+            assert server.stats()['requests'] == 1
+            
+            server.reset_stats()
+            try:
+                database.execute_sql("SELECT 1")
+            except Exception:
+                pass
+            assert server.stats()['requests'] == 4
+            
+            server.error_rate = 0.0
+            assert database.execute_sql("SELECT COUNT(*) FROM users WHERE email = 'maybe@example.com'").scalar() == 1
+        finally:
+            database.close()
+
+
+def test_wait_until_ready_and_warmup_retry(libsql_server):
+    """The constructor returns before the warm-up; a failed warm-up is retried by the next wait"""
+    with LibSQLServer(auth_token="slow", latency=0.2) as server:
+        database = TursoDatabase(server.url, server.auth_token)
+        try:
+            assert not database.is_ready()
+            assert database.wait_until_ready(timeout=0.01) is False
+            assert database.wait_until_ready() is True and database.is_ready()
+        finally:
+            database.close()
+    
+    database = TursoDatabase("http://127.0.0.1:1", libsql_server.auth_token,
+                             {'retry_max_attempts': 1, 'breaker_failure_threshold': 100})
+    try:
+        try:
+            database.wait_until_ready(timeout=10)
+            assert False, "warm-up against a closed port should fail"
+        except Exception:
+            pass
+        assert not database.is_ready()
+        database.database_url = libsql_server.url
+        assert database.wait_until_ready(timeout=10) is True
+        assert database.execute_sql("SELECT 1").scalar() == 1
+    finally:
+        database.close()
+
+def test_iter_rows_cursor_and_keyset(db):
+    """iter_rows streams over the v3 cursor and falls back to keyset pagination"""
+    db.execute_sql("CREATE TABLE IF NOT EXISTS scan (id INTEGER PRIMARY KEY, v TEXT)")
+    db.execute_sql("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1200) "
+                   "INSERT OR IGNORE INTO scan SELECT x, 'row ' || x FROM c")
+    
+    rows = list(db.iter_rows("SELECT id, v FROM scan WHERE id > ?", [200]))
+    assert len(rows) == 1000 and rows[0]['v'] == 'row 201'
+    
+    # Stopping early leaves nothing behind that breaks the next query
+    for row in db.iter_rows("SELECT id FROM scan"):
+        break
+    assert db.execute_sql("SELECT COUNT(*) FROM scan").scalar() == 1200
+    
+    paged = TursoDatabase(db.database_url, db.auth_token, {'hrana_version': 2, 'iter_batch_size': 500})
+    try:
+        assert [row['id'] for row in paged.iter_rows("SELECT id FROM scan WHERE id > ?", [200])] == list(range(201, 1201))
+    finally:
+        paged.close()
+
+
+def test_executemany_isolates_bad_rows(db):
+    """Multi-row INSERT chunks commit; a failing row is reported without losing its chunk"""
+    db.execute_sql("CREATE TABLE IF NOT EXISTS bulk (id INTEGER PRIMARY KEY, email TEXT UNIQUE NOT NULL)")
+    rows = ([i, None if i == 42 else f"bulk{i}@example.com"] for i in range(1, 1001))
+    
+    result = db.executemany("INSERT INTO bulk (id, email) VALUES (?, ?)", rows, chunk_size=300)
+    assert result['rows'] == 1000 and result['applied'] == 999
+    assert [error['index'] for error in result['errors']] == [41]
+    assert 'NOT NULL' in result['errors'][0]['error']
+    assert db.execute_sql("SELECT COUNT(*) FROM bulk").scalar() == 999
+    
+    result = db.executemany("DELETE FROM bulk WHERE id = ?", [[i] for i in range(1, 501)])
+    assert result['applied'] == 500 and result['round_trips'] == 1
+    assert db.execute_sql("SELECT COUNT(*) FROM bulk").scalar() == 500
+
+
+def test_local_replica_leaves_out_credentials(tmp_path, libsql_server):
+    """Session tokens and password hashes never reach the replica file, and writes do not force a sync"""
+    path = str(tmp_path / "replica.db")
+    database = TursoDatabase(libsql_server.url, libsql_server.auth_token,
+                             {'replica_path': path, 'replica_sync_interval': 60})
+    try:
+        database.wait_until_ready()
+        assert database.create_user('replica@example.com', 'pw', 'Rep', 'Lica')['success']
+        token = database.authenticate_user('replica@example.com', 'pw')['token']
+        assert database.replica.sync()
+        
+        local = sqlite3.connect(path)
+        try:
+            tables = {row[0] for row in local.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            password_hash = local.execute("SELECT password_hash FROM users WHERE email = 'replica@example.com'").fetchone()
+        finally:
+            local.close()
+        assert 'session_tokens' not in tables and password_hash == ('',)
+        assert os.stat(path).st_mode & 0o777 == 0o600
+        
+        # Token lookups go to the primary without trying the replica
+        reads_local = database.replica.metrics()['reads_local']
+        assert database.get_user_by_token(token)['email'] == 'replica@example.com'
+        assert database.replica.metrics()['reads_local'] == reads_local
+        
+        # A write sends this session to the primary but does not trigger a full resync
+        syncs = database.replica.metrics()['syncs']
+        database.execute_sql("UPDATE users SET first_name = 'Re' WHERE email = 'replica@example.com'")
+        time.sleep(0.2)
+        assert database.replica.metrics()['syncs'] == syncs
+        assert not database.replica.can_serve()
+    finally:
+        database.close()
+
+
+
+def test_local_replica_staleness_and_read_your_writes(tmp_path, libsql_server):
+    """Reads use the replica only while it is fresh and holds this session's writes"""
+    database = TursoDatabase(libsql_server.url, libsql_server.auth_token,
+                             {'replica_path': str(tmp_path / "replica.db"), 'replica_sync_interval': 60,
+                              'replica_max_staleness': 0.3, 'cache_max_entries': 0})
+    try:
+        database.wait_until_ready()
+        replica = database.replica
+        assert replica.sync()
+        sql = "SELECT COUNT(*) FROM users WHERE last_name = 'Stale'"
+        
+        assert database.execute_read(sql).scalar() == 0
+        assert replica.metrics()['reads_local'] == 1
+        
+        # This session's write is not in the replica yet, so it reads the primary
+        database.execute_sql("INSERT INTO users (email, password_hash, first_name, last_name) "
+                             "VALUES ('stale@example.com', 'x', 'S', 'Stale')")
+        assert database.execute_read(sql).scalar() == 1
+        assert replica.metrics()['reads_local'] == 1
+        
+        assert replica.sync()
+        assert database.execute_read(sql).scalar() == 1
+        assert replica.metrics()['reads_local'] == 2
+        
+        # Past max_staleness the replica stops serving until the next sync
+        time.sleep(0.35)
+        assert not replica.can_serve()
+        reads_primary = replica.metrics()['reads_primary']
+        assert database.execute_read(sql).scalar() == 1
+        assert replica.metrics()['reads_primary'] == reads_primary + 1
+    finally:
+        database.close()
+
+
+def test_local_replica_skips_the_copy_when_nothing_changed(tmp_path, libsql_server):
+    """An unchanged primary costs one marker request; inserts elsewhere and this process's writes trigger a copy"""
+    database = TursoDatabase(libsql_server.url, libsql_server.auth_token,
+                             {'replica_path': str(tmp_path / "replica.db"), 'replica_sync_interval': 60})
+    try:
+        database.wait_until_ready()
+        replica = database.replica
+        # Drive the syncs by hand
+        replica.stop()
+        replica._thread.join(5)
+        assert replica.sync()
+        syncs, skipped = replica.metrics()['syncs'], replica.metrics()['syncs_skipped']
+        
+        libsql_server.reset_stats()
+        assert replica.sync()
+        assert replica.metrics()['syncs'] == syncs and replica.metrics()['syncs_skipped'] == skipped + 1
+        assert libsql_server.stats()['requests'] == 1
+        assert replica.can_serve()
+        
+        # A row added by another writer moves the users marker
+        other = sqlite3.connect(libsql_server.db_path)
+        try:
+            other.execute("INSERT INTO users (email, password_hash, first_name, last_name) "
+                          "VALUES ('elsewhere@example.com', 'x', 'E', 'W')")
+            other.commit()
+        finally:
+            other.close()
+        assert replica.sync()
+        assert replica.metrics()['syncs'] == syncs + 1
+        assert replica.query("SELECT COUNT(*) FROM users WHERE email = 'elsewhere@example.com'").scalar() == 1
+        
+        # An UPDATE moves no marker, but this process wrote it, so the copy runs
+        database.execute_sql("UPDATE users SET first_name = 'Moved' WHERE email = 'elsewhere@example.com'")
+        assert replica.sync()
+        assert replica.metrics()['syncs'] == syncs + 2
+        assert replica.query("SELECT first_name FROM users WHERE email = 'elsewhere@example.com'").scalar() == 'Moved'
+    finally:
+        database.close()
+
+
+def test_reads_route_to_fastest_replica():
+    """execute_read goes to the closer replica; a session that wrote reads from the primary"""
+    with LibSQLServer(auth_token="secret", latency=0.05) as primary, \
+            LibSQLServer(db_path=primary.db_path, auth_token="secret") as replica:
+        database = TursoDatabase(primary.url, "secret", {'replica_urls': [replica.url], 'replica_probe_interval': 60,
+                                                          'read_your_writes_window': 0.2})
+        try:
+            database.wait_until_ready()
+            database.router.probe()
+            database.router.probe()
+            before = replica.stats()['requests']
+            assert database.execute_read("SELECT COUNT(*) FROM users").scalar() == 0
+            assert replica.stats()['requests'] == before + 1
+            
+            database.execute_sql("INSERT INTO users (email, password_hash, first_name, last_name) "
+                                 "VALUES ('route@example.com', 'x', 'a', 'b')")
+            assert database.execute_read("SELECT COUNT(*) FROM users").scalar() == 1
+            assert replica.stats()['requests'] == before + 1
+            
+            time.sleep(0.25)
+            assert database.execute_read("SELECT email FROM users").scalar() == 'route@example.com'
+            metrics = database.routing_metrics()
+            assert metrics['reads_replica'] == 2 and metrics['reads_primary'] == 1
+        finally:
+            database.close()
+
+
+def test_request_and_response_compression():
+    """Large bodies travel gzipped both ways; a server that refuses gzip requests gets plain ones"""
+    with LibSQLServer(auth_token="secret") as server:
+        database = TursoDatabase(server.url, "secret", {'request_compression': True, 'compression_min_bytes': 512})
+        try:
+            database.wait_until_ready()
+            server.reset_stats()
+            abstract = "The Quran corpus annotated for morphology and syntax. " * 200
+            database.execute_sql("CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, body TEXT)")
+            database.execute_sql("INSERT INTO docs (body) VALUES (?)", [abstract])
+            assert database.execute_sql("SELECT body FROM docs").scalar() == abstract
+            
+            stats = server.stats()
+            assert stats['compressed_requests'] == 1 and stats['compressed_responses'] >= 1
+            compression = database.transport_metrics()['compression']
+            assert compression['request_ratio'] < 0.2 and compression['response_ratio'] < 0.2
+        finally:
+            database.close()
+    
+    with LibSQLServer(accept_compressed=False) as server:
+        database = TursoDatabase(server.url, "token", {'request_compression': True, 'compression_min_bytes': 512})
+        try:
+            database.execute_sql("SELECT ?", ["x" * 4096])
+            assert database.execute_sql("SELECT length(?)", ["x" * 4096]).scalar() == 4096
+            assert database.transport_metrics()['compression']['request_compression'] is False
+        finally:
+            database.close()
+    
+    # The uncompressed resend after a 415 is part of the same request and not a breaker failure
+    with LibSQLServer(accept_compressed=False) as server:
+        transport = TursoTransport({"Authorization": "Bearer token"}, retry_policy=RetryPolicy(max_attempts=1),
+                                   request_compression=True, compression_min_bytes=512)
+        try:
+            payload = {"statements": [{"q": "SELECT length(?)", "params": ["x" * 4096]}]}
+            assert transport.post(server.url, payload, idempotent=True).status_code == 200
+            metrics = transport.metrics()
+            assert (metrics['requests'], metrics['attempts'], metrics['failures']) == (1, 1, 0)
+            assert metrics['consecutive_failures'] == 0 and metrics['breaker_state'] == 'closed'
+            assert metrics['compression']['requests_compressed'] == 0
+            assert server.stats()['requests'] == 2
+        finally:
+            transport.close()
+
+
+def test_email_normalized_upgrade_and_backfill(tmp_path):
+    """Old tables get the column and its backfill on connect; duplicate checks also see unset rows"""
+    db_path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE membership_applications (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, "
+                 "first_name TEXT, last_name TEXT, email TEXT NOT NULL UNIQUE, phone_number TEXT, country TEXT, "
+                 "highest_degree TEXT, field_of_study TEXT, institution TEXT, current_occupation TEXT, "
+                 "organization TEXT, position TEXT, primary_research_area TEXT, motivation TEXT, "
+                 "application_date DATETIME)")
+    conn.executemany("INSERT INTO membership_applications (email) VALUES (?)",
+                     [[f"Member{i}@Example.com "] for i in range(1, 1201)] + [["member7@example.com"]])
+    conn.commit()
+    conn.close()
+    
+    with LibSQLServer(db_path=db_path) as server:
+        database = TursoDatabase(server.url, "token")
+        try:
+            database.wait_until_ready()
+            unset = "SELECT id FROM membership_applications WHERE email_normalized IS NULL"
+            assert [row['id'] for row in database.execute_sql(unset)] == [1201]
+            report = backfill_normalized_emails(database, batch_size=500)
+            assert report['membership_applications']['updated'] == 0
+            assert report['membership_applications']['conflicting_ids'] == [1201]
+            
+            forms_manager = TursoFormsManager(database)
+            assert forms_manager.check_email_exists(" MEMBER42@example.com")['exists']
+            assert forms_manager.submit_membership_application(
+                None, {'email': 'member42@EXAMPLE.com', 'full_name': 'Dup'})['error'] == 'duplicate_email'
+            
+            # A row the backfill has not reached is still found and still blocks a duplicate
+            database.execute_sql("UPDATE membership_applications SET email_normalized = NULL WHERE id = 99")
+            assert forms_manager.check_email_exists("member99@example.com")['exists']
+            assert forms_manager.check_submission_prerequisites(None, "Member99@example.com")['email_exists']
+            assert forms_manager.submit_membership_application(
+                None, {'email': 'member99@example.com', 'full_name': 'Dup'})['error'] == 'duplicate_email'
+            assert forms_manager.submit_membership_application(
+                None, {'email': 'new@example.com', 'full_name': 'New Member'})['success']
+            
+            plan = database.execute_sql("EXPLAIN QUERY PLAN SELECT id FROM membership_applications "
+                                        "WHERE email_normalized = ?", ["new@example.com"])
+            assert 'idx_membership_applications_email_normalized' in str([list(row) for row in plan])
+        finally:
+            database.close()
+
+
+def test_concurrent_membership_submits_insert_once(db, libsql_server):
+    """Check and insert are one statement: one round trip each, and only one of the racing submits wins"""
+    forms_manager = TursoFormsManager(db)
+    form_data = {'email': 'Race@Example.com', 'full_name': 'Race Condition'}
+    forms_manager.submit_membership_application(None, {'email': 'warm@example.com', 'full_name': 'Warm Up'})
+    
+    before = libsql_server.stats()['requests']
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: forms_manager.submit_membership_application(None, dict(form_data)),
+                                    range(8)))
+    assert sum(result['success'] for result in results) == 1
+    assert all(result['error'] == 'duplicate_email' for result in results if not result['success'])
+    assert libsql_server.stats()['requests'] - before == 8
+    assert db.execute_sql("SELECT COUNT(*) FROM membership_applications "
+                          "WHERE email_normalized = 'race@example.com'").scalar() == 1
+
+
+def test_research_submission_with_authors_is_one_round_trip(db, libsql_server, tmp_path, monkeypatch):
+    """Paper and authors commit in one transactional request, keyed by the new paper's id"""
+    import forms_manager_turso
+    monkeypatch.setattr(forms_manager_turso, 'MAX_AUTHORS_PER_STATEMENT', 2)  # two author statements
+    forms_manager = TursoFormsManager(db)
+    form_data = {
+        'research_type': 'Journal article', 'title': 'Morphology of the Quran', 'journal_conference': 'JQS',
+        'publication_year': 2024, 'abstract': 'An abstract',
+        'authors': 'Kais Dukes; Nizar Habash\nEric Atwell',
+    }
+    db.execute_sql("INSERT INTO research_database (publication_type, paper_title, conference_journal_book_title, "
+                   "publisher_name, publication_year) VALUES ('x', 'older paper', 'x', 'x', '2020')")
+    
+    before = libsql_server.stats()['requests']
+    result = forms_manager.submit_research_database(None, form_data)
+    assert result['success'] and libsql_server.stats()['requests'] - before == 1
+    
+    authors = db.execute_sql("SELECT research_id, author_name, author_order FROM research_authors "
+                             "WHERE research_id = ? ORDER BY author_order", [result['research_id']])
+    assert [(row['author_name'], row['author_order']) for row in authors] == \
+        [('Kais Dukes', 1), ('Nizar Habash', 2), ('Eric Atwell', 3)]
+    
+    db.journal = SubmissionJournal(db, str(tmp_path / "journal.db"))
+    try:
+        key = forms_manager.submit_research_database(None, dict(form_data, title='Journaled', authors='A; B; C'))['submission_key']
+        # A paper from another session lands in the same flush, after this one
+        db.journal.append('research_database', [(
+            "INSERT INTO research_database (publication_type, paper_title, conference_journal_book_title, "
+            "publisher_name, publication_year) VALUES ('x', 'other paper', 'x', 'x', '2021')", [])])
+        assert db.journal.flush() == 2
+        research_id = db.journal.status(key)['result_id']
+        assert db.execute_sql("SELECT paper_title FROM research_database WHERE id = ?", [research_id]).scalar() == 'Journaled'
+        authors = db.execute_sql("SELECT author_name FROM research_authors WHERE research_id = ? ORDER BY author_order",
+                                 [research_id])
+        assert [row['author_name'] for row in authors] == ['A', 'B', 'C']
+    finally:
+        db.journal.close()
+        db.journal = None
+
+
+SUGGESTION_INSERT = ("INSERT INTO general_suggestions (email, full_name, suggestion_type, suggestion_title, "
+                     "suggestion_description) VALUES (?, ?, ?, ?, ?)")
+
+
+def _suggestion(title):
+    return [(SUGGESTION_INSERT, ['journal@example.com', 'J', 'general', title, 'd'])]
+
+
+def _suggestion_count(db, title):
+    return db.execute_sql("SELECT COUNT(*) FROM general_suggestions WHERE suggestion_title = ?", [title]).scalar()
+
+
+def test_journal_survives_restart_and_replays_idempotently(db, tmp_path):
+    """A journaled submission outlives the process and a replayed flush inserts it once"""
+    path = str(tmp_path / "journal.db")
+    journal = SubmissionJournal(db, path)
+    key = journal.append('general_suggestions', _suggestion('durable'))
+    journal.close()
+    
+    journal = SubmissionJournal(db, path)
+    try:
+        assert journal.status(key)['status'] == 'pending'
+        assert journal.flush() == 1
+        applied = journal.status(key)
+        assert applied['status'] == 'applied' and applied['result_id'] is not None
+        assert _suggestion_count(db, 'durable') == 1
+        
+        # The response of that flush was lost: the entry is sent again
+        journal._conn.execute("UPDATE journal SET status = 'pending', finished_at = NULL WHERE idempotency_key = ?", [key])
+        assert journal.flush() == 1
+        assert journal.status(key)['status'] == 'applied'
+        assert _suggestion_count(db, 'durable') == 1
+        
+        # Applied entries are dropped once they leave the retention window
+        journal.retention = 0
+        journal.append('general_suggestions', _suggestion('durable-2'))
+        journal.flush()
+        assert journal.status(key) is None
+    finally:
+        journal.close()
+
+
+def test_journal_isolates_bad_entries_and_reports_them(db, tmp_path):
+    """A refused statement fails alone; it and a guarded INSERT that inserts nothing are surfaced"""
+    journal = SubmissionJournal(db, str(tmp_path / "journal.db"))
+    try:
+        good = journal.append('general_suggestions', _suggestion('split-1'))
+        bad = journal.append('general_suggestions', [("INSERT INTO no_such_table VALUES (1)", [])])
+        duplicate = journal.append('general_suggestions', [
+            (SUGGESTION_INSERT.replace("VALUES (?, ?, ?, ?, ?)", "SELECT ?, ?, ?, ?, ? WHERE 0"),
+             ['journal@example.com', 'J', 'general', 'split-dup', 'd'])
+        ])
+        later = journal.append('general_suggestions', _suggestion('split-2'))
+        
+        assert journal.flush() == 4
+        assert [journal.status(key)['status'] for key in (good, bad, duplicate, later)] == \
+            ['applied', 'failed', 'rejected', 'applied']
+        assert _suggestion_count(db, 'split-1') == 1 and _suggestion_count(db, 'split-2') == 1
+        
+        metrics = journal.metrics()
+        assert metrics['failed_entries'] == 1 and metrics['rejected_entries'] == 1
+        assert {problem['key'] for problem in metrics['problems']} == {bad, duplicate}
+    finally:
+        journal.close()
+
+
+def test_journal_backs_off_on_transport_and_stream_errors(tmp_path):
+    """Outages and stream errors leave entries pending with a growing delay, never failed"""
+    with LibSQLServer(auth_token="journal") as server:
+        database = TursoDatabase(server.url, server.auth_token, {'retry_max_attempts': 1, 'breaker_failure_threshold': 100})
+        database.wait_until_ready()
+        journal = SubmissionJournal(database, str(tmp_path / "journal.db"), retry_base_delay=10)
+        try:
+            key = journal.append('general_suggestions', _suggestion('outage'))
+            server.error_rate = 1.0
+            started = time.time()
+            assert journal.flush() == 0
+            server.error_rate = 0.0
+            
+            status = journal.status(key)
+            assert status['status'] == 'pending' and status['attempts'] == 1
+            next_attempt_at = journal._conn.execute("SELECT next_attempt_at FROM journal").fetchone()[0]
+            assert next_attempt_at >= started + 10
+            assert journal.flush() == 0  # not due yet
+            
+            # An expired stream is not the statement's fault either; the delay doubles
+            journal._conn.execute("UPDATE journal SET next_attempt_at = 0")
+            send = journal._send
+            journal._send = lambda entries: (_ for _ in ()).throw(HranaError("Stream expired", "STREAM_EXPIRED"))
+            started = time.time()
+            assert journal.flush() == 0
+            assert journal.status(key)['status'] == 'pending'
+            assert journal._conn.execute("SELECT next_attempt_at FROM journal").fetchone()[0] >= started + 20
+            assert journal.metrics()['flush_errors'] == 2
+            
+            journal._send = send
+            journal._conn.execute("UPDATE journal SET next_attempt_at = 0")
+            assert journal.flush() == 1
+            assert journal.status(key)['status'] == 'applied'
+            assert _suggestion_count(database, 'outage') == 1
+        finally:
+            journal.close()
+            database.close()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for the data-layer metrics and their Prometheus export
+"""
+
+import requests
+
+from metrics import MetricsRegistry, REGISTRY, statement_fingerprint, start_metrics_server
+from forms_manager_turso import TursoFormsManager
+
+
+def test_fingerprints_and_cardinality_cap():
+    """Literals collapse to one label; past the cap new statements count as "other" """
+    assert statement_fingerprint("SELECT * FROM users WHERE id = 42 AND email = 'a@b.c'") == \
+        statement_fingerprint("SELECT *  FROM users WHERE id = 7 AND email = 'x@y.z'")
+    assert statement_fingerprint("SELECT id FROM t WHERE id IN (?, ?, ?)") == "SELECT id FROM t WHERE id IN (?)"
+
+    registry = MetricsRegistry(max_fingerprints=1)
+    registry.record_statements("turso", ["BEGIN", "SELECT 1 FROM a", "SELECT 1 FROM b", "COMMIT"], 0.01, failed=[2])
+    assert registry.statements.values() == {("turso", "SELECT ? FROM a"): 1, ("turso", "other"): 1}
+    assert registry.statement_errors.values() == {("turso", "other"): 1}
+
+
+def test_statements_and_forms_are_recorded(db):
+    """Turso round trips, payload sizes and submit outcomes end up in /metrics"""
+    forms_manager = TursoFormsManager(db)
+    form_data = {'email': 'metrics@example.com', 'full_name': 'Metric User'}
+    assert forms_manager.submit_membership_application(None, dict(form_data))['success']
+    assert forms_manager.submit_membership_application(None, dict(form_data))['error'] == 'duplicate_email'
+
+    outcomes = REGISTRY.form_submissions.values()
+    assert outcomes[("turso", "membership", "success")] >= 1
+    assert outcomes[("turso", "membership", "duplicate_email")] >= 1
+    assert any(row['statement'].startswith("INSERT INTO membership_applications")
+               for row in db.statement_metrics()['statements'])
+
+    server = start_metrics_server(0)
+    try:
+        text = requests.get(f"http://127.0.0.1:{server.server_address[1]}/metrics").text
+    finally:
+        server.shutdown()
+    assert '# TYPE quran_db_request_duration_seconds histogram' in text
+    assert 'quran_form_submissions_total{backend="turso",form="membership",outcome="duplicate_email"}' in text
+    assert 'quran_db_payload_bytes_count{backend="turso",direction="sent"}' in text
+
+
+def test_metrics_server_can_be_restarted_on_the_same_port():
+    """A shut-down server is forgotten, so the next call for its address starts a live one"""
+    first = start_metrics_server(0)
+    port = first.server_address[1]
+    assert start_metrics_server(port) is first
+    first.shutdown()
+
+    second = start_metrics_server(port)
+    try:
+        assert second is not first
+        assert requests.get(f"http://127.0.0.1:{port}/metrics").status_code == 200
+    finally:
+        second.shutdown()